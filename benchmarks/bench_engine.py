@@ -0,0 +1,47 @@
+"""
+Compares pandas' C and python parsers on a large node depth block of
+a synthetic report, the choice `BaseReader._make_df` makes by default.
+
+Usage: python benchmarks/bench_engine.py [scale]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# run from a checkout without installing hymo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hymo import SWMMReportFile
+from synthetic import RPT_FIXTURE, _repeat_rows
+
+
+def timeit(func):
+    tic = time.perf_counter()
+    func()
+    return time.perf_counter() - tic
+
+
+if __name__ == "__main__":
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large.rpt")
+        rpt = SWMMReportFile(RPT_FIXTURE)
+        with open(path, "w") as openfile:
+            openfile.writelines(
+                _repeat_rows(rpt.orig_file, [rpt.block_bounds("node_depth")], scale)
+            )
+
+        rpt = SWMMReportFile(path)
+        start, stop = rpt.block_bounds("node_depth")
+        print("parsing {:,} rows...".format(stop - start))
+
+        names, dtype = rpt._headers.node_depth_results
+        kwargs = dict(sep=r"\s+", header=None, names=names, index_col=[0], dtype=dtype)
+
+        t_c = timeit(lambda: rpt._make_df("node_depth", engine="c", **kwargs))
+        t_python = timeit(lambda: rpt._make_df("node_depth", engine="python", **kwargs))
+
+    print("c:      {:8.2f} s".format(t_c))
+    print("python: {:8.2f} s".format(t_python))
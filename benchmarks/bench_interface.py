@@ -0,0 +1,37 @@
+"""
+Compares `SWMMInterfaceFile.interface` with the fixed-width
+`SWMMInterfaceFile.timeseries` parser on a synthetic interface file.
+
+Usage: python benchmarks/bench_interface.py [n_rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# run from a checkout without installing hymo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hymo import SWMMInterfaceFile
+from synthetic import write_interface
+
+
+def timeit(func):
+    tic = time.perf_counter()
+    func()
+    return time.perf_counter() - tic
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "interface.txt")
+        print("writing {:,} rows...".format(n_rows))
+        write_interface(path, n_rows)
+
+        t_interface = timeit(lambda: SWMMInterfaceFile(path).interface)
+        t_timeseries = timeit(lambda: SWMMInterfaceFile(path).timeseries)
+
+    print("interface:  {:8.2f} s".format(t_interface))
+    print("timeseries: {:8.2f} s".format(t_timeseries))
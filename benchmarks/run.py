@@ -0,0 +1,195 @@
+"""
+Times every reader property on synthetic files at several scales and
+reports the parse time and the peak memory traced by tracemalloc.
+
+Usage: python benchmarks/run.py [--scales 1 10 100] [--readers rpt inp
+    interface lspc lspc_timeseries] [--csv results.csv]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+# run from a checkout without installing hymo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hymo import (
+    SWMMReportFile,
+    SWMMInpFile,
+    SWMMInterfaceFile,
+    LSPCResultsFile,
+    LSPCTimeseriesFile,
+)
+import synthetic
+
+# interface rows at scale 1
+INTERFACE_ROWS = 100000
+
+# LSPC time series steps of 100 subbasins at scale 1
+LSPC_TIMESERIES_STEPS = 1000
+
+
+def measure(func):
+    """
+    The seconds of one call of `func` and, from a second call, its
+    peak traced memory in MB. Tracing slows allocation so the two are
+    measured separately.
+    """
+    gc.collect()
+    tic = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - tic
+
+    gc.collect()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak / 2 ** 20
+
+
+def rpt_cases(folder, scale):
+    path = os.path.join(folder, "model.rpt")
+    synthetic.write_rpt(path, scale)
+
+    rpt = SWMMReportFile(path)
+    cases = {}
+    for block in rpt._sweep_blocks():
+        prop = block if hasattr(SWMMReportFile, block) else block + "_results"
+        cases[prop] = lambda prop=prop: getattr(SWMMReportFile(path), prop)
+    cases["parse_all"] = lambda: SWMMReportFile(path).parse_all()
+
+    return path, cases
+
+
+def inp_cards(inp):
+    cards = []
+    for card in sorted(inp._startlines):
+        try:
+            getattr(inp, card)
+        except NotImplementedError:
+            continue
+        cards.append(card)
+
+    return cards
+
+
+def inp_cases(folder, scale):
+    path = os.path.join(folder, "model.inp")
+    synthetic.write_inp(path, scale)
+
+    cases = {
+        card: lambda card=card: getattr(SWMMInpFile(path), card)
+        for card in inp_cards(SWMMInpFile(path))
+    }
+    cases["series"] = lambda: dict(SWMMInpFile(path).series)
+    cases["network"] = lambda: SWMMInpFile(path).network
+
+    return path, cases
+
+
+def interface_cases(folder, scale):
+    path = os.path.join(folder, "interface.txt")
+    synthetic.write_interface(path, INTERFACE_ROWS * scale)
+
+    cases = {
+        prop: lambda prop=prop: getattr(SWMMInterfaceFile(path), prop)
+        for prop in ["interface", "timeseries"]
+    }
+    cases["cube"] = lambda: SWMMInterfaceFile(path).cube()
+
+    return path, cases
+
+
+def lspc_cases(folder, scale):
+    results = os.path.join(folder, "landuse.csv")
+    summary = os.path.join(folder, "landuse.out")
+    synthetic.write_lspc(results, summary, scale)
+
+    cases = {
+        prop: lambda prop=prop: getattr(LSPCResultsFile(results, summary), prop)
+        for prop in ["raw_results", "parsed_summary", "parsed_results"]
+    }
+    cases["read_results"] = lambda: LSPCResultsFile(results, summary).read_results()
+    cases["read_results_parms"] = lambda: LSPCResultsFile(
+        results, summary
+    ).read_results(parms=["AREA", "SURO"])
+    cases["cube"] = lambda: LSPCResultsFile(results, summary).cube()
+
+    return results, cases
+
+
+def lspc_timeseries_cases(folder, scale):
+    path = os.path.join(folder, "subbasins.out")
+    synthetic.write_lspc_timeseries(path, LSPC_TIMESERIES_STEPS * scale)
+
+    cases = {
+        "read": lambda: LSPCTimeseriesFile(path).read(),
+        "read_projected": lambda: LSPCTimeseriesFile(path).read(
+            subbasins=[100000, 100001], variables=["VAR0"]
+        ),
+        "iter_chunks": lambda: [
+            len(_) for _ in LSPCTimeseriesFile(path).iter_chunks(chunksize=100000)
+        ],
+    }
+
+    return path, cases
+
+
+READERS = {
+    "rpt": rpt_cases,
+    "inp": inp_cases,
+    "interface": interface_cases,
+    "lspc": lspc_cases,
+    "lspc_timeseries": lspc_timeseries_cases,
+}
+
+
+def run(scales, readers):
+    rows = []
+    for reader in readers:
+        for scale in scales:
+            with tempfile.TemporaryDirectory() as folder:
+                path, cases = READERS[reader](folder, scale)
+                size = os.path.getsize(path) / 2 ** 20
+                for prop, func in cases.items():
+                    seconds, peak = measure(func)
+                    rows.append(
+                        {
+                            "reader": reader,
+                            "scale": scale,
+                            "file_MB": round(size, 1),
+                            "property": prop,
+                            "seconds": round(seconds, 4),
+                            "peak_MB": round(peak, 1),
+                        }
+                    )
+                    print(
+                        "{:<10}{:>5}x {:<32}{:>9.3f} s {:>9.1f} MB".format(
+                            reader, scale, prop, seconds, peak
+                        )
+                    )
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument(
+        "--readers", nargs="+", default=list(READERS), choices=list(READERS)
+    )
+    parser.add_argument("--csv", default=None, help="write the results here")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    results = run(args.scales, args.readers)
+    if args.csv is not None:
+        results.to_csv(args.csv, index=False)
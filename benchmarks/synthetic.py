@@ -0,0 +1,171 @@
+"""
+Generators of large synthetic SWMM and LSPC files for benchmarking.
+
+The report, inp and LSPC generators scale the test fixtures: every
+element row of the element blocks is repeated `scale` times under new
+names, so the files keep the exact layout the readers expect.
+"""
+import os
+import shutil
+
+import numpy as np
+
+from hymo import SWMMReportFile, SWMMInpFile
+from hymo.tests import data_path
+
+HEADER = """SWMM5 Interface File
+
+900  - reporting time step in sec
+3    - number of constituents as listed below:
+FLOW CFS
+water MG/L
+nitrogen MG/L
+{n_nodes}    - number of nodes as listed below:
+{nodes}
+Node             Year Mon Day Hr  Min Sec FLOW       water      nitrogen
+"""
+
+RPT_FIXTURE = data_path(os.path.join("swmm", "test_rpt.rpt"))
+INP_FIXTURE = data_path(os.path.join("swmm", "test_inp.inp"))
+LSPC_RESULTS_FIXTURE = data_path(os.path.join("lspc", "landuse.csv"))
+LSPC_SUMMARY_FIXTURE = data_path(os.path.join("lspc", "landuse.out"))
+
+
+def _repeat_rows(lines, bounds, scale):
+    """
+    Repeats the element rows of each (start, stop) line range `scale`
+    times, renaming the first field of the copies.
+    """
+    out = []
+    last = 0
+    for start, stop in sorted(bounds):
+        out.extend(lines[last:start])
+        rows = lines[start:stop]
+        out.extend(rows)
+        elements = [
+            _ for _ in rows
+            if _.strip() and _.lstrip()[0] not in ";-" and not _.startswith("[")
+        ]
+        for n in range(1, scale):
+            for line in elements:
+                indent = len(line) - len(line.lstrip())
+                name = line.split()[0]
+                rest = line[indent + len(name):]
+                out.append("{}{}_{}{}".format(line[:indent], name, n, rest))
+        last = stop
+    out.extend(lines[last:])
+
+    return out
+
+
+def write_rpt(path, scale):
+    """
+    Writes a report with `scale` times the elements of the fixture.
+    """
+    rpt = SWMMReportFile(RPT_FIXTURE)
+    found = rpt._sweep_blocks()
+    bounds = [rpt.block_bounds(b) for b in found if b in rpt._element_blocks]
+
+    with open(path, "w") as openfile:
+        openfile.writelines(_repeat_rows(rpt.orig_file, bounds, scale))
+
+
+def write_inp(path, scale):
+    """
+    Writes an inp with `scale` times the elements and time series of
+    the fixture.
+    """
+    inp = SWMMInpFile(INP_FIXTURE)
+    cards = set(inp._element_blocks) | {"timeseries"}
+    bounds = [
+        inp.block_bounds(card) for card in cards if card in inp.section_index
+    ]
+
+    with open(path, "w") as openfile:
+        openfile.writelines(_repeat_rows(inp.orig_file, bounds, scale))
+
+
+def write_interface(path, n_rows, n_nodes=10, step=900):
+    """
+    Writes a fixed width interface file of `n_rows` rows.
+    """
+    nodes = ["N-{}".format(n) for n in range(n_nodes)]
+    with open(path, "w") as openfile:
+        openfile.write(HEADER.format(n_nodes=n_nodes, nodes="\n".join(nodes)))
+
+        start = np.datetime64("2000-01-01T00:00:00")
+        chunk_steps = 100000
+        n_steps = n_rows // n_nodes
+        for first in range(0, n_steps, chunk_steps):
+            steps = np.arange(first, min(first + chunk_steps, n_steps))
+            stamps = (start + steps * np.timedelta64(step, "s")).astype(object)
+            values = np.random.rand(len(steps), n_nodes, 3)
+            lines = []
+            for stamp, row in zip(stamps, values):
+                dt = stamp.strftime("%Y %m  %d  %H  %M  %S ")
+                for node, v in zip(nodes, row):
+                    lines.append(
+                        "{:<16} {} {:<10.6f} {:<10.6f} {:<10.6f} \n".format(
+                            node, dt, *v
+                        )
+                    )
+            openfile.write("".join(lines))
+
+
+def write_lspc(results_path, summary_path, scale, n_subbasins=100, n_landuses=20):
+    """
+    Writes an LSPC landuse results csv of `scale` * `n_subbasins`
+    subbasins, each with `n_landuses` land uses and every parameter of
+    the fixture summary, and copies the fixture summary.
+    """
+    with open(LSPC_RESULTS_FIXTURE) as openfile:
+        header = openfile.readline()
+        parms = sorted({_.split(",")[2] for _ in openfile if _.strip()})
+
+    subbasins = 100000 + np.arange(scale * n_subbasins)
+    rng = np.random.RandomState(0)
+    with open(results_path, "w") as openfile:
+        openfile.write(header)
+        for subbasin in subbasins:
+            values = rng.rand(n_landuses, len(parms))
+            openfile.write(
+                "".join(
+                    "{},{},{},{:.4f}\n".format(subbasin, landuse + 1, parm, value)
+                    for landuse in range(n_landuses)
+                    for parm, value in zip(parms, values[landuse])
+                )
+            )
+
+    shutil.copy(LSPC_SUMMARY_FIXTURE, summary_path)
+
+
+def write_lspc_timeseries(path, n_steps, n_subbasins=100, n_variables=10):
+    """
+    Writes an hourly LSPC subbasin time series output of `n_steps`
+    steps of `n_subbasins` subbasins, with its "TT" header.
+    """
+    variables = ["VAR{}".format(n) for n in range(n_variables)]
+    header = [
+        "TT LSPC MODEL SUBBASIN TIME SERIES HEADER FILE\n",
+        "TT Output start time:  10/1/2002\n",
+        "TT Simulation time step:   60 min\n",
+        "TT Label\n",
+    ]
+    header += ["TT {}  synthetic variable {} (lb/hour)\n".format(v, v) for v in variables]
+    header += ["TT\n"]
+
+    subbasins = 100000 + np.arange(n_subbasins)
+    rng = np.random.RandomState(0)
+    with open(path, "w") as openfile:
+        openfile.writelines(header)
+        chunk_steps = max(1, 100000 // n_subbasins)
+        for first in range(0, n_steps, chunk_steps):
+            steps = min(chunk_steps, n_steps - first)
+            ids = np.tile(subbasins, steps)
+            values = rng.rand(len(ids), n_variables)
+            openfile.write(
+                "".join(
+                    "{},{}\n".format(i, ",".join("{:.4f}".format(v) for v in row))
+                    for i, row in zip(ids, values)
+                )
+            )
@@ -3,6 +3,11 @@ from .swmminp import SWMMInpFile
 from .swmminterface import SWMMInterfaceFile
 from .lspcreport import LSPCResultsFile
 from .lspcinp import LSPCInpFile
+from .lspctimeseries import LSPCTimeseriesFile
+from .swmmout import SWMMOutputFile
+from .registry import ElementRegistry
+from . import batch
+from . import ensemble
 from .tests import test
 
 # TODO
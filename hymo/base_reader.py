@@ -1,28 +1,67 @@
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
 from pathlib import PurePath
 from io import StringIO
+import re
 
+import numpy as np
 import pandas as pd
 
+from .mapped_lines import MappedLines
+
 
 class BaseReader(object):
     """
     A class to read a SWMM model report file.
     """
 
-    def __init__(self, path, endline="  \n"):
+    # Whether header lookups should ignore letter case.
+    _ignore_case = False
+
+    # {block: element kind} of the blocks indexed by element name
+    _element_blocks = {}
+
+    def __init__(
+        self, path, endline="  \n", memory_map=False, cache=None, registry=None
+    ):
         """
         Requires:
         - path: str, the full file path to the existing SWMM model .inp.
+
+        Optional:
+        - memory_map: bool, default=False. If True `orig_file` is a
+            `MappedLines` view of the memory-mapped file instead of a
+            list, and lines are only decoded when they are requested.
+        - cache: hymo.cache.BlockCache, default=None. An on-disk cache
+            of parsed blocks shared between sessions.
+        - registry: hymo.registry.ElementRegistry, default=None. Index
+            the element blocks by codes shared with the other readers
+            of the same model.
         """
         if isinstance(path, PurePath):
             path = path.resolve().as_posix()
 
         self.path = path
         self.endline = endline
+        self.memory_map = memory_map
+        self.cache = cache
+        self.registry = registry
         self._orig_file = None
 
         self._startlines = {}
 
+        # one-time index of the file, see `_index_file()`
+        self._line_index = None
+        self._breaks = None
+        self._bounds = {}
+
+    def _cache_sources(self):
+        """
+        The files whose state keys this reader's cached blocks.
+        """
+        return [self.path]
+
     @property
     def orig_file(self):
         """
@@ -32,6 +71,57 @@ class BaseReader(object):
             self._orig_file = self.read_file(self.path)
         return self._orig_file
 
+    def close(self):
+        """
+        Releases the memory map of a `memory_map` reader. Parsed blocks
+        stay available; reading new ones maps the file again.
+        """
+        if isinstance(self._orig_file, MappedLines):
+            self._orig_file.close()
+            self._orig_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _index_file(self):
+        """
+        Builds the block index in a single pass over the file. The
+        index maps each header string in `_startlines` to the first
+        line it appears in and stores the sorted line numbers of every
+        `endline` break so that blocks can be sliced without rescanning.
+        """
+        lines = self.orig_file
+        if isinstance(lines, MappedLines) and not self._ignore_case:
+            self._line_index = {
+                header: self._scan(header, lines)
+                for header, _ in self._startlines.values()
+            }
+            self._breaks = lines.find_all(self.endline)
+            return
+
+        text = "".join(lines)
+        headers = [header for header, _ in self._startlines.values()]
+        if self._ignore_case:
+            text = text.lower()
+            headers = [header.lower() for header in headers]
+
+        # character offset of the start of each line
+        starts = [0] + list(accumulate(len(l) for l in lines))
+
+        line_index = {}
+        for header in headers:
+            pos = text.find(header)
+            if pos > -1:
+                line_index[header] = bisect_right(starts, pos) - 1
+            else:
+                line_index[header] = len(lines) - 1
+
+        self._line_index = line_index
+        self._breaks = [n for n, l in enumerate(lines) if l.find(self.endline) > -1]
+
     def find_line_num(self, line, lookup=None):
         """
         Given a text string returns the line number that the string
@@ -43,11 +133,34 @@ class BaseReader(object):
         Returns:
         - n: int, the line number where line exists.
         """
-        if lookup is None:
-            currentfile = self.orig_file.copy()
-        else:
-            currentfile = lookup.copy()
-        for n, l in enumerate(currentfile):
+        if self._ignore_case:
+            line = line.lower()
+
+        if lookup is not None:
+            return self._scan(line, lookup)
+
+        if self._line_index is None:
+            self._index_file()
+
+        if line not in self._line_index:
+            self._line_index[line] = self._scan(line, self.orig_file)
+
+        return self._line_index[line]
+
+    def _scan(self, line, lines):
+        """
+        Linear search for the first line containing `line`. Mirrors
+        the historical behaviour of returning the last line number if
+        `line` is not found.
+        """
+        if isinstance(lines, MappedLines) and not self._ignore_case:
+            n = lines.find(line)
+            return n if n > -1 else len(lines) - 1
+
+        n = -1
+        for n, l in enumerate(lines):
+            if self._ignore_case:
+                l = l.lower()
             if l.find(line) > -1:
                 break
         return n
@@ -65,22 +178,27 @@ class BaseReader(object):
         - n: int, the line number where line exists.
         """
         if lookup is None:
-            currentfile = self.orig_file.copy()
+            currentfile = self.orig_file
         else:
-            currentfile = lookup.copy()
+            currentfile = lookup
+
         # At the end of every block SWMM adds a space, space, return
         # If this changes in new versions then the `line` var will require
         # an update
-        breaks = []
-        for n, l in enumerate(currentfile):
-            if l.find(line) > -1:
-                breaks.append(n)
+        if lookup is None and line == self.endline:
+            if self._breaks is None:
+                self._index_file()
+            breaks = self._breaks
+        elif isinstance(currentfile, MappedLines):
+            breaks = currentfile.find_all(line)
+        else:
+            breaks = [n for n, l in enumerate(currentfile) if l.find(line) > -1]
 
-        if linenum > breaks[-1]:
+        end = bisect_right(breaks, linenum)
+        if end == len(breaks):
             footers = len(currentfile) * -1
         else:
-            end_row = [a for a in breaks if a > linenum][0]
-            footers = int(len(currentfile) - end_row)
+            footers = int(len(currentfile) - breaks[end])
 
         return footers
 
@@ -94,9 +212,12 @@ class BaseReader(object):
 
         Returns:
         - lines: list, a list of lines from `open(filename).readlines()`
+            or a `MappedLines` if `memory_map` is True.
         """
 
-        if isinstance(filename, str):
+        if isinstance(filename, str) and self.memory_map:
+            lines = MappedLines(filename)
+        elif isinstance(filename, str):
             with open(filename, "r") as openfile:
                 lines = openfile.readlines()
         else:
@@ -126,101 +247,157 @@ class BaseReader(object):
             self.find_line_num(blockstart, lookup) + comment_lines
         )  # b/c variable comment lines
 
+    def block_bounds(self, block):
+        """
+        Returns the (start, stop) line numbers of the block such that
+        `orig_file[start:stop]` are the lines of the block.
+        """
+        if block not in self._bounds:
+            start = self.find_block(block)
+            stop = len(self.orig_file) - self._find_end(start, self.endline)
+            self._bounds[block] = (start, min(stop, len(self.orig_file)))
+
+        return self._bounds[block]
+
     def raw_block(self, block):
         """
         Returns the string representation of the block.
         """
-        skiprows = self.find_block(block)
-        skipfooter = self._find_end(skiprows, self.endline)
+        start, stop = self.block_bounds(block)
+
+        return self._join_lines(start, stop)
+
+    def _join_lines(self, start, stop=None):
+        """
+        Returns lines `start` to `stop` of `orig_file` as one string.
+        Memory-mapped files are decoded in one go without creating a
+        str per line.
+        """
+        if stop is None:
+            stop = len(self.orig_file)
 
-        return "".join(self.orig_file[skiprows:-skipfooter])
+        if isinstance(self.orig_file, MappedLines):
+            return self.orig_file.text(start, stop)
+
+        return "".join(self.orig_file[start:stop])
 
     def clean_block(self, block, comment):
         """
         Returns the string representation of the block.
         """
-        skiprows = self.find_block(block)
-        skipfooter = self._find_end(skiprows, self.endline)
+        start, stop = self.block_bounds(block)
 
-        lines = [_ for _ in self.orig_file[skiprows:-skipfooter] if _[0] != comment]
+        lines = [_ for _ in self.orig_file[start:stop] if _[0] != comment]
 
         return "".join(lines)
 
-    def _make_df(self, block, comment=None, **kwargs):
+    def _make_df(self, block, comment=None, register=True, **kwargs):
         """
         Helper function to parse pd.DataFrame for result properties.
+        Element blocks are indexed through the `registry` unless
+        `register` is False.
         """
         if comment is not None:
             string_block = self.clean_block(block, comment)
         else:
             string_block = self.raw_block(block)
 
-        engine = kwargs.pop("engine", "python")
+        engine = kwargs.pop("engine", None)
+        if engine is None:
+            engine = "c" if self._c_engine_supported(**kwargs) else "python"
 
-        return pd.read_csv(StringIO(string_block), engine=engine, **kwargs)
+        try:
+            df = pd.read_csv(StringIO(string_block), engine=engine, **kwargs)
+        except pd.errors.ParserError:
+            if engine == "python":
+                raise
+            # ragged rows the C tokenizer rejects
+            df = pd.read_csv(StringIO(string_block), engine="python", **kwargs)
 
-    def infer_columns(self, start_line_str, blank_space, n_lines):
-        def replace(x):
-            """Helper function to convert string to checksum array"""
-            if x == " ":
-                return "0,"
-            else:
-                return "1,"
-
-        def list_replace(y):
-            """Helper for replace in lists"""
-            return "".join([replace(_) for _ in y])
-
-        def sanitizer1(s):
-            """Helper to remove special chars to conform to PEP"""
-            for replace in list("!@#$%^&*()-+={}[]:;<>/?") + list(" "):
-                s = s.replace(replace, "_")
-            return s
-
-        def sanitizer2(s):
-            """Recursive func to remove double '_' from sanitizer()"""
-            if "__" in s:
-                return sanitizer2(s.replace("__", "_"))
-            else:
-                return s
+        if register:
+            df = self._register_elements(block, df)
+
+        return df
+
+    def _register_elements(self, block, df):
+        """
+        Replaces the index of an element block with a CategoricalIndex
+        of the `registry` codes. Other blocks are returned unchanged.
+        """
+        kind = self._element_blocks.get(block)
+        if self.registry is None or kind is None:
+            return df
+
+        df.index = self.registry.index(kind, df.index, name=df.index.name)
 
-        def sanitizer(s):
-            """Helper to standardize column names"""
-            return sanitizer2(sanitizer1(s))
+        return df
+
+    @staticmethod
+    def _c_engine_supported(sep=",", skipfooter=0, **kwargs):
+        """
+        Whether pandas' C parser can read a block with these read_csv
+        options. Regex separators, such as the dotted leaders of the
+        element count block, and skipfooter need the python engine.
+        """
+        whitespace = sep in (r"\s+", " ") or kwargs.get("delim_whitespace", False)
+
+        return (whitespace or len(sep) == 1) and skipfooter == 0
+
+    def infer_columns(self, start_line_str, blank_space, n_lines, lookup=None):
+        """
+        The column names of a fixed width header, found from the
+        character positions that are blank on every header line.
 
+        Requires:
+        - start_line_str: str, the line above the header.
+        - blank_space: int, the lines between it and the header.
+        - n_lines: int, the number of header lines.
+
+        Optional:
+        - lookup: list-like, default=None. The lines to search; the
+            file lines by default.
+
+        Returns: list of str.
+        """
         # parse the start/end of the actual column names
-        start = self.find_line_num(start_line_str) + blank_space + 1
+        if lookup is None:
+            start = self.find_line_num(start_line_str) + blank_space + 1
+            lookup = self.orig_file
+        else:
+            start = self.find_line_num(start_line_str, lookup) + blank_space + 1
         end = start + n_lines
-        column_string_list = self.orig_file[start:end]
-
-        # turn the the string into a checksum array and find occurances
-        # where only spaces
-        checksum = "\n".join([list_replace(_) for _ in column_string_list])
-        base_array = pd.read_csv(StringIO(checksum), header=None)
-        bool_array = base_array.any()
-        bool_shifted = base_array.any().shift(1)
-
-        diff = bool_array.sub(bool_shifted)
-
-        # need to start the list at n=0
-        column_widths = [0]
-        column_widths += diff[diff < 0].index.tolist()
-
-        # might need to go to the end sometimes? if so uncomment:
-        # column_widths += [t3.index.max()]
-
-        # do you even list comprehension, bro?
-        final_cols = [
-            sanitizer(" ".join(c).strip())
-            for c in zip(
-                *[
-                    [
-                        csl[a1 + 1 : a2 + 1].strip()
-                        for a1, a2 in zip(column_widths, column_widths[1:])
-                    ]
-                    for csl in column_string_list
-                ]
-            )
-        ]
-
-        return final_cols
+
+        return list(_infer_layout(tuple(lookup[start:end])))
+
+
+# characters replaced by "_" in inferred column names
+_SPECIAL_CHARS = re.compile(r"[!@#$%^&*()\-+={}\[\]:;<>/? ]")
+
+
+@lru_cache(maxsize=256)
+def _infer_layout(header):
+    """
+    The column names of the fixed width `header` lines. The lines are
+    laid out as a character matrix and a column ends wherever a non
+    blank position is followed by a position that is blank on every
+    line. Results are cached by the header lines, so files sharing a
+    header skip the inference.
+    """
+    if not header:
+        return ()
+
+    # one row per line, one uint32 code point per character, "\0" padded
+    chars = np.array(header).reshape(len(header), 1)
+    chars = chars.view(np.uint32)
+    filled = ((chars != ord(" ")) & (chars != 0)).any(axis=0)
+    filled = np.append(filled, False)
+
+    # need to start the list at n=0
+    column_widths = [0] + (np.flatnonzero(filled[:-1] & ~filled[1:]) + 1).tolist()
+
+    names = []
+    for a1, a2 in zip(column_widths, column_widths[1:]):
+        name = " ".join(line[a1 + 1 : a2 + 1].strip() for line in header).strip()
+        names.append(re.sub("_+", "_", _SPECIAL_CHARS.sub("_", name)))
+
+    return tuple(names)
@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import os
+import traceback
+
+import pandas as pd
+
+from .swmmreport import SWMMReportFile
+
+
+def read_reports(paths, blocks, workers=None, run_ids=None, progress=None):
+    """
+    Reads the same result blocks from many SWMM report files, parsing
+    the files across a pool of processes.
+
+    ---------
+    Requires:
+    - paths: list of str, the report files to read.
+    - blocks: list of str, the `SWMMReportFile` properties to parse,
+        e.g. ['node_flooding_results', 'link_flow_results'].
+
+    ---------
+    Optional:
+    - workers: int, default=None. Number of worker processes. None or 1
+        parses the files in this process.
+    - run_ids: list, default=None. The key of each file in the results.
+        Defaults to the file names without extension.
+    - progress: callable, default=None. Called as
+        `progress(n_done, n_total, run_id)` after each file.
+
+    ---------
+    Returns:
+    - results: dict, {block: pandas.DataFrame} with each block of every
+        file concatenated and keyed by a `run_id` index level.
+    - errors: dict, {run_id: str} the traceback of every file that
+        could not be read. A bad file does not stop the others, nor
+        does a worker process that dies while reading one.
+    """
+    paths = list(paths)
+    if run_ids is None:
+        run_ids = [os.path.splitext(os.path.basename(str(p)))[0] for p in paths]
+    run_ids = list(run_ids)
+
+    if len(set(run_ids)) != len(run_ids):
+        e = "`run_ids` must be unique, pass `run_ids` explicitly."
+        raise ValueError(e)
+    if len(run_ids) != len(paths):
+        e = "`run_ids` and `paths` must be the same length."
+        raise ValueError(e)
+
+    parsed = {}
+    errors = {}
+
+    def collect(run_id, result):
+        frames, error = result
+        if error is None:
+            parsed[run_id] = frames
+        else:
+            errors[run_id] = error
+        if progress is not None:
+            progress(len(parsed) + len(errors), len(paths), run_id)
+
+    if workers is None or workers <= 1:
+        for run_id, path in zip(run_ids, paths):
+            collect(run_id, _read_report(path, blocks))
+    else:
+        map_reports(zip(run_ids, paths), blocks, workers, collect)
+
+    results = {}
+    for block in blocks:
+        # keep the input order regardless of completion order
+        frames = {
+            run_id: parsed[run_id][block] for run_id in run_ids if run_id in parsed
+        }
+        if frames:
+            results[block] = pd.concat(frames, names=["run_id"])
+        else:
+            results[block] = pd.DataFrame()
+
+    return results, errors
+
+
+def map_reports(items, blocks, workers, collect):
+    """
+    Reads `blocks` of many reports across a pool of processes and
+    calls `collect(key, (frames, error))` as each one finishes.
+
+    A worker that dies, e.g. killed for running out of memory, breaks
+    the pool and fails every unfinished file. Those files are read
+    again in a new pool, and the ones that break that pool too are read
+    one pool each, so only the file that kills its worker is reported
+    as an error.
+
+    Requires:
+    - items: iterable of (key, path) tuples.
+    - blocks: list of str, the `SWMMReportFile` properties to parse.
+    - workers: int, the number of worker processes.
+    - collect: callable, called with the key and the result of
+        `_read_report` of every file.
+    """
+    pending = list(items)
+    attempt = 0
+    while pending:
+        if attempt == 0:
+            broken = _run_pool(pending, blocks, workers, collect)
+        elif attempt == 1:
+            broken = _run_pool(pending, blocks, min(workers, len(pending)), collect)
+        else:
+            broken = []
+            for item in pending:
+                for key, _ in _run_pool([item], blocks, 1, collect):
+                    collect(key, (None, "The worker reading {} died.".format(item[1])))
+        pending = broken
+        attempt += 1
+
+
+def _run_pool(items, blocks, workers, collect):
+    """
+    Runs one pool over `items` and returns the items left unfinished
+    by a broken pool.
+    """
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for key, path in items:
+            try:
+                futures[executor.submit(_read_report, path, blocks)] = (key, path)
+            except BrokenProcessPool:
+                broken.append((key, path))
+
+        for future in as_completed(futures):
+            key, path = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken.append((key, path))
+                continue
+            except Exception:
+                result = None, traceback.format_exc()
+            collect(key, result)
+
+    return broken
+
+
+def _read_report(path, blocks):
+    """
+    Worker: parses `blocks` of one report. Exceptions are returned as
+    a formatted traceback rather than raised so that they can be
+    collected per file.
+    """
+    try:
+        rpt = SWMMReportFile(path)
+        return {block: getattr(rpt, block) for block in blocks}, None
+    except Exception:
+        return None, traceback.format_exc()
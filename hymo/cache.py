@@ -0,0 +1,333 @@
+from functools import wraps
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# the kind codes of the values of cached object columns
+OBJECT_KINDS = {"null": 0, "str": 1, "int": 2, "float": 3}
+OBJECT_PARTS = ["kind", "text", "int", "float"]
+
+
+class BlockCache(object):
+    """
+    An opt-in, size-bounded on-disk cache of parsed blocks. Each block
+    is stored as a NumPy `.npz` file under a key made from the source
+    file path and its size and modification time (or a hash of its
+    contents), so edits to the source invalidate the cached blocks.
+    The least recently used entries are evicted once the cache grows
+    beyond `max_bytes`.
+    """
+
+    def __init__(self, directory, max_bytes=2 ** 30, hash_contents=False):
+        """
+        Requires:
+        - directory: str, the folder to store the cache in. Created if
+            it does not exist.
+
+        Optional:
+        - max_bytes: int, default=2**30. The size the cache is trimmed
+            to after every store.
+        - hash_contents: bool, default=False. Key files by a hash of
+            their contents instead of their size and modification time.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, paths):
+        """
+        The cache key of a set of source files: a hash of their paths
+        followed by a hash of their current state.
+        """
+        source = hashlib.sha1()
+        state = hashlib.sha1()
+        for path in paths:
+            path = os.path.abspath(path)
+            source.update(path.encode())
+            if self.hash_contents:
+                with open(path, "rb") as openfile:
+                    for chunk in iter(lambda: openfile.read(2 ** 20), b""):
+                        state.update(chunk)
+            else:
+                stat = os.stat(path)
+                state.update("{}-{}".format(stat.st_size, stat.st_mtime_ns).encode())
+
+        return "{}-{}".format(source.hexdigest()[:16], state.hexdigest()[:16])
+
+    def _block_path(self, key, block):
+        return os.path.join(self.directory, key, block + ".npz")
+
+    def load(self, paths, block, key=None):
+        """
+        Returns the cached DataFrame of `block` or None. `key` is the
+        `key()` of `paths` if the caller already has it.
+        """
+        if key is None:
+            key = self.key(paths)
+        filename = self._block_path(key, block)
+        if not os.path.exists(filename):
+            return None
+
+        with np.load(filename, allow_pickle=False) as arrays:
+            df = _from_arrays(arrays)
+
+        # mark as recently used
+        os.utime(filename)
+
+        return df
+
+    def store(self, paths, block, df, key=None):
+        """
+        Writes `df` to the cache, drops entries of older versions of
+        the same source files and trims the cache to `max_bytes`. The
+        file is written under a temporary name and moved into place, so
+        concurrent readers never load a partial block.
+        """
+        arrays = _to_arrays(df)
+
+        if key is None:
+            key = self.key(paths)
+        source = key.split("-")[0]
+        for entry in os.listdir(self.directory):
+            if entry.startswith(source) and entry != key:
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+        filename = self._block_path(key, block)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temp = "{}.{}.tmp".format(filename, os.getpid())
+        with open(temp, "wb") as openfile:
+            np.savez(openfile, **arrays)
+        os.replace(temp, filename)
+
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used blocks until the cache is no
+        larger than `max_bytes`.
+        """
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    # blocks still being written by another process
+                    continue
+                filename = os.path.join(root, name)
+                stat = os.stat(filename)
+                files.append((stat.st_mtime_ns, stat.st_size, filename))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, filename in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(filename)
+            total -= size
+
+        for entry in os.listdir(self.directory):
+            entry = os.path.join(self.directory, entry)
+            if os.path.isdir(entry) and not os.listdir(entry):
+                os.rmdir(entry)
+
+    def clear(self):
+        """
+        Removes every cached block.
+        """
+        for entry in os.listdir(self.directory):
+            shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+
+def cached_block(func):
+    """
+    A `property` for reader blocks that consults the reader's
+    `BlockCache` (its `cache` attribute) before parsing, and stores
+    the parsed DataFrame in it afterwards. The in-memory cache is the
+    usual `_<name>` attribute. Readers that parse the same block in
+    more than one way set `_cache_suffix` to keep the entries apart.
+    Blocks read with an element registry are kept apart from plain
+    reads, and their codes are remapped to the current registry on
+    load. The key of the source files is computed once per reader, so
+    `hash_contents` reads the sources once rather than per block.
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self):
+        cache = getattr(self, "cache", None)
+        if cache is None or getattr(self, "_" + name) is not None:
+            return func(self)
+
+        paths = self._cache_sources()
+        if not all(isinstance(p, str) for p in paths):
+            return func(self)
+
+        block = name + getattr(self, "_cache_suffix", "")
+        if getattr(self, "registry", None) is not None:
+            block += "_registry"
+        keys = self.__dict__.setdefault("_cache_keys", {})
+        sources = (cache.hash_contents, tuple(paths))
+        if sources not in keys:
+            keys[sources] = cache.key(paths)
+        key = keys[sources]
+
+        df = cache.load(paths, block, key)
+        if df is None:
+            df = func(self)
+            try:
+                cache.store(paths, block, df, key)
+            except TypeError:
+                # columns of objects that can not be stored without pickle
+                pass
+        elif hasattr(self, "_register_elements"):
+            # cached codes belong to the registry of another session
+            df = self._register_elements(_block_name(name), df)
+
+        setattr(self, "_" + name, df)
+        return df
+
+    return property(wrapper)
+
+
+def _block_name(name):
+    """
+    The `_make_df` block of a property, e.g. node_depth_results ->
+    node_depth.
+    """
+    if name.endswith("_results"):
+        return name[: -len("_results")]
+    return name
+
+
+def _to_arrays(df):
+    """
+    Splits a DataFrame into plain arrays and a JSON description.
+    """
+    arrays = {}
+    meta = {"columns": [], "index": []}
+
+    def add(key, values):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            arrays[key + "_codes"] = values.cat.codes.values
+            categories = np.asarray(values.cat.categories)
+            if categories.dtype == object:
+                parts = _encode_objects(categories)
+                if (parts["kind"] != OBJECT_KINDS["str"]).any():
+                    raise TypeError("Only text object categories can be cached.")
+                categories = parts["text"]
+            arrays[key + "_categories"] = categories
+            return {"key": key, "categorical": True, "ordered": values.cat.ordered}
+
+        values = values.to_numpy()
+        if values.dtype == object:
+            for part, array in _encode_objects(values).items():
+                arrays[key + "_" + part] = array
+        else:
+            arrays[key] = values
+        return {"key": key, "categorical": False, "dtype": str(values.dtype)}
+
+    for n, column in enumerate(df.columns):
+        info = add("c{}".format(n), df.iloc[:, n])
+        meta["columns"].append(dict(info, name=column))
+
+    for n in range(df.index.nlevels):
+        values = pd.Series(df.index.get_level_values(n))
+        info = add("i{}".format(n), values)
+        meta["index"].append(dict(info, name=df.index.names[n]))
+
+    arrays["meta"] = np.array(json.dumps(meta, default=str))
+    return arrays
+
+
+def _from_arrays(arrays):
+    """
+    Rebuilds the DataFrame written by `_to_arrays`.
+    """
+    meta = json.loads(str(arrays["meta"]))
+
+    def get(info):
+        key = info["key"]
+        if info["categorical"]:
+            return pd.Categorical.from_codes(
+                arrays[key + "_codes"],
+                categories=arrays[key + "_categories"],
+                ordered=info["ordered"],
+            )
+        if info["dtype"] == "object":
+            return _decode_objects(
+                {part: arrays[key + "_" + part] for part in OBJECT_PARTS}
+            )
+        return pd.array(arrays[key], dtype=info["dtype"])
+
+    index = [get(info) for info in meta["index"]]
+    names = [info["name"] for info in meta["index"]]
+    if len(index) == 1:
+        index = pd.Index(index[0], name=names[0])
+    else:
+        index = pd.MultiIndex.from_arrays(index, names=names)
+
+    data = {n: get(info) for n, info in enumerate(meta["columns"])}
+    df = pd.DataFrame(data, index=index)
+    df.columns = pd.Index([info["name"] for info in meta["columns"]])
+
+    return df
+
+
+def _encode_objects(values):
+    """
+    Splits an object array of str, int, float and nulls into arrays
+    that load without pickle: a kind code per value (see `OBJECT_KINDS`)
+    and a fixed width unicode, an int64 and a float64 array.
+    """
+    null = pd.isnull(values)
+    if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        return {
+            "kind": np.where(
+                null, OBJECT_KINDS["null"], OBJECT_KINDS["str"]
+            ).astype(np.uint8),
+            "text": np.where(null, "", values).astype(str),
+            "int": np.zeros(0, dtype=np.int64),
+            "float": np.zeros(0, dtype=np.float64),
+        }
+
+    kind = np.zeros(len(values), dtype=np.uint8)
+    text = np.full(len(values), "", dtype=object)
+    integer = np.zeros(len(values), dtype=np.int64)
+    number = np.zeros(len(values), dtype=np.float64)
+    for n, value in enumerate(values):
+        if isinstance(value, str):
+            kind[n], text[n] = OBJECT_KINDS["str"], value
+        elif isinstance(value, (bool, np.bool_)):
+            raise TypeError("Boolean object columns can not be cached.")
+        elif isinstance(value, (int, np.integer)):
+            kind[n], integer[n] = OBJECT_KINDS["int"], value
+        elif isinstance(value, (float, np.floating)) and not np.isnan(value):
+            kind[n], number[n] = OBJECT_KINDS["float"], value
+        elif not pd.isnull(value):
+            e = "Values of type {} can not be cached.".format(type(value).__name__)
+            raise TypeError(e)
+
+    return {
+        "kind": kind,
+        "text": np.array(text.tolist(), dtype=str),
+        "int": integer,
+        "float": number,
+    }
+
+
+def _decode_objects(parts):
+    """
+    Rebuilds the object array written by `_encode_objects`.
+    """
+    kind = parts["kind"]
+    values = np.full(len(kind), np.nan, dtype=object)
+    for name, source in (("str", "text"), ("int", "int"), ("float", "float")):
+        mask = kind == OBJECT_KINDS[name]
+        if mask.any():
+            values[mask] = parts[source][mask].tolist()
+
+    return values
@@ -0,0 +1,366 @@
+import json
+import operator
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .batch import _read_report, map_reports
+from .cache import _to_arrays, _from_arrays
+from .swmmreport import SWMMReportFile
+
+_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda values, other: np.isin(values, list(other)),
+}
+
+# partial aggregates and how they combine across scenarios
+_REDUCTIONS = {"max": "max", "min": "min", "sum": "sum", "count": "sum"}
+
+
+class ReportEnsemble(object):
+    """
+    A columnar on-disk store of the result blocks of many SWMM
+    reports, e.g. the design scenarios of one model. Every block of
+    every scenario is a partition folder holding one `.npy` file per
+    column, so queries read only the scenarios and columns they need
+    and filter rows before they are assembled into a DataFrame.
+
+    Layout: <directory>/<block>/<scenario>/{meta.json, c0.npy, ...}
+    and <directory>/index.json, the order the partitions were written.
+    """
+
+    def __init__(self, directory):
+        """
+        Requires:
+        - directory: str, the folder of the store. Created if it does
+            not exist.
+        """
+        self.directory = directory
+
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def blocks(self):
+        return sorted(
+            _ for _ in os.listdir(self.directory)
+            if os.path.isdir(os.path.join(self.directory, _))
+        )
+
+    def scenarios(self, block):
+        """
+        The scenarios stored for `block`, in the order they were last
+        written.
+        """
+        order = self._read_index()["blocks"].get(block, {})
+
+        # meta.json is written last, partitions without it are incomplete
+        return [
+            scenario for scenario in sorted(order, key=order.get)
+            if os.path.exists(os.path.join(self._partition(block, scenario), "meta.json"))
+        ]
+
+    def _read_index(self):
+        """
+        The ensemble index: {"next": int, "blocks": {block: {scenario:
+        number}}}. Stores written without an index are indexed from
+        the partition metadata.
+        """
+        filename = os.path.join(self.directory, "index.json")
+        if os.path.exists(filename):
+            with open(filename) as openfile:
+                return json.load(openfile)
+
+        index = {"next": 0, "blocks": {}}
+        for block in self.blocks:
+            folder = os.path.join(self.directory, block)
+            metas = [
+                self._meta(block, _) for _ in os.listdir(folder)
+                if os.path.exists(os.path.join(folder, _, "meta.json"))
+            ]
+            for meta in sorted(metas, key=lambda m: m["added"]):
+                index["blocks"].setdefault(block, {})[meta["scenario"]] = index["next"]
+                index["next"] += 1
+
+        return index
+
+    def _write_index(self, index):
+        filename = os.path.join(self.directory, "index.json")
+        with open(filename + ".tmp", "w") as openfile:
+            json.dump(index, openfile)
+        os.replace(filename + ".tmp", filename)
+
+    def add(self, scenario, report, blocks):
+        """
+        Appends the blocks of one report. An existing partition of the
+        same scenario is replaced.
+
+        Requires:
+        - scenario: str, the scenario name.
+        - report: str or SWMMReportFile, the report to store.
+        - blocks: list of str, the `SWMMReportFile` properties to store,
+            e.g. ['node_flooding_results'].
+        """
+        if not isinstance(report, SWMMReportFile):
+            report = SWMMReportFile(report)
+
+        for block in blocks:
+            self.write(block, scenario, getattr(report, block))
+
+    def add_reports(self, paths, blocks, scenarios=None, workers=None):
+        """
+        Parses many reports, optionally across a pool of processes,
+        and appends each one as soon as it is read.
+
+        Requires:
+        - paths: list of str, the report files.
+        - blocks: list of str, the `SWMMReportFile` properties to store.
+
+        Optional:
+        - scenarios: list of str, default=None. The scenario of each
+            file. Defaults to the file names without extension.
+        - workers: int, default=None. Number of worker processes. None
+            or 1 parses the files in this process.
+
+        Returns:
+        - errors: dict, {scenario: str} the traceback of every file that
+            could not be read, including files whose worker died.
+        """
+        paths = list(paths)
+        if scenarios is None:
+            scenarios = [os.path.splitext(os.path.basename(p))[0] for p in paths]
+        scenarios = list(scenarios)
+
+        if len(set(scenarios)) != len(scenarios):
+            e = "`scenarios` must be unique, pass `scenarios` explicitly."
+            raise ValueError(e)
+
+        errors = {}
+
+        def collect(scenario, result):
+            frames, error = result
+            if error is not None:
+                errors[scenario] = error
+                return
+            for block in blocks:
+                self.write(block, scenario, frames[block])
+
+        if workers is None or workers <= 1:
+            for scenario, path in zip(scenarios, paths):
+                collect(scenario, _read_report(path, blocks))
+        else:
+            map_reports(zip(scenarios, paths), blocks, workers, collect)
+
+        return errors
+
+    def write(self, block, scenario, df):
+        """
+        Stores one block of one scenario. Text columns and index levels
+        are stored as categorical codes and unicode categories, so
+        every file can be memory mapped and loads without pickle.
+        Rewriting a scenario moves it to the end of the order.
+        """
+        folder = self._partition(block, scenario)
+
+        df = df.copy(deep=False)
+        for column in df.columns[(df.dtypes == object).values]:
+            df[column] = df[column].astype("category")
+        levels = [
+            pd.Categorical(level) if level.dtype == object else level
+            for level in (
+                df.index.get_level_values(n) for n in range(df.index.nlevels)
+            )
+        ]
+        if df.index.nlevels == 1:
+            df.index = pd.Index(levels[0], name=df.index.name)
+        else:
+            df.index = pd.MultiIndex.from_arrays(levels, names=df.index.names)
+
+        arrays = _to_arrays(df)
+        meta = json.loads(str(arrays.pop("meta")))
+
+        index = self._read_index()
+        meta["scenario"] = str(scenario)
+        meta["added"] = index["next"]
+        meta["rows"] = len(df)
+
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+        os.makedirs(folder)
+        for key, values in arrays.items():
+            np.save(os.path.join(folder, key + ".npy"), values, allow_pickle=False)
+        with open(os.path.join(folder, "meta.json"), "w") as openfile:
+            json.dump(meta, openfile, default=str)
+
+        index["blocks"].setdefault(block, {})[str(scenario)] = index["next"]
+        index["next"] += 1
+        self._write_index(index)
+
+    def read(self, block, columns=None, scenarios=None, filters=None):
+        """
+        Reads a block across scenarios.
+
+        Requires:
+        - block: str, the stored block, e.g. 'node_flooding_results'.
+
+        Optional:
+        - columns: list of str, default=None. Only read these columns.
+        - scenarios: list of str, default=None. Only read these
+            scenarios.
+        - filters: list of (column, op, value) tuples, default=None.
+            Rows must match every filter. `column` may be the index
+            name and `op` one of ==, !=, <, <=, >, >= or in. Filters
+            are applied to the memory mapped columns before the rows
+            are read.
+
+        Returns: pandas.DataFrame with a leading `scenario` index level.
+        """
+        frames = {
+            scenario: df
+            for scenario, df in self._iter_partitions(block, columns, scenarios, filters)
+        }
+        if not frames:
+            return pd.DataFrame()
+
+        return pd.concat(frames, names=["scenario"])
+
+    def reduce(self, block, column, how="max", scenarios=None, filters=None):
+        """
+        Aggregates a column per element across scenarios, e.g. the
+        maximum flooding of each node. Partitions are reduced one at a
+        time, so only one scenario is held in memory.
+
+        Requires:
+        - block: str, the stored block.
+        - column: str, the column to aggregate.
+
+        Optional:
+        - how: str, default='max'. One of max, min, sum, count or mean.
+        - scenarios: list of str, default=None. Only use these scenarios.
+        - filters: list of (column, op, value) tuples, default=None. See
+            `read()`.
+
+        Returns: pandas.Series indexed by element.
+        """
+        if how == "mean":
+            total = self.reduce(block, column, "sum", scenarios, filters)
+            count = self.reduce(block, column, "count", scenarios, filters)
+            return total / count
+
+        if how not in _REDUCTIONS:
+            e = "`how` must be one of {}.".format(sorted(_REDUCTIONS) + ["mean"])
+            raise ValueError(e)
+
+        result = None
+        partitions = self._iter_partitions(block, [column], scenarios, filters)
+        for _, df in partitions:
+            values = df[column]
+            index = pd.Index(np.asarray(values.index, dtype=object), name=values.index.name)
+            partial = getattr(pd.Series(values.values, index=index).groupby(level=0), how)()
+            if result is None:
+                result = partial
+            else:
+                combined = pd.concat([result, partial], axis=1)
+                result = getattr(combined, _REDUCTIONS[how])(axis=1)
+
+        if result is None:
+            return pd.Series(dtype=float, name=column)
+
+        return result.rename(column)
+
+    def _partition(self, block, scenario):
+        scenario = str(scenario)
+        if os.sep in scenario or (os.altsep and os.altsep in scenario):
+            e = "Scenario names cannot contain path separators: {}".format(scenario)
+            raise ValueError(e)
+
+        return os.path.join(self.directory, block, scenario)
+
+    def _meta(self, block, scenario):
+        with open(os.path.join(self._partition(block, scenario), "meta.json")) as openfile:
+            return json.load(openfile)
+
+    def _iter_partitions(self, block, columns, scenarios, filters):
+        """
+        Yields (scenario, DataFrame) of the selected partitions.
+        """
+        if scenarios is None:
+            scenarios = self.scenarios(block)
+
+        for scenario in scenarios:
+            meta = self._meta(block, scenario)
+            folder = self._partition(block, scenario)
+
+            def load(info):
+                # memory map the numeric arrays, categories are small
+                if info["categorical"]:
+                    return {
+                        info["key"] + "_codes": _load(folder, info["key"] + "_codes"),
+                        info["key"] + "_categories": _load(
+                            folder, info["key"] + "_categories"
+                        ),
+                    }
+                return {info["key"]: _load(folder, info["key"])}
+
+            fields = {info["name"]: info for info in meta["columns"] + meta["index"]}
+
+            rows = np.ones(meta["rows"], dtype=bool)
+            for name, op, value in filters or []:
+                if name not in fields:
+                    e = "Unknown filter column {} in {}.".format(name, block)
+                    raise ValueError(e)
+                rows &= _evaluate(load(fields[name]), fields[name], op, value)
+
+            keep = meta["columns"]
+            if columns is not None:
+                missing = set(columns).difference(fields)
+                if missing:
+                    e = "Unknown columns {} in {}.".format(sorted(missing), block)
+                    raise ValueError(e)
+                keep = [info for info in keep if info["name"] in columns]
+
+            arrays = {}
+            for info in keep + meta["index"]:
+                for key, values in load(info).items():
+                    if key.endswith("_categories"):
+                        arrays[key] = values
+                    else:
+                        arrays[key] = np.asarray(values[rows])
+
+            arrays["meta"] = np.array(
+                json.dumps(dict(meta, columns=keep)), dtype=object
+            )
+
+            yield scenario, _from_arrays(arrays)
+
+
+def _load(folder, key):
+    return np.load(os.path.join(folder, key + ".npy"), mmap_mode="r")
+
+
+def _evaluate(arrays, info, op, value):
+    """
+    The row mask of one filter. Categorical columns are compared on
+    their categories and the result is looked up by code.
+    """
+    if op not in _OPERATORS:
+        e = "`op` must be one of {}.".format(sorted(_OPERATORS))
+        raise ValueError(e)
+    compare = _OPERATORS[op]
+
+    key = info["key"]
+    if info["categorical"]:
+        codes = arrays[key + "_codes"]
+        matched = np.append(
+            np.asarray(compare(arrays[key + "_categories"], value), dtype=bool), False
+        )
+        # code -1 (missing) maps to the appended False
+        return matched[codes]
+
+    return np.asarray(compare(arrays[key], value), dtype=bool)
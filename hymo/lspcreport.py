@@ -1,10 +1,32 @@
+import re
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+from .cache import cached_block
+
+# the columns identifying a row of the landuse results
+ID_COLUMNS = ['subbasin', 'deluid', 'parmname']
+
+# the "TT" header entries of the output timing, e.g.
+# "TT Output start time:  10/1/2002" or "TT Simulation time step:   60 min"
+HEADER_TIMES = re.compile(
+    r'^TT\s+(?:\w+\s+)?(start time|end time|time step):\s*(.+?)\s*$',
+    flags=re.IGNORECASE,
+)
+STEP_UNITS = {
+    'sec': 's', 'second': 's', 'seconds': 's',
+    'min': 'min', 'minute': 'min', 'minutes': 'min',
+    'hr': 'h', 'hour': 'h', 'hours': 'h',
+    'day': 'D', 'days': 'D',
+}
 
 class LSPCResultsFile(object):
     """
     A light weight LSPC results parser.
     """
-    def __init__(self, results_path, summary_path, summary_EOF=-2):
+    def __init__(self, results_path, summary_path, summary_EOF=-2, cache=None):
         """
         ---------
         Requires:
@@ -14,6 +36,8 @@ class LSPCResultsFile(object):
         ---------
         Optional:
         - summary_EOF: (-)int, default=-2. Number of end of file comment lines.
+        - cache: hymo.cache.BlockCache, default=None. Load and store the
+            parsed tables in an on-disk cache.
 
         ----------
         Properties:
@@ -24,6 +48,14 @@ class LSPCResultsFile(object):
         - raw_results: The unmodified csv file of self.results_path as read
             by pandas.read_csv().
             - Returns: pandas.DataFrame
+        - read_results: The typed results, optionally filtered by
+            parameter and subbasin while reading.
+            - Returns: pandas.DataFrame
+        - iter_results: The typed and filtered results in chunks.
+            - Returns: generator of pandas.DataFrame
+        - cube: The results as a dense subbasin x landuse x parameter
+            array.
+            - Returns: ResultsCube
         - raw_summary: A string representation of the raw summary file.
             - Returns: str
         - parsed_summary: A parsed version of self.raw_summary containing the
@@ -32,6 +64,10 @@ class LSPCResultsFile(object):
         - parsed_results: The `raw_results` joined to `parsed_summary`
             - Returns: pandas.DataFrame
 
+        The typed results keep the units and descriptions in the
+        `parsed_summary` side table, e.g. `df.parmname.map(
+        lspc.parsed_summary.unit)` maps them through the categories
+        rather than copying the text to every row.
         """
         if (summary_EOF > 0) or not isinstance(summary_EOF, int):
             e = '`summary_EOF` must be a negative int.'
@@ -40,6 +76,7 @@ class LSPCResultsFile(object):
         self.results_path = results_path
         self.summary_path = summary_path
         self._summary_EOF = summary_EOF
+        self.cache = cache
 
         self._raw_results = None
         self._raw_summary = None
@@ -47,7 +84,13 @@ class LSPCResultsFile(object):
 
         self._parsed_results = None
 
-    @property
+    def _cache_sources(self):
+        """
+        The files whose state keys the cached tables.
+        """
+        return [self.results_path, self.summary_path]
+
+    @cached_block
     def raw_results(self):
         """
         The unmodified csv file of self.results_path as read
@@ -59,6 +102,149 @@ class LSPCResultsFile(object):
         
         return self._raw_results
 
+    def _results_dtypes(self, usecols=None):
+        """
+        The compact dtype of each column to read: int32 ids, a
+        categorical `parmname` and float32 values.
+        """
+        columns = pd.read_csv(self.results_path, nrows=0).columns
+        if usecols is not None:
+            missing = set(usecols) - set(columns)
+            if missing:
+                e = "Columns {} are not in {}.".format(sorted(missing), self.results_path)
+                raise ValueError(e)
+            columns = [c for c in columns if c in usecols]
+
+        dtype = {}
+        for col in columns:
+            if col in ('subbasin', 'deluid'):
+                dtype[col] = np.int32
+            elif col == 'parmname':
+                dtype[col] = 'category'
+            else:
+                dtype[col] = np.float32
+
+        return dtype
+
+    def iter_results(self, parms=None, subbasins=None, usecols=None,
+                     chunksize=1000000):
+        """
+        Reads the results in chunks of typed rows, keeping only the
+        rows of `parms` and `subbasins`, so the full table is never
+        held in memory.
+
+        ---------
+        Optional:
+        - parms: list of str, default=None. The parameters to keep.
+        - subbasins: list of int, default=None. The subbasins to keep.
+        - usecols: list of str, default=None. The columns to read. The
+            id columns needed by the filters are always read.
+        - chunksize: int, default=1000000. The rows read per chunk.
+
+        Returns: generator of pandas.DataFrame. Each chunk has its own
+            `parmname` categories.
+        """
+        if usecols is not None:
+            usecols = list(usecols)
+            if parms is not None and 'parmname' not in usecols:
+                usecols.append('parmname')
+            if subbasins is not None and 'subbasin' not in usecols:
+                usecols.append('subbasin')
+        dtype = self._results_dtypes(usecols)
+
+        reader = pd.read_csv(
+            self.results_path, usecols=list(dtype), dtype=dtype, chunksize=chunksize
+        )
+        for chunk in reader:
+            keep = np.ones(len(chunk), dtype=bool)
+            if parms is not None:
+                keep &= chunk['parmname'].isin(parms).values
+            if subbasins is not None:
+                keep &= chunk['subbasin'].isin(subbasins).values
+            if not keep.all():
+                chunk = chunk[keep]
+                if 'parmname' in chunk:
+                    chunk['parmname'] = (
+                        chunk['parmname'].cat.remove_unused_categories()
+                    )
+
+            yield chunk
+
+    def read_results(self, parms=None, subbasins=None, usecols=None,
+                     chunksize=1000000):
+        """
+        The typed results, filtered while reading. Takes the arguments
+        of `iter_results`.
+
+        Returns: pandas.DataFrame
+        """
+        chunks = list(self.iter_results(parms, subbasins, usecols, chunksize))
+        if len(chunks) == 1:
+            return chunks[0]
+
+        df = pd.concat(chunks, ignore_index=True)
+        if 'parmname' in df:
+            # the chunk categories differ, so concat falls back to object
+            df['parmname'] = union_categoricals(
+                [c['parmname'] for c in chunks], sort_categories=True
+            )
+
+        return df
+
+    def cube(self, parms=None, subbasins=None, value='value1',
+             dtype=np.float32, chunksize=1000000):
+        """
+        The results as a dense array indexed by [subbasin, deluid,
+        parmname], filled chunk by chunk from the typed reads without
+        pivoting a long table. Missing combinations are NaN.
+
+        ---------
+        Optional:
+        - parms, subbasins, chunksize: as in `iter_results`.
+        - value: str, default='value1'. The value column to read.
+        - dtype: numpy dtype, default=np.float32.
+
+        Returns: ResultsCube
+        """
+        usecols = ['subbasin', 'deluid', 'parmname', value]
+        parm_names = {}
+        sub_ids, lu_ids, parm_codes, values = [], [], [], []
+        for chunk in self.iter_results(parms, subbasins, usecols, chunksize):
+            # renumber the chunk categories into one list of parameters
+            categories = chunk['parmname'].cat.categories
+            lookup = np.array(
+                [parm_names.setdefault(c, len(parm_names)) for c in categories],
+                dtype=np.int32,
+            )
+            sub_ids.append(chunk['subbasin'].values)
+            lu_ids.append(chunk['deluid'].values)
+            parm_codes.append(lookup[chunk['parmname'].cat.codes.values])
+            values.append(chunk[value].values)
+
+        subbasin_index, sub_codes = np.unique(
+            np.concatenate(sub_ids), return_inverse=True)
+        deluid_index, lu_codes = np.unique(
+            np.concatenate(lu_ids), return_inverse=True)
+        parm_codes = np.concatenate(parm_codes)
+
+        # sort the parameters by name as in `parsed_summary`
+        parm_index = pd.Index(list(parm_names), name='parmname')
+        order = parm_index.argsort()
+        parm_codes = np.argsort(order)[parm_codes]
+
+        data = np.full(
+            (len(subbasin_index), len(deluid_index), len(parm_index)),
+            np.nan, dtype=dtype
+        )
+        data[sub_codes, lu_codes, parm_codes] = np.concatenate(values)
+
+        return ResultsCube(
+            data,
+            pd.Index(subbasin_index, name='subbasin'),
+            pd.Index(deluid_index, name='deluid'),
+            parm_index[order],
+        )
+
     @property
     def raw_summary(self):
         """
@@ -66,10 +252,11 @@ class LSPCResultsFile(object):
         Returns: str
         """
         if self._raw_summary is None:
-            self.parsed_summary
+            with open(self.summary_path, 'r') as openfile:
+                self._raw_summary = openfile.read()
         return self._raw_summary
 
-    @property
+    @cached_block
     def parsed_summary(self):
         """
         A parsed version of self.raw_summary containing the
@@ -77,36 +264,18 @@ class LSPCResultsFile(object):
         Returns: pandas.DataFrame
         """
         if self._parsed_summary is None:
-            with open(self.summary_path, 'r') as openfile:
-                lines = openfile.readlines()
-
-            # concat the raw lines and stash
-            self._raw_summary = ''.join(lines)
+            lines = self.raw_summary.splitlines(keepends=True)
 
             # find the end of the headers
-            start_at = [n for n, _ in enumerate(lines) if 'TT Label' in _][0] + 1
-
-            parsed_summary = {}
-            for l in lines[start_at:self._summary_EOF]:
-                # comment string is "TT " skip 3
-                space_split = l[3:].split(' ')
-                # variable is the first in the tuple
-                var = space_split[0]
-                # recreate the description
-                desc = ' '.join([_ for _ in space_split[1:] if _ != '']).strip()
-                # parse the unit
-                unit = l.split(' (')[-1].strip()[:-1]
-
-                parsed_summary[var] = {
-                    'unit': unit,
-                    'description': desc
-                }
-
-            self._parsed_summary = pd.DataFrame(parsed_summary).T
+            start_at = label_line(lines) + 1
+
+            self._parsed_summary = parse_labels(
+                lines[start_at:self._summary_EOF]
+            ).sort_index()
 
         return self._parsed_summary
 
-    @property
+    @cached_block
     def parsed_results(self):
         """
         The `raw_results` joined to `parsed_summary`
@@ -117,4 +286,187 @@ class LSPCResultsFile(object):
         return self._parsed_results
 
 
+def label_line(lines):
+    """
+    The number of the "TT Label" line of an LSPC header.
+    """
+    for n, line in enumerate(lines):
+        if 'TT Label' in line:
+            return n
+
+    e = 'The LSPC header has no "TT Label" line.'
+    raise ValueError(e)
+
+
+def parse_labels(lines):
+    """
+    The variable label lines of an LSPC "TT" header, e.g.
+    "TT AREA     average area (acre)", as a table of the description
+    and unit of each variable, in the order of the lines.
+
+    Returns: pandas.DataFrame
+    """
+    parsed = {}
+    for l in lines:
+        # comment string is "TT " skip 3
+        space_split = l[3:].split(' ')
+        # variable is the first in the tuple
+        var = space_split[0]
+        # recreate the description
+        desc = ' '.join([_ for _ in space_split[1:] if _ != '']).strip()
+        # parse the unit
+        unit = l.split(' (')[-1].strip()[:-1]
+
+        parsed[var] = {
+            'unit': unit,
+            'description': desc
+        }
+
+    return pd.DataFrame.from_dict(
+        parsed, orient='index', columns=['description', 'unit']
+    )
+
+
+def parse_times(lines):
+    """
+    The output start time, end time and time step of an LSPC "TT"
+    header. Entries missing from the header are None.
+
+    Returns: dict of pandas.Timestamp and pandas.Timedelta
+    """
+    times = {'start time': None, 'end time': None, 'time step': None}
+    for line in lines:
+        match = HEADER_TIMES.match(line)
+        if match is None:
+            continue
+        key, value = match.group(1).lower(), match.group(2)
+        if key == 'time step':
+            number, unit = value.split()[:2]
+            times[key] = pd.Timedelta(float(number), unit=STEP_UNITS[unit.lower()])
+        else:
+            times[key] = pd.Timestamp(value)
+
+    return {
+        'start': times['start time'],
+        'end': times['end time'],
+        'step': times['time step'],
+    }
+
+
+class ResultsCube(object):
+    """
+    A dense [subbasin, deluid, parmname] array of LSPC landuse results.
+    """
+
+    def __init__(self, values, subbasins, deluids, parms):
+        """
+        Requires:
+        - values: numpy.ndarray, shape (n_subbasins, n_deluids, n_parms).
+        - subbasins: pandas.Index, the subbasin ids.
+        - deluids: pandas.Index, the landuse ids.
+        - parms: pandas.Index, the parameter names.
+        """
+        self.values = values
+        self.subbasins = subbasins
+        self.deluids = deluids
+        self.parms = parms
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def subbasin(self, subbasin):
+        """
+        A (deluid, parmname) view of the values of one subbasin.
+        """
+        return self.values[self.subbasins.get_loc(subbasin), :, :]
+
+    def parm(self, name):
+        """
+        A (subbasin, deluid) view of the values of one parameter.
+        """
+        return self.values[:, :, self.parms.get_loc(name)]
+
+    def to_frame(self, parm):
+        """
+        A subbasin x deluid DataFrame of one parameter.
+        """
+        return pd.DataFrame(
+            self.parm(parm), index=self.subbasins, columns=self.deluids
+        )
+
+    def areas(self, c90=None):
+        """
+        The (subbasin, deluid) array of landuse areas, from the `AREA`
+        parameter or from the `area_ac` column of `LSPCInpFile.c90`.
+        Landuses without an area are 0.
+
+        Optional:
+        - c90: pandas.DataFrame, default=None. A table with `subbasin`,
+            `deluid` and `area_ac` columns. Areas of rows sharing a
+            subbasin and deluid are added; rows of other subbasins or
+            landuses are ignored, but at least one row must match.
+
+        Returns: numpy.ndarray
+        """
+        if c90 is None:
+            if 'AREA' not in self.parms:
+                e = 'The cube has no AREA parameter; pass the c90 areas.'
+                raise ValueError(e)
+            return np.nan_to_num(self.parm('AREA').astype(np.float64))
+
+        rows = self.subbasins.get_indexer(c90['subbasin'].values)
+        cols = self.deluids.get_indexer(c90['deluid'].values)
+        found = (rows > -1) & (cols > -1)
+        if not found.any():
+            e = 'No c90 row matches a subbasin and deluid of the cube.'
+            raise ValueError(e)
+
+        areas = np.zeros(self.shape[:2])
+        np.add.at(
+            areas, (rows[found], cols[found]),
+            c90['area_ac'].values[found].astype(np.float64)
+        )
+
+        return areas
+
+    def aggregate(self, by='subbasin', how='sum', c90=None):
+        """
+        Rolls the landuse values up to subbasin or watershed values.
+
+        ---------
+        Optional:
+        - by: str, default='subbasin'. One of 'subbasin', 'deluid' or
+            'watershed'.
+        - how: str, default='sum'. 'sum' adds the values, e.g. loads;
+            'mean' averages them weighted by the landuse areas, e.g.
+            rates per acre.
+        - c90: pandas.DataFrame, default=None. The areas to weight by,
+            see `areas`. The AREA parameter is used by default.
+
+        Returns: pandas.DataFrame indexed by `by` with a column per
+            parameter, or a pandas.Series by parameter for 'watershed'.
+        """
+        axes = {'subbasin': (1,), 'deluid': (0,), 'watershed': (0, 1)}
+        if by not in axes:
+            e = '`by` must be one of {}.'.format(sorted(axes))
+            raise ValueError(e)
+        if how not in ('sum', 'mean'):
+            e = "`how` must be 'sum' or 'mean'."
+            raise ValueError(e)
+
+        values = self.values.astype(np.float64)
+        if how == 'sum':
+            result = np.nansum(values, axis=axes[by])
+        else:
+            weights = self.areas(c90)[:, :, None] * ~np.isnan(values)
+            total = np.nansum(values * weights, axis=axes[by])
+            area = weights.sum(axis=axes[by])
+            result = np.divide(
+                total, area, out=np.full_like(total, np.nan), where=area > 0
+            )
 
+        if by == 'watershed':
+            return pd.Series(result, index=self.parms)
+        index = self.subbasins if by == 'subbasin' else self.deluids
+        return pd.DataFrame(result, index=index, columns=self.parms)
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+
+from .lspcreport import label_line, parse_labels, parse_times
+
+
+class LSPCTimeseriesFile(object):
+    """
+    A streaming reader of LSPC time series output. The file starts
+    with the "TT" header of the LSPC summary files, giving the output
+    start time, the time step and a "TT Label" line per variable,
+    followed by one row per subbasin and time step: the subbasin id and
+    a value per variable. The header may also be kept in a separate
+    file.
+
+    No timestamps are read; the n-th row of a subbasin is at
+    `start + n * step`, so rows may be grouped by subbasin or by time
+    step. Rows are read in typed chunks and only the requested
+    subbasins and variables are kept.
+    """
+
+    def __init__(self, path, header_path=None, start=None, step=None):
+        """
+        Requires:
+        - path: str, the full file path to the time series output.
+
+        Optional:
+        - header_path: str, default=None. The file holding the "TT"
+            header, if it is not at the top of `path`.
+        - start: datetime-like, default=None. Overrides the header's
+            output start time.
+        - step: timedelta-like, default=None. Overrides the header's time
+            step.
+        """
+        self.path = path
+        self.header_path = header_path
+
+        self.header_lines = self._read_header(header_path or path)
+        self._skiprows = 0 if header_path is not None else len(self.header_lines)
+
+        times = parse_times(self.header_lines)
+        self.start = pd.Timestamp(start) if start is not None else times["start"]
+        self.step = pd.Timedelta(step) if step is not None else times["step"]
+        self.end = times["end"]
+        if self.start is None or self.step is None:
+            e = "The header of {} has no start time or time step; pass `start` and `step`."
+            raise ValueError(e.format(path))
+
+        self._parsed_header = None
+        self._columns = None
+        self._sep = None
+
+    @staticmethod
+    def _read_header(path):
+        """
+        The leading "TT" lines of `path`, read without reading the rest
+        of the file.
+        """
+        lines = []
+        with open(path, "r") as openfile:
+            for line in openfile:
+                if not line.startswith("TT"):
+                    break
+                lines.append(line)
+
+        return lines
+
+    @property
+    def parsed_header(self):
+        """
+        The units and description of each variable, in file order.
+
+        Returns: pandas.DataFrame
+        """
+        if self._parsed_header is None:
+            start_at = label_line(self.header_lines) + 1
+            labels = []
+            for line in self.header_lines[start_at:]:
+                # the labels end at the first bare "TT" line
+                if not line[2:].strip():
+                    break
+                labels.append(line)
+
+            self._parsed_header = parse_labels(labels)
+
+        return self._parsed_header
+
+    @property
+    def variables(self):
+        """
+        The variable columns of the data rows.
+        """
+        return self.columns[1:]
+
+    @property
+    def columns(self):
+        """
+        The data columns: `subbasin` then one per variable. Taken from a
+        column header row if the file has one, otherwise from the labels.
+        """
+        if self._columns is None:
+            line = ""
+            with open(self.path, "r") as openfile:
+                for n, line in enumerate(openfile):
+                    if n == self._skiprows:
+                        break
+            fields = line.replace(",", " ").split()
+            if not fields:
+                e = "{} has no data rows.".format(self.path)
+                raise ValueError(e)
+            self._sep = "," if "," in line else r"\s+"
+
+            try:
+                float(fields[0])
+            except ValueError:
+                # a column header row
+                self._columns = ["subbasin"] + fields[1:]
+                self._skiprows += 1
+            else:
+                self._columns = ["subbasin"] + list(self.parsed_header.index)
+                if len(fields) != len(self._columns):
+                    e = "{} has {} columns but its header labels {} variables."
+                    raise ValueError(
+                        e.format(self.path, len(fields), len(self._columns) - 1)
+                    )
+
+        return self._columns
+
+    def iter_chunks(self, subbasins=None, variables=None, chunksize=1000000):
+        """
+        Reads the time series in chunks of typed rows.
+
+        Optional:
+        - subbasins: list of int, default=None. The subbasins to keep.
+        - variables: list of str, default=None. The variables to read.
+            Other columns are skipped by the parser.
+        - chunksize: int, default=1000000. The rows read per chunk.
+
+        Returns: generator of pandas.DataFrame indexed by `Datetime`
+            with an int32 `subbasin` column and a float32 column per
+            variable.
+        """
+        columns = self.columns
+        if variables is None:
+            variables = self.variables
+        missing = set(variables) - set(self.variables)
+        if missing:
+            e = "Variables {} are not in {}.".format(sorted(missing), self.path)
+            raise ValueError(e)
+
+        usecols = ["subbasin"] + list(variables)
+        dtype = {col: np.float32 for col in variables}
+        dtype["subbasin"] = np.int32
+
+        reader = pd.read_csv(
+            self.path,
+            sep=self._sep,
+            skiprows=self._skiprows,
+            header=None,
+            names=columns,
+            usecols=usecols,
+            dtype=dtype,
+            chunksize=chunksize,
+        )
+
+        # the rows of each subbasin read so far
+        seen = {}
+        step = self.step.to_timedelta64()
+        for chunk in reader:
+            ids = chunk["subbasin"].values
+            unique, inverse = np.unique(ids, return_inverse=True)
+            offsets = np.array([seen.get(_, 0) for _ in unique], dtype=np.int64)
+            counts = np.bincount(inverse)
+            seen.update(zip(unique, offsets + counts))
+
+            # the position of each row within its subbasin
+            order = np.argsort(inverse, kind="stable")
+            rank = np.empty(len(ids), dtype=np.int64)
+            rank[order] = np.arange(len(ids)) - np.repeat(
+                np.cumsum(counts) - counts, counts
+            )
+            steps = offsets[inverse] + rank
+
+            if subbasins is not None:
+                keep = np.isin(ids, subbasins)
+                chunk, steps = chunk[keep], steps[keep]
+
+            chunk = chunk[usecols]
+            chunk.index = pd.DatetimeIndex(
+                self.start.to_datetime64() + steps * step, name="Datetime"
+            )
+
+            yield chunk
+
+    def read(self, subbasins=None, variables=None, chunksize=1000000):
+        """
+        The time series of `subbasins` and `variables`, read in chunks.
+        Takes the arguments of `iter_chunks`.
+
+        Returns: pandas.DataFrame
+        """
+        return pd.concat(list(self.iter_chunks(subbasins, variables, chunksize)))
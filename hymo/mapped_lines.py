@@ -0,0 +1,160 @@
+from collections.abc import Sequence
+import mmap
+import os
+import re
+
+import numpy as np
+
+
+class MappedLines(Sequence):
+    """
+    A read-only, list-like view of the lines of a text file backed by
+    a memory map. Only a table of line offsets is held in memory; the
+    text of a line is decoded from the map when it is requested.
+
+    Lines end at "\n"; a "\r" before it is read as part of the line
+    ending, so CRLF files give the same lines as LF files. Use as a
+    context manager, or call `close()`, to release the map.
+    """
+
+    def __init__(self, path, encoding="utf-8", chunksize=2 ** 26):
+        """
+        Requires:
+        - path: str, the full file path to the existing text file.
+
+        Optional:
+        - encoding: str, default='utf-8'. Encoding used to decode lines.
+        - chunksize: int, default=2**26. Number of bytes scanned at a
+            time while building the line offset table.
+        """
+        self.path = path
+        self.encoding = encoding
+
+        with open(path, "rb") as openfile:
+            size = os.fstat(openfile.fileno()).st_size
+            if size > 0:
+                self._mm = mmap.mmap(openfile.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._mm = b""
+
+        self._offsets = self._line_offsets(size, chunksize)
+
+    def _line_offsets(self, size, chunksize):
+        """
+        Returns an int64 array with the byte offset of the start of
+        every line, followed by the size of the file.
+        """
+        starts = [np.zeros(1, dtype=np.int64)]
+        for pos in range(0, size, chunksize):
+            count = min(chunksize, size - pos)
+            buf = np.frombuffer(self._mm, dtype=np.uint8, count=count, offset=pos)
+            starts.append(np.flatnonzero(buf == ord("\n")).astype(np.int64) + pos + 1)
+            del buf  # release the export so the map can be closed
+
+        offsets = np.concatenate(starts)
+        if offsets[-1] != size:
+            # last line has no trailing newline
+            offsets = np.append(offsets, size)
+
+        return offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                return [self[n] for n in range(start, stop, step)]
+            if start >= stop:
+                return []
+            # split on "\n" only, so the lines match the offset table
+            lines = self.raw(start, stop).decode(self.encoding).split("\n")
+            # empty unless the last line of the file has no newline
+            last = lines.pop()
+            lines = [l[:-1] + "\n" if l.endswith("\r") else l + "\n" for l in lines]
+            if last:
+                lines.append(last)
+            return lines
+
+        n = key + len(self) if key < 0 else key
+        if not 0 <= n < len(self):
+            raise IndexError("line index out of range")
+
+        return self[n : n + 1][0]
+
+    def __iter__(self):
+        step = 10000
+        for start in range(0, len(self), step):
+            yield from self[start : start + step]
+
+    def raw(self, start, stop):
+        """
+        Returns the undecoded bytes of lines `start` to `stop`.
+        """
+        return self._mm[self._offsets[start] : self._offsets[stop]]
+
+    def text(self, start, stop):
+        """
+        Returns the decoded text of lines `start` to `stop` as a
+        single string with universal newlines.
+        """
+        text = self.raw(start, stop).decode(self.encoding)
+
+        return text.replace("\r\n", "\n")
+
+    def line_of(self, pos):
+        """
+        Returns the line number containing byte offset `pos`.
+        """
+        return int(np.searchsorted(self._offsets, pos, side="right")) - 1
+
+    def _pattern(self, line):
+        """
+        The compiled bytes pattern of `line`. A trailing "\n" also
+        matches "\r\n".
+        """
+        needle = line.encode(self.encoding)
+        if needle.endswith(b"\n"):
+            return re.compile(re.escape(needle[:-1]) + b"\r?\n")
+        return re.compile(re.escape(needle))
+
+    def find(self, line, start=0):
+        """
+        Returns the number of the first line at or after `start` that
+        contains `line`, or -1 if there is none.
+        """
+        match = self._pattern(line).search(self._mm, int(self._offsets[start]))
+        if match is None:
+            return -1
+
+        return self.line_of(match.start())
+
+    def find_all(self, line):
+        """
+        Returns the sorted line numbers of every line that contains
+        `line`.
+        """
+        pattern = self._pattern(line)
+        found = []
+        match = pattern.search(self._mm)
+        while match is not None:
+            n = self.line_of(match.start())
+            found.append(n)
+            # continue from the start of the next line
+            match = pattern.search(self._mm, int(self._offsets[n + 1]))
+
+        return found
+
+    def close(self):
+        """
+        Releases the memory map.
+        """
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,285 @@
+import numpy as np
+import pandas as pd
+
+# link cards and their (from node, to node) columns
+LINK_CARDS = {
+    "conduits": ("Inlet_Node", "Outlet_Node"),
+    "orifices": ("From_Node", "To_Node"),
+    "outlets": ("Inlet_Node", "Outlet_Node"),
+    "weirs": ("From_Node", "To_Node"),
+    "pumps": ("From_Node", "To_Node"),
+}
+
+NODE_CARDS = ["junctions", "outfalls", "storage", "dividers"]
+
+
+class Network(object):
+    """
+    The links of a SWMM model as a directed graph stored in
+    compressed sparse row (CSR) arrays. Nodes and links are numbered
+    0..n-1; the links leaving node `i` are
+    `down_links[down_ptr[i]:down_ptr[i + 1]]` and the links entering it
+    are `up_links[up_ptr[i]:up_ptr[i + 1]]`. Traversals advance a whole
+    frontier of nodes per step with array operations, so they run in
+    O(nodes + links).
+    """
+
+    def __init__(self, nodes, links, from_nodes, to_nodes, link_types=None):
+        """
+        Requires:
+        - nodes: list-like, the node names.
+        - links: list-like, the link names.
+        - from_nodes, to_nodes: list-like, the inlet and outlet node name
+            of each link. Nodes not in `nodes` are added.
+
+        Optional:
+        - link_types: list-like, default=None. The card of each link.
+        """
+        from_nodes = pd.Index(from_nodes).astype(str)
+        to_nodes = pd.Index(to_nodes).astype(str)
+
+        nodes = pd.Index(nodes).astype(str)
+        extra = from_nodes.append(to_nodes).difference(nodes, sort=False)
+        self.nodes = nodes.append(extra.unique())
+        self.links = pd.Index(np.asarray(links)).astype(str)
+        if link_types is None:
+            link_types = np.full(len(self.links), "", dtype=object)
+        self.link_types = np.asarray(link_types)
+
+        self.source = self.nodes.get_indexer(from_nodes)
+        self.target = self.nodes.get_indexer(to_nodes)
+
+        n_nodes = len(self.nodes)
+        self.down_ptr, self.down_links = _csr(self.source, n_nodes)
+        self.up_ptr, self.up_links = _csr(self.target, n_nodes)
+
+        self.subcatchment_outlets = None
+
+    @classmethod
+    def from_inp(cls, inp):
+        """
+        Builds the network of a `SWMMInpFile` from its link cards.
+        Divider nodes are included; their diverted links are already
+        links of the other cards.
+        """
+        frames = []
+        for card, (inlet, outlet) in LINK_CARDS.items():
+            df = getattr(inp, card)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "link": df.index.astype(str),
+                        "from": df[inlet].astype(str).values,
+                        "to": df[outlet].astype(str).values,
+                        "type": card,
+                    }
+                )
+            )
+        links = pd.concat(frames, ignore_index=True)
+
+        nodes = pd.Index([], dtype=object)
+        for card in NODE_CARDS:
+            nodes = nodes.append(getattr(inp, card).index.astype(str))
+
+        network = cls(
+            nodes.unique(), links["link"], links["from"], links["to"], links["type"]
+        )
+        network.subcatchment_outlets = inp.subcatchments["Outlet"].astype(str)
+        network.subcatchment_outlets.index = (
+            network.subcatchment_outlets.index.astype(str)
+        )
+
+        return network
+
+    @property
+    def outfalls(self):
+        """
+        The nodes without any downstream link.
+        """
+        return self.nodes[np.diff(self.down_ptr) == 0]
+
+    def downstream(self, node, links=False):
+        """
+        The nodes (or links) downstream of `node`, including the node
+        itself.
+        """
+        return self._trace(node, self.down_ptr, self.down_links, self.target, links)
+
+    def upstream(self, node, links=False):
+        """
+        The nodes (or links) upstream of `node`, including the node
+        itself.
+        """
+        return self._trace(node, self.up_ptr, self.up_links, self.source, links)
+
+    def _trace(self, node, ptr, adjacent, ends, links):
+        start = self.nodes.get_loc(str(node))
+
+        seen_nodes = np.zeros(len(self.nodes), dtype=bool)
+        seen_links = np.zeros(len(self.links), dtype=bool)
+        seen_nodes[start] = True
+
+        frontier = np.array([start])
+        while len(frontier):
+            edges = adjacent[_gather(ptr, frontier)]
+            seen_links[edges] = True
+            reached = np.unique(ends[edges])
+            frontier = reached[~seen_nodes[reached]]
+            seen_nodes[frontier] = True
+
+        if links:
+            return self.links[seen_links]
+        return self.nodes[seen_nodes]
+
+    def outfall_of(self):
+        """
+        The outfall each node drains to. Labels spread upstream from
+        every outfall at once; where a flow split reaches more than one
+        outfall the nearest one is reported.
+
+        Returns: pandas.Series indexed by node.
+        """
+        label = np.full(len(self.nodes), -1)
+        frontier = np.flatnonzero(np.diff(self.down_ptr) == 0)
+        label[frontier] = frontier
+
+        while len(frontier):
+            positions = _gather(self.up_ptr, frontier)
+            edges = self.up_links[positions]
+            # the outfall label of the node each edge was reached from
+            origin = label[np.repeat(frontier, np.diff(self.up_ptr)[frontier])]
+            reached = self.source[edges]
+
+            new = label[reached] == -1
+            reached, origin = reached[new], origin[new]
+            # keep the first label of nodes reached twice in one step
+            reached, first = np.unique(reached, return_index=True)
+            label[reached] = origin[first]
+            frontier = reached
+
+        outfalls = pd.Series(
+            np.where(label > -1, self.nodes[np.maximum(label, 0)], None),
+            index=self.nodes,
+            name="Outfall",
+        )
+
+        return outfalls
+
+    def route_subcatchments(self):
+        """
+        The node and the outfall each subcatchment drains to, following
+        subcatchments that discharge onto other subcatchments.
+
+        Returns: pandas.DataFrame indexed by subcatchment with columns
+            `Node` and `Outfall`.
+        """
+        if self.subcatchment_outlets is None:
+            e = "Build the network with `Network.from_inp` to route subcatchments."
+            raise ValueError(e)
+
+        outlets = self.subcatchment_outlets
+        subcatchments = outlets.index
+
+        # pointer jumping through subcatchment-to-subcatchment outlets
+        nxt = subcatchments.get_indexer(outlets.values)
+        target = outlets.values.copy()
+        for _ in range(len(subcatchments) + 1):
+            onto = nxt > -1
+            if not onto.any():
+                break
+            target[onto] = target[nxt[onto]]
+            nxt[onto] = nxt[nxt[onto]]
+        else:
+            e = "Subcatchment outlets form a loop."
+            raise ValueError(e)
+
+        outfall = self.outfall_of().reindex(target).values
+
+        return pd.DataFrame({"Node": target, "Outfall": outfall}, index=subcatchments)
+
+    def accumulate(self, values, weights=None):
+        """
+        Sums node values down the network, e.g. the contributing area
+        of every node. Nodes are processed in topological order one
+        level at a time. A node's total is split between its downstream
+        links in proportion to `weights` (equal shares by default), so
+        the totals at the outfalls add up to the sum of `values`.
+
+        Requires:
+        - values: pandas.Series indexed by node. Missing nodes are 0.
+
+        Optional:
+        - weights: pandas.Series indexed by link, default=None. Links
+            that are not listed weigh 1.
+
+        Returns: pandas.Series indexed by node.
+        """
+        total = values.groupby(values.index.astype(str)).sum()
+        total = total.reindex(self.nodes, fill_value=0).values.astype(np.float64)
+
+        out_degree = np.diff(self.down_ptr)
+        if weights is None:
+            share = 1.0 / out_degree[self.source]
+        else:
+            share = weights.reindex(self.links).fillna(1).values.astype(np.float64)
+            sums = np.bincount(self.source, weights=share, minlength=len(self.nodes))
+            share = np.divide(
+                share, sums[self.source], out=np.zeros_like(share),
+                where=sums[self.source] > 0,
+            )
+
+        in_degree = np.diff(self.up_ptr).copy()
+        frontier = np.flatnonzero(in_degree == 0)
+        done = len(frontier)
+        while len(frontier):
+            edges = self.down_links[_gather(self.down_ptr, frontier)]
+            targets = self.target[edges]
+            np.add.at(total, targets, total[self.source[edges]] * share[edges])
+            np.subtract.at(in_degree, targets, 1)
+            reached = np.unique(targets)
+            frontier = reached[in_degree[reached] == 0]
+            done += len(frontier)
+
+        if done < len(self.nodes):
+            e = "The network has {} nodes on loops.".format(len(self.nodes) - done)
+            raise ValueError(e)
+
+        return pd.Series(total, index=self.nodes, name=values.name)
+
+    def contributing_area(self, areas):
+        """
+        The subcatchment area draining through every node.
+
+        Requires:
+        - areas: pandas.Series, the area of each subcatchment, e.g.
+            `inp.subcatchments.Area`.
+
+        Returns: pandas.Series indexed by node.
+        """
+        nodes = self.route_subcatchments()["Node"]
+        areas = pd.Series(areas.values, index=areas.index.astype(str))
+        by_node = pd.Series(areas.reindex(nodes.index).values, index=nodes.values)
+
+        return self.accumulate(by_node.rename("Area"))
+
+
+def _csr(ends, n_nodes):
+    """
+    The (ptr, links) CSR arrays grouping the links by `ends`.
+    """
+    links = np.argsort(ends, kind="stable")
+    ptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(ends, minlength=n_nodes), out=ptr[1:])
+
+    return ptr, links
+
+
+def _gather(ptr, frontier):
+    """
+    The CSR positions of every link of the `frontier` nodes.
+    """
+    starts = ptr[frontier]
+    counts = ptr[frontier + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+
+    return offsets + np.arange(counts.sum())
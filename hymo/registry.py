@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+
+class ElementRegistry(object):
+    """
+    A model-level map of element names to stable integer codes, shared
+    by the readers of one model. Blocks parsed with a registry are
+    indexed by a `pandas.CategoricalIndex` whose codes are the
+    registry codes, so the same node or link has the same code in
+    every block and file.
+
+    Codes are assigned in order of first appearance and never change,
+    so frames registered earlier stay valid as new names are added.
+    """
+
+    def __init__(self):
+        self._names = {}
+
+    @property
+    def kinds(self):
+        return list(self._names)
+
+    def names(self, kind):
+        """
+        The registered names of `kind` ('node', 'link', 'subcatchment')
+        in code order.
+        """
+        return self._names.get(kind, pd.Index([], dtype=object))
+
+    def codes(self, kind, names):
+        """
+        Returns the int array of codes of `names`, registering the
+        names that have not been seen yet.
+        """
+        names = pd.Index(names).astype(str)
+        registered = self.names(kind)
+
+        codes = registered.get_indexer(names)
+        new = codes == -1
+        if new.any():
+            self._names[kind] = registered.append(pd.Index(names[new].unique()))
+            codes = self._names[kind].get_indexer(names)
+
+        return codes
+
+    def code(self, kind, name):
+        """
+        The code of a single registered name. Raises KeyError if the
+        name is not registered.
+        """
+        return self.names(kind).get_loc(str(name))
+
+    def index(self, kind, names, name=None):
+        """
+        A CategoricalIndex of `names` sharing the registry categories.
+        """
+        codes = self.codes(kind, names)
+        values = pd.Categorical.from_codes(codes, categories=self.names(kind))
+
+        return pd.CategoricalIndex(values, name=name)
+
+    def align(self, df, kind):
+        """
+        Extends the categories of a registered frame to every name
+        registered since, without changing its codes.
+        """
+        df = df.copy(deep=False)
+        df.index = df.index.set_categories(self.names(kind))
+
+        return df
+
+    def select(self, frames, kind, name):
+        """
+        The rows of one element in several registered blocks.
+
+        Requires:
+        - frames: dict, {block: pandas.DataFrame} of blocks parsed with
+            this registry.
+        - kind: str, the element kind of the blocks.
+        - name: str, the element name.
+
+        Returns: dict, {block: pandas.DataFrame} of the blocks that
+            contain the element.
+        """
+        code = self.code(kind, name)
+
+        selected = {}
+        for block, df in frames.items():
+            rows = np.asarray(df.index.codes) == code
+            if rows.any():
+                selected[block] = df[rows]
+
+        return selected
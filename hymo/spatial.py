@@ -0,0 +1,371 @@
+import numpy as np
+import pandas as pd
+
+
+class GridIndex(object):
+    """
+    A uniform grid over the bounding boxes of a set of items (points
+    are boxes of zero size). Every item is listed in each cell its box
+    overlaps, with the cell lists stored as CSR arrays, so a window
+    query only tests the items of the cells the window covers.
+    """
+
+    def __init__(self, ids, xmin, ymin, xmax=None, ymax=None, cell_size=None):
+        """
+        Requires:
+        - ids: list-like, the name of each item.
+        - xmin, ymin: array-like, the lower left corner of each box, or
+            the point coordinates.
+
+        Optional:
+        - xmax, ymax: array-like, default=None. The upper right corner
+            of each box. None indexes points.
+        - cell_size: float, default=None. Defaults to the size giving
+            about one item per cell.
+        """
+        self.ids = pd.Index(ids)
+        self.xmin = np.asarray(xmin, dtype=np.float64)
+        self.ymin = np.asarray(ymin, dtype=np.float64)
+        self.xmax = self.xmin if xmax is None else np.asarray(xmax, dtype=np.float64)
+        self.ymax = self.ymin if ymax is None else np.asarray(ymax, dtype=np.float64)
+
+        n = len(self.ids)
+        if n:
+            self.origin = (self.xmin.min(), self.ymin.min())
+            width = self.xmax.max() - self.origin[0]
+            height = self.ymax.max() - self.origin[1]
+        else:
+            self.origin, width, height = (0.0, 0.0), 0.0, 0.0
+
+        if cell_size is None:
+            cell_size = np.sqrt(width * height / max(n, 1)) or max(width, height) / max(n, 1)
+        self.cell_size = cell_size or 1.0
+
+        self.shape = (
+            int(height // self.cell_size) + 1,
+            int(width // self.cell_size) + 1,
+        )
+
+        ix0, iy0 = self._cell_of(self.xmin, self.ymin)
+        ix1, iy1 = self._cell_of(self.xmax, self.ymax)
+        items, cells = _expand(ix0, iy0, ix1, iy1, self.shape[1])
+
+        order = np.argsort(cells, kind="stable")
+        self.items = items[order]
+        self.ptr = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(cells, minlength=self.shape[0] * self.shape[1]),
+            out=self.ptr[1:],
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell_of(self, x, y):
+        ix = np.floor((np.asarray(x) - self.origin[0]) / self.cell_size).astype(np.int64)
+        iy = np.floor((np.asarray(y) - self.origin[1]) / self.cell_size).astype(np.int64)
+
+        return (
+            np.clip(ix, 0, self.shape[1] - 1),
+            np.clip(iy, 0, self.shape[0] - 1),
+        )
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """
+        The positions of the items whose box intersects the window.
+        """
+        if not len(self) or xmax < self.origin[0] or ymax < self.origin[1]:
+            return np.array([], dtype=np.int64)
+
+        ix0, iy0 = self._cell_of(xmin, ymin)
+        ix1, iy1 = self._cell_of(xmax, ymax)
+        rows = np.arange(iy0, iy1 + 1)
+        cols = np.arange(ix0, ix1 + 1)
+        cells = (rows[:, None] * self.shape[1] + cols[None, :]).ravel()
+
+        starts, stops = self.ptr[cells], self.ptr[cells + 1]
+        counts = stops - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(
+            counts.sum()
+        )
+        candidates = np.unique(self.items[positions])
+
+        hit = (
+            (self.xmin[candidates] <= xmax) & (self.xmax[candidates] >= xmin)
+            & (self.ymin[candidates] <= ymax) & (self.ymax[candidates] >= ymin)
+        )
+
+        return candidates[hit]
+
+    def distance(self, positions, x, y):
+        """
+        The distance from (x, y) to the boxes of `positions`, 0 inside.
+        """
+        dx = np.maximum(np.maximum(self.xmin[positions] - x, x - self.xmax[positions]), 0)
+        dy = np.maximum(np.maximum(self.ymin[positions] - y, y - self.ymax[positions]), 0)
+
+        return np.hypot(dx, dy)
+
+    def nearest(self, x, y, k=1):
+        """
+        The positions and distances of the `k` items nearest (x, y).
+        The searched square doubles in size until the k-th distance
+        is inside it.
+        """
+        k = min(k, len(self))
+        if k == 0:
+            return np.array([], dtype=np.int64), np.array([])
+
+        # start from the distance to the grid for points outside it
+        radius = self.cell_size + _box_distance(self.bounds, x, y)
+        while True:
+            found = self.query(x - radius, y - radius, x + radius, y + radius)
+            if len(found) >= k:
+                distances = self.distance(found, x, y)
+                order = np.argsort(distances, kind="stable")[:k]
+                if distances[order[-1]] <= radius or len(found) == len(self):
+                    return found[order], distances[order]
+            radius *= 2
+
+    @property
+    def bounds(self):
+        if not len(self):
+            return (0.0, 0.0, 0.0, 0.0)
+        return (self.xmin.min(), self.ymin.min(), self.xmax.max(), self.ymax.max())
+
+
+class SpatialIndex(object):
+    """
+    Window, nearest node and point-in-subcatchment queries over the
+    [COORDINATES], [VERTICES] and [POLYGONS] cards of a SWMM inp. The
+    node, link and subcatchment grids are each built on first use.
+    """
+
+    def __init__(self, inp):
+        """
+        Requires:
+        - inp: hymo.SWMMInpFile
+        """
+        self.inp = inp
+
+        self._nodes = None
+        self._links = None
+        self._subcatchments = None
+        self._polygons = None
+
+    @property
+    def nodes(self):
+        """
+        The GridIndex of the node coordinates.
+        """
+        if self._nodes is None:
+            df = self.inp.coordinates
+            self._nodes = GridIndex(df.index.astype(str), df.X_Coord, df.Y_Coord)
+
+        return self._nodes
+
+    @property
+    def links(self):
+        """
+        The GridIndex of the link bounding boxes, spanning the end
+        nodes and the vertices of each link.
+        """
+        if self._links is None:
+            network = self.inp.network
+            coords = self.inp.coordinates
+            coords = coords.set_axis(coords.index.astype(str))
+
+            ends = pd.concat(
+                [
+                    coords.reindex(network.nodes[network.source]).set_axis(network.links),
+                    coords.reindex(network.nodes[network.target]).set_axis(network.links),
+                ]
+            )
+            vertices = self.inp.vertices
+            vertices = vertices.set_axis(vertices.index.astype(str))
+            points = pd.concat([ends, vertices]).dropna()
+
+            boxes = points.groupby(level=0).agg(["min", "max"])
+            self._links = GridIndex(
+                boxes.index,
+                boxes[("X_Coord", "min")], boxes[("Y_Coord", "min")],
+                boxes[("X_Coord", "max")], boxes[("Y_Coord", "max")],
+            )
+
+        return self._links
+
+    @property
+    def subcatchments(self):
+        """
+        The GridIndex of the subcatchment polygon bounding boxes.
+        """
+        if self._subcatchments is None:
+            ids, ptr, x, y = self._polygon_arrays()
+            self._subcatchments = GridIndex(
+                ids,
+                np.minimum.reduceat(x, ptr[:-1]) if len(x) else x,
+                np.minimum.reduceat(y, ptr[:-1]) if len(y) else y,
+                np.maximum.reduceat(x, ptr[:-1]) if len(x) else x,
+                np.maximum.reduceat(y, ptr[:-1]) if len(y) else y,
+            )
+
+        return self._subcatchments
+
+    def _polygon_arrays(self):
+        """
+        The polygon vertices grouped by subcatchment as (ids, ptr, x, y)
+        CSR arrays.
+        """
+        if self._polygons is None:
+            df = self.inp.polygons
+            names = df.index.astype(str)
+            codes, ids = pd.factorize(names)
+            order = np.argsort(codes, kind="stable")
+            ptr = np.zeros(len(ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(codes, minlength=len(ids)), out=ptr[1:])
+            self._polygons = (
+                ids,
+                ptr,
+                df.X_Coord.values[order].astype(np.float64),
+                df.Y_Coord.values[order].astype(np.float64),
+            )
+
+        return self._polygons
+
+    def nodes_in(self, xmin, ymin, xmax, ymax):
+        """
+        The nodes inside the window.
+        """
+        return self.nodes.ids[self.nodes.query(xmin, ymin, xmax, ymax)]
+
+    def links_in(self, xmin, ymin, xmax, ymax):
+        """
+        The links whose bounding box intersects the window.
+        """
+        return self.links.ids[self.links.query(xmin, ymin, xmax, ymax)]
+
+    def subcatchments_in(self, xmin, ymin, xmax, ymax):
+        """
+        The subcatchments whose bounding box intersects the window.
+        """
+        return self.subcatchments.ids[self.subcatchments.query(xmin, ymin, xmax, ymax)]
+
+    def nearest_nodes(self, x, y, k=1):
+        """
+        The `k` nodes nearest to (x, y).
+
+        Returns: pandas.Series of distances indexed by node, nearest
+            first.
+        """
+        positions, distances = self.nodes.nearest(x, y, k)
+
+        return pd.Series(distances, index=self.nodes.ids[positions], name="Distance")
+
+    def subcatchment_at(self, x, y):
+        """
+        The subcatchment whose polygon contains each point, or None.
+
+        Requires:
+        - x, y: float or array-like, the point coordinates.
+
+        Returns: str or None for a single point, otherwise a
+            pandas.Series indexed by point position.
+        """
+        scalar = np.ndim(x) == 0
+        xs, ys = np.atleast_1d(x).astype(np.float64), np.atleast_1d(y).astype(np.float64)
+
+        ids, ptr, px, py = self._polygon_arrays()
+        found = []
+        for xp, yp in zip(xs, ys):
+            match = None
+            for n in self.subcatchments.query(xp, yp, xp, yp):
+                if _contains(px[ptr[n]:ptr[n + 1]], py[ptr[n]:ptr[n + 1]], xp, yp):
+                    match = ids[n]
+                    break
+            found.append(match)
+
+        if scalar:
+            return found[0]
+        return pd.Series(found, name="Subcatchment", dtype=object)
+
+    def match_polygons(self, polygons):
+        """
+        Matches polygons, e.g. from a GIS layer, to the subcatchment
+        whose bounding box overlaps theirs the most (intersection over
+        union), so redrawn or slightly shifted outlines still match.
+
+        Requires:
+        - polygons: pandas.DataFrame with X_Coord and Y_Coord columns
+            indexed by polygon name, laid out like `inp.polygons`.
+
+        Returns: pandas.Series of subcatchment names indexed by polygon,
+            None where no subcatchment overlaps.
+        """
+        boxes = polygons.groupby(level=0, sort=False)[["X_Coord", "Y_Coord"]].agg(
+            ["min", "max"]
+        )
+        grid = self.subcatchments
+
+        matched = []
+        for xmin, xmax, ymin, ymax in boxes.values:
+            candidates = grid.query(xmin, ymin, xmax, ymax)
+            if not len(candidates):
+                matched.append(None)
+                continue
+
+            width = np.minimum(grid.xmax[candidates], xmax) - np.maximum(
+                grid.xmin[candidates], xmin
+            )
+            height = np.minimum(grid.ymax[candidates], ymax) - np.maximum(
+                grid.ymin[candidates], ymin
+            )
+            overlap = width * height
+            union = (
+                (grid.xmax[candidates] - grid.xmin[candidates])
+                * (grid.ymax[candidates] - grid.ymin[candidates])
+                + (xmax - xmin) * (ymax - ymin)
+                - overlap
+            )
+            with np.errstate(divide="ignore", invalid="ignore"):
+                score = np.where(union > 0, overlap / union, 1.0)
+            matched.append(grid.ids[candidates[np.argmax(score)]])
+
+        return pd.Series(matched, index=boxes.index, name="Subcatchment", dtype=object)
+
+
+def _expand(ix0, iy0, ix1, iy1, n_cols):
+    """
+    The (item, cell) pairs of every cell covered by each item's range
+    of cells.
+    """
+    widths = ix1 - ix0 + 1
+    heights = iy1 - iy0 + 1
+    counts = widths * heights
+
+    items = np.repeat(np.arange(len(counts)), counts)
+    # position of each pair within its item's block of cells
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    w = widths[items]
+    cells = (iy0[items] + offset // w) * n_cols + ix0[items] + offset % w
+
+    return items, cells
+
+
+def _box_distance(bounds, x, y):
+    xmin, ymin, xmax, ymax = bounds
+    dx = max(xmin - x, x - xmax, 0)
+    dy = max(ymin - y, y - ymax, 0)
+
+    return float(np.hypot(dx, dy))
+
+
+def _contains(px, py, x, y):
+    """
+    Even-odd ray casting test of (x, y) against a polygon ring.
+    """
+    qx, qy = np.roll(px, -1), np.roll(py, -1)
+    crosses = (py > y) != (qy > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xcross = px + (y - py) * (qx - px) / (qy - py)
+
+    return bool(np.count_nonzero(crosses & (x < xcross)) % 2)
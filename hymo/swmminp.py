@@ -1,7 +1,14 @@
+import os
+import re
+
 import pandas as pd
 import numpy as np
 
 from .base_reader import BaseReader
+from .cache import cached_block
+from .network import Network
+from .spatial import SpatialIndex
+from .swmmtimeseries import SWMMTimeseries
 
 
 class SWMMInpFile(BaseReader):
@@ -9,12 +16,53 @@ class SWMMInpFile(BaseReader):
     A class to read a SWMM model report file.
     """
 
-    def __init__(self, path):
+    # card names are not case sensitive, e.g. [Polygons]
+    _ignore_case = True
+
+    _element_blocks = {
+        "subcatchments": "subcatchment",
+        "subareas": "subcatchment",
+        "infiltration": "subcatchment",
+        "polygons": "subcatchment",
+        "junctions": "node",
+        "outfalls": "node",
+        "storage": "node",
+        "dividers": "node",
+        "coordinates": "node",
+        "inflows": "node",
+        "dwf": "node",
+        "conduits": "link",
+        "orifices": "link",
+        "outlets": "link",
+        "weirs": "link",
+        "pumps": "link",
+        "xsections": "link",
+        "losses": "link",
+        "vertices": "link",
+    }
+
+    def __init__(self, path, cache=None, registry=None, sections=None):
         """
         Requires:
         - path: str, the full file path to the existing SWMM model .inp.
+
+        Optional:
+        - cache: hymo.cache.BlockCache, default=None. Load and store the
+            parsed cards in an on-disk cache.
+        - registry: hymo.registry.ElementRegistry, default=None. Index
+            the node, link and subcatchment cards by codes shared with
+            the model's report, see `hymo.registry`.
+        - sections: list of str, default=None. Only keep the lines of
+            these cards, e.g. ['junctions', 'conduits'], so that large
+            cards such as [TIMESERIES] are never held in memory. Other
+            cards raise a ValueError when accessed.
         """
-        BaseReader.__init__(self, path, endline="[")
+        BaseReader.__init__(
+            self, path, endline="[", cache=cache, registry=registry
+        )
+
+        self.sections = None
+        self.section_index = None
 
         self._title = None
         self._options = None
@@ -43,6 +91,9 @@ class SWMMInpFile(BaseReader):
         self._transects = None
         self._losses = None
         self._timeseries = None
+        self._series = None
+        self._network = None
+        self._spatial = None
         self._report = None
         self._tags = None
         self._map = None
@@ -56,6 +107,7 @@ class SWMMInpFile(BaseReader):
         self._dwf = None
 
         self._not_in_inp = None
+        self._source = None
         self.cards_in_inp = None
         self.not_mapped = set()
 
@@ -118,6 +170,13 @@ class SWMMInpFile(BaseReader):
             # landuses
         }
 
+        if sections is not None:
+            unknown = set(sections).difference(self._startlines)
+            if unknown:
+                e = "Unknown sections: {}".format(sorted(unknown))
+                raise ValueError(e)
+            self.sections = set(sections)
+
         self._check_headers()
 
     def __getattr__(self, name):
@@ -126,32 +185,38 @@ class SWMMInpFile(BaseReader):
         else:
             raise AttributeError(name)
 
-    def find_line_num(self, line, lookup=None):
-        """
-        Given a text string returns the line number that the string
-        appears in.
-
-        Requires:
-        - line: str, text to look up.
-
-        Returns:
-        - n: int, the line number where line exists.
-        """
-        if lookup is None:
-            currentfile = self.orig_file.copy()
-        else:
-            currentfile = lookup.copy()
-        for n, l in enumerate(currentfile):
-            if l.lower().find(line.lower()) > -1:
-                break
-        return n
-
     def BlockDoesNotExistWarning(self):
         raise (NotImplementedError)
         # TODO
         # need some error handling when a block
         # is not in the inp.
 
+    def read_file(self, filename):
+        """
+        Reads the inp, keeping only the card headers and the lines of
+        the requested `sections` if any.
+        """
+        if self.sections is None:
+            return BaseReader.read_file(self, filename)
+
+        if isinstance(filename, str):
+            with open(filename, "r") as openfile:
+                return self._filter_sections(openfile)
+
+        return self._filter_sections(filename)
+
+    def _filter_sections(self, lines):
+        kept = []
+        keep = False
+        for line in lines:
+            if line[:1] == "[":
+                keep = line.split("]")[0][1:].lower() in self.sections
+                kept.append(line)
+            elif keep:
+                kept.append(line)
+
+        return kept
+
     def _check_headers(self):
         # check that all of the header blocks are accounted for
         # raise an error if they are not
@@ -160,9 +225,24 @@ class SWMMInpFile(BaseReader):
 
         known_cards = set(self._startlines.keys())
 
-        cards_in_inp = set(
-            [_.split("]")[0][1:].lower() for _ in self.orig_file if _[0] == "["]
-        )
+        # one pass over the file records the line of every card and
+        # the endline breaks, so the cards never need to be searched for
+        section_index = {}
+        breaks = []
+        for n, line in enumerate(self.orig_file):
+            if line[:1] == "[":
+                section_index.setdefault(line.split("]")[0][1:].lower(), n)
+            if line.find(self.endline) > -1:
+                breaks.append(n)
+
+        self.section_index = section_index
+        self._breaks = breaks
+        self._line_index = {
+            header.lower(): section_index.get(block, len(self.orig_file) - 1)
+            for block, (header, _) in self._startlines.items()
+        }
+
+        cards_in_inp = set(section_index)
         self.cards_in_inp = cards_in_inp
 
         # check if this inp has any cards not mapped
@@ -171,6 +251,109 @@ class SWMMInpFile(BaseReader):
         # check which cards are not in the inp
         self._not_in_inp = known_cards.difference(cards_in_inp)
 
+    def _check_loaded(self, block):
+        if self.sections is not None and block not in self.sections:
+            e = "Card {} was not loaded, see `sections`.".format(block)
+            raise ValueError(e)
+
+    def _make_df(self, block, comment=None, register=True, **kwargs):
+        self._check_loaded(block)
+
+        return BaseReader._make_df(
+            self, block, comment=comment, register=register, **kwargs
+        )
+
+    def write(self, path, cards=None):
+        """
+        Writes the inp to `path`. Only the cards in `cards` are
+        re-serialized; every other section, including comments and
+        spacing, is copied byte for byte from the original file, so
+        writing many variants costs little more than the changed cards.
+
+        Requires:
+        - path: str, the file to write.
+
+        Optional:
+        - cards: dict or list, default=None. {card: pandas.DataFrame} of
+            the cards to replace, e.g. {'subcatchments': df}, or a list
+            of card names to write from this reader's (edited) frames.
+            Cards that are not in the original inp are appended.
+        """
+        if cards is None:
+            cards = {}
+        elif not isinstance(cards, dict):
+            cards = {card: getattr(self, card) for card in cards}
+
+        unknown = set(cards).difference(self._startlines)
+        if unknown:
+            e = "Unknown cards: {}".format(sorted(unknown))
+            raise ValueError(e)
+
+        data, sections = self._section_bytes()
+
+        with open(path, "wb") as openfile:
+            written = set()
+            for card, start, stop in sections:
+                if card in cards and card not in written:
+                    openfile.write(self._render_card(card, cards[card], data[start:stop]))
+                    written.add(card)
+                else:
+                    openfile.write(data[start:stop])
+
+            for card in cards:
+                if card not in written:
+                    header = "\n{}\n".format(self._startlines[card][0]).encode()
+                    openfile.write(self._render_card(card, cards[card], header))
+
+    def _section_bytes(self):
+        """
+        The original file as bytes and the (card, start, stop) byte
+        range of every section, the text before the first card being
+        card None.
+        """
+        if self._source is None:
+            if isinstance(self.path, str):
+                with open(self.path, "rb") as openfile:
+                    data = openfile.read()
+            else:
+                data = self.path.getvalue().encode()
+
+            starts = [(None, 0)] + [
+                (m.group(1).decode().lower(), m.start())
+                for m in re.finditer(rb"^\[([^\]\r\n]*)\]", data, re.M)
+            ]
+            stops = [pos for _, pos in starts[1:]] + [len(data)]
+            sections = [
+                (card, start, stop)
+                for (card, start), stop in zip(starts, stops)
+                if stop > start
+            ]
+            self._source = (memoryview(data), sections)
+
+        return self._source
+
+    def _render_card(self, card, df, original):
+        """
+        The bytes of a card written from `df`, keeping the header and
+        the ';;' column comment lines of the original section.
+        """
+        lines = bytes(original).splitlines(keepends=True)
+        head = []
+        for line in lines:
+            if head and not line.startswith(b";;"):
+                break
+            head.append(line)
+        if head and not head[-1].endswith(b"\n"):
+            head[-1] += b"\n"
+
+        if card == "raingages":
+            # `ID` repeats the series name of TIMESERIES gages
+            df = df.assign(
+                ID=df.ID.where(df.Source.str.lower() != "timeseries")
+            )
+
+        return b"".join(head) + _format_rows(df).encode() + b"\n"
+
     def _clean_comments(self, df, comment=";"):
         drop_list = [_ for _ in df.index if _[0] == comment]
 
@@ -181,7 +364,7 @@ class SWMMInpFile(BaseReader):
         raise (NotImplementedError)
         # will require special parsing as it is just text
 
-    @property
+    @cached_block
     def options(self):
         if self._options is None:
             names = ["Option", "Value"]
@@ -197,7 +380,7 @@ class SWMMInpFile(BaseReader):
 
         return self._options
 
-    @property
+    @cached_block
     def evaporation(self):
         # this might need special parsing.
         # Can't tell from sample
@@ -216,7 +399,7 @@ class SWMMInpFile(BaseReader):
 
         return self._evaporation
 
-    @property
+    @cached_block
     def rdii(self):
         if self._rdii is None:
             names = ["Node", "Unit Hydrograph", "Sewer Area"]
@@ -227,7 +410,7 @@ class SWMMInpFile(BaseReader):
 
         return self._rdii
 
-    @property
+    @cached_block
     def hydrographs(self):
         if self._hydrographs is None:
             names = [
@@ -253,7 +436,7 @@ class SWMMInpFile(BaseReader):
 
         return self._hydrographs
 
-    @property
+    @cached_block
     def dwf(self):
         if self._dwf is None:
             names = [
@@ -300,7 +483,7 @@ class SWMMInpFile(BaseReader):
 
         return self._temperature
 
-    @property
+    @cached_block
     def raingages(self):
         if self._raingages is None:
             names = [
@@ -342,7 +525,7 @@ class SWMMInpFile(BaseReader):
 
         return self._raingages
 
-    @property
+    @cached_block
     def subcatchments(self):
         if self._subcatchments is None:
             names = [
@@ -375,7 +558,7 @@ class SWMMInpFile(BaseReader):
 
         return self._subcatchments
 
-    @property
+    @cached_block
     def subareas(self):
         if self._subareas is None:
             names = [
@@ -406,7 +589,7 @@ class SWMMInpFile(BaseReader):
 
         return self._subareas
 
-    @property
+    @cached_block
     def infiltration(self):
         if self._infiltration is None:
             names = ["Subcatchment", "Suction", "HydCon", "IMDmax"]
@@ -495,7 +678,7 @@ class SWMMInpFile(BaseReader):
 
         return self._groundwater
 
-    @property
+    @cached_block
     def junctions(self):
         if self._junctions is None:
             names = [
@@ -523,7 +706,7 @@ class SWMMInpFile(BaseReader):
 
         return self._junctions
 
-    @property
+    @cached_block
     def outfalls(self):
         if self._outfalls is None:
             names = [
@@ -552,7 +735,7 @@ class SWMMInpFile(BaseReader):
 
         return self._outfalls
 
-    @property
+    @cached_block
     def storage(self):
         if self._storage is None:
             names = [
@@ -584,7 +767,7 @@ class SWMMInpFile(BaseReader):
 
         return self._storage
 
-    @property
+    @cached_block
     def dividers(self):
         if self._dividers is None:
             names = [
@@ -613,7 +796,7 @@ class SWMMInpFile(BaseReader):
 
         return self._dividers
 
-    @property
+    @cached_block
     def conduits(self):
         if self._conduits is None:
             names = [
@@ -642,7 +825,7 @@ class SWMMInpFile(BaseReader):
 
         return self._conduits
 
-    @property
+    @cached_block
     def orifices(self):
         if self._orifices is None:
             names = [
@@ -670,7 +853,7 @@ class SWMMInpFile(BaseReader):
 
         return self._orifices
 
-    @property
+    @cached_block
     def outlets(self):
         if self._outlets is None:
             names = [
@@ -698,7 +881,7 @@ class SWMMInpFile(BaseReader):
 
         return self._outlets
 
-    @property
+    @cached_block
     def weirs(self):
         if self._weirs is None:
             names = [
@@ -730,7 +913,7 @@ class SWMMInpFile(BaseReader):
 
         return self._weirs
 
-    @property
+    @cached_block
     def pumps(self):
         if self._pumps is None:
             names = [
@@ -766,7 +949,7 @@ class SWMMInpFile(BaseReader):
 
         return self._pumps
 
-    @property
+    @cached_block
     def xsections(self):
         if self._xsections is None:
             names = ["Link", "Shape", "Geom1", "Geom2", "Geom3", "Geom4", "Barrels"]
@@ -804,7 +987,7 @@ class SWMMInpFile(BaseReader):
 
         return self._transects
 
-    @property
+    @cached_block
     def losses(self):
         if self._losses is None:
             names = ["Link", "Inlet", "Outlet", "Average", "Flap_Gate", "SeepageRate"]
@@ -826,7 +1009,7 @@ class SWMMInpFile(BaseReader):
 
         return self._losses
 
-    @property
+    @cached_block
     def curves(self):
         if self._curves is None:
             names = ["Name", "Type", "X_Value", "Y_Value"]
@@ -861,7 +1044,7 @@ class SWMMInpFile(BaseReader):
 
         return self._curves
 
-    @property
+    @cached_block
     def timeseries(self):
         if self._timeseries is None:
             names = ["Name", "Date", "Time", "Value"]
@@ -879,6 +1062,45 @@ class SWMMInpFile(BaseReader):
         return self._timeseries
 
     @property
+    def network(self):
+        """
+        The links of the model as a `hymo.network.Network` graph for
+        tracing and accumulation.
+        """
+        if self._network is None:
+            self._network = Network.from_inp(self)
+
+        return self._network
+
+    @property
+    def spatial(self):
+        """
+        A `hymo.spatial.SpatialIndex` of the node coordinates, link
+        vertices and subcatchment polygons.
+        """
+        if self._spatial is None:
+            self._spatial = SpatialIndex(self)
+
+        return self._spatial
+
+    @property
+    def series(self):
+        """
+        The [TIMESERIES] card as a mapping of series name to a float
+        pandas.Series indexed by datetime, or by elapsed time for
+        series without dates. Relative FILE series paths are read from
+        the folder of the .inp. See `hymo.swmmtimeseries.SWMMTimeseries`.
+        """
+        if self._series is None:
+            self._check_loaded("timeseries")
+            directory = None
+            if isinstance(self.path, str):
+                directory = os.path.dirname(os.path.abspath(self.path))
+            self._series = SWMMTimeseries(self.raw_block("timeseries"), directory)
+
+        return self._series
+
+    @cached_block
     def report(self):
         if self._report is None:
             names = ["Param", "Value"]
@@ -893,7 +1115,7 @@ class SWMMInpFile(BaseReader):
 
         return self._report
 
-    @property
+    @cached_block
     def tags(self):
         if self._tags is None:
             names = ["Object", "Name", "Type"]
@@ -922,7 +1144,7 @@ class SWMMInpFile(BaseReader):
 
         return self._map
 
-    @property
+    @cached_block
     def coordinates(self):
         if self._coordinates is None:
             names = ["Node", "X_Coord", "Y_Coord"]
@@ -943,7 +1165,7 @@ class SWMMInpFile(BaseReader):
 
         return self._coordinates
 
-    @property
+    @cached_block
     def vertices(self):
         if self._vertices is None:
             names = ["Link", "X_Coord", "Y_Coord"]
@@ -964,7 +1186,7 @@ class SWMMInpFile(BaseReader):
 
         return self._vertices
 
-    @property
+    @cached_block
     def polygons(self):
         if self._polygons is None:
             names = ["Subcatchment", "X_Coord", "Y_Coord"]
@@ -987,7 +1209,7 @@ class SWMMInpFile(BaseReader):
 
         return self._polygons
 
-    @property
+    @cached_block
     def symbols(self):
         if self._symbols is None:
             names = ["Gage", "X_Coord", "Y_Coord"]
@@ -1004,7 +1226,7 @@ class SWMMInpFile(BaseReader):
 
         return self._symbols
 
-    @property
+    @cached_block
     def pollutants(self):
         if self._pollutants is None:
             names = [
@@ -1033,7 +1255,7 @@ class SWMMInpFile(BaseReader):
 
         return self._pollutants
 
-    @property
+    @cached_block
     def inflows(self):
         if self._inflows is None:
             names = [
@@ -1058,3 +1280,31 @@ class SWMMInpFile(BaseReader):
             )
 
         return self._inflows
+
+
+def _format_rows(df):
+    """
+    Formats the rows of a card as whitespace separated fields padded
+    to a common width per column. Missing values are left out, the
+    inverse of how the cards are read; text with spaces is quoted.
+    """
+    if df.empty:
+        return ""
+
+    columns = [pd.Series(df.index, dtype=object)] + [
+        pd.Series(df[c].values, dtype=object) for c in df.columns
+    ]
+
+    fields = []
+    for values in columns:
+        missing = values.isna()
+        text = values.astype(str)
+        spaced = text.str.contains(" ", regex=False)
+        if spaced.any():
+            text = text.where(~spaced, '"' + text + '"')
+        width = max(16, text[~missing].str.len().max() if (~missing).any() else 0)
+        fields.append(text.str.ljust(width + 1).where(~missing, ""))
+
+    rows = fields[0].str.cat(fields[1:]).str.rstrip()
+
+    return "\n".join(rows) + "\n"
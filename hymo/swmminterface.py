@@ -1,33 +1,80 @@
 from io import StringIO
 
+import numpy as np
 import pandas as pd
 
 from .base_reader import BaseReader
 
+# date part columns that precede the constituents in every row
+DATE_PARTS = ["Year", "Mon", "Day", "Hr", "Min", "Sec"]
+
 class SWMMInterfaceFile(BaseReader):
 
-    def __init__(self, path):
+    def __init__(self, path, memory_map=False):
         """
         Requires:
         - path: str, the full file path to the existing SWMM model .inp.
+
+        Optional:
+        - memory_map: bool, default=False. Read the file through a memory
+            map, see `BaseReader`.
         """
-        BaseReader.__init__(self, path)
+        BaseReader.__init__(self, path, memory_map=memory_map)
 
         self._interface = None
+        self._timeseries = None
         self._header = None
+        self._header_lines = None
         self._units = None
         self._nodes = None
 
+    @property
+    def header_lines(self):
+        """
+        The lines of the file up to and including the column names
+        line. Read from the top of the file without loading the time
+        series when the file has not been read yet.
+        """
+        if self._header_lines is None:
+            if self._orig_file is not None or not isinstance(self.path, str):
+                n_nodes_txt = "number of nodes"
+                node_line_num = self.find_line_num(n_nodes_txt)
+                n_nodes = self.orig_file[node_line_num].split("-")[0].strip()
+                self._header_lines = list(
+                    self.orig_file[: node_line_num + int(n_nodes) + 2]
+                )
+            else:
+                self._header_lines = self._read_header_lines(self.path)
+
+        return self._header_lines
+
+    @staticmethod
+    def _read_header_lines(path):
+        lines = []
+        n_remaining = None
+        with open(path, "r") as openfile:
+            for line in openfile:
+                lines.append(line)
+                if n_remaining is None and line.find("number of nodes") > -1:
+                    # node names plus the column names line
+                    n_remaining = int(line.split("-")[0].strip()) + 1
+                elif n_remaining is not None:
+                    n_remaining -= 1
+                if n_remaining == 0:
+                    break
+
+        return lines
+
     @property
     def nodes(self):
         if self._nodes is None:
             n_nodes_txt = "number of nodes"
-            node_line_num = self.find_line_num(n_nodes_txt)
-            n_nodes = self.orig_file[node_line_num].split("-")[0].strip()
+            node_line_num = self.find_line_num(n_nodes_txt, self.header_lines)
+            n_nodes = self.header_lines[node_line_num].split("-")[0].strip()
 
             _nodes = (
-                self.orig_file[node_line_num +
-                               1: node_line_num + int(n_nodes) + 1]
+                self.header_lines[node_line_num +
+                                  1: node_line_num + int(n_nodes) + 1]
             )
 
             self._nodes = [_.strip() for _ in _nodes]
@@ -38,14 +85,14 @@ class SWMMInterfaceFile(BaseReader):
     def units(self):
         if self._units is None:
             n_const_txt = "number of constituents"
-            n_const = self.orig_file[
-                self.find_line_num(n_const_txt)
+            const_line_num = self.find_line_num(n_const_txt, self.header_lines)
+            n_const = self.header_lines[
+                const_line_num
             ].split("-")[0].strip()
 
-            const_line_num = self.find_line_num(n_const_txt)
             constituent_info = (
-                self.orig_file[const_line_num +
-                               1: const_line_num + int(n_const) + 1]
+                self.header_lines[const_line_num +
+                                  1: const_line_num + int(n_const) + 1]
             )
 
             self._units = {
@@ -58,34 +105,353 @@ class SWMMInterfaceFile(BaseReader):
     @property
     def header(self):
         if self._header is None:
-            n_nodes_txt = "number of nodes"
-            self._header = "".join(
-                self.orig_file[:self.find_line_num(
-                    n_nodes_txt) + len(self.nodes) + 1]
-            )
+            self._header = "".join(self.header_lines[:-1])
 
         return self._header
 
+    @property
+    def columns(self):
+        """
+        The column names of the interface time series.
+        """
+        names = self.infer_columns('Node', -1, 1, lookup=self.header_lines)
+        names[0] = 'Node'
+
+        return names
+
     @property
     def interface(self):
 
         if self._interface is None:
 
-            names = self.infer_columns('Node', -1, 1)
-            names[0] = 'Node'
+            names = self.columns
 
-            skiprows = len(self.header.splitlines())+1
-            
-            block =  ''.join(self.orig_file[skiprows:])
+            skiprows = len(self.header_lines)
+
+            block = self._join_lines(skiprows)
 
             self._interface = (
                 pd.read_csv(
-                    StringIO(block), 
+                    StringIO(block),
                     sep='\s+', header=None,
-                    names=names, 
+                    names=names,
                     index_col=None,
                 )
             )
 
 
         return self._interface
+
+    def iter_interface(self, chunksize=1000):
+        """
+        Iterates over the interface time series without reading the
+        whole file into memory.
+
+        Optional:
+        - chunksize: int, default=1000. The number of time steps in
+            each chunk. Every time step has one row per node.
+
+        Returns:
+        - chunks: generator of pandas.DataFrame with the same columns
+            as `interface`.
+        """
+        names = self.columns
+        skiprows = len(self.header_lines)
+        nrows = chunksize * len(self.nodes)
+
+        if isinstance(self.path, str):
+            openfile = open(self.path, "r")
+        else:
+            # file-likes are read once, into `orig_file`
+            openfile = StringIO(self._join_lines(skiprows))
+            skiprows = 0
+
+        with openfile:
+            reader = pd.read_csv(
+                openfile,
+                sep='\s+', header=None,
+                names=names,
+                index_col=None,
+                skiprows=skiprows,
+                chunksize=nrows,
+            )
+            for chunk in reader:
+                yield chunk
+
+    @property
+    def timeseries(self):
+        """
+        The interface time series with the date part columns assembled
+        into a single DatetimeIndex. The fixed-width rows are decoded
+        directly from a byte matrix, falling back to the C parser when
+        the rows are not of equal width.
+
+        Returns: pandas.DataFrame with a categorical `Node` column and
+            one float64 column per constituent.
+        """
+        if self._timeseries is None:
+            matrix, spans = self._row_matrix()
+
+            if matrix is not None:
+                df = self._parse_fixed_width(matrix, spans)
+            else:
+                df = pd.read_csv(
+                    StringIO(self._data_bytes().decode()),
+                    delim_whitespace=True, header=None,
+                    names=self._names, usecols=range(len(self._names)),
+                )
+                df["Node"] = pd.Categorical(df["Node"], categories=self.nodes)
+                dates = pd.to_datetime(
+                    df[DATE_PARTS].set_axis(
+                        ["year", "month", "day", "hour", "minute", "second"], axis=1
+                    )
+                )
+                df = df.drop(columns=DATE_PARTS).set_index(
+                    pd.DatetimeIndex(dates, name="Datetime")
+                )
+
+            self._timeseries = df
+
+        return self._timeseries
+
+    def cube(self, dtype=np.float64):
+        """
+        The interface time series as a dense array indexed by
+        [time, node, constituent]. Values are written straight into a
+        preallocated array without pivoting a long table.
+
+        Optional:
+        - dtype: numpy dtype, default=np.float64. Use np.float32 to halve
+            the memory of the cube.
+
+        Returns: InterfaceCube
+        """
+        constituents = list(self.units)
+        n_nodes, n_const = len(self.nodes), len(constituents)
+
+        matrix, spans = self._row_matrix()
+        if matrix is not None and self._nodes_in_order(matrix, spans):
+            n_steps = matrix.shape[0] // n_nodes
+            values = np.empty((n_steps, n_nodes, n_const), dtype=dtype)
+            for c in range(n_const):
+                values[:, :, c] = _field(
+                    matrix, spans[len(DATE_PARTS) + 1 + c]
+                ).astype(dtype).reshape(n_steps, n_nodes)
+            times = _dates(matrix, spans, slice(None, None, n_nodes))
+        else:
+            df = self.timeseries
+            times = df.index.unique()
+            values = np.full((len(times), n_nodes, n_const), np.nan, dtype=dtype)
+            values[times.get_indexer(df.index), df["Node"].cat.codes.values, :] = (
+                df[constituents].values
+            )
+
+        return InterfaceCube(
+            values, pd.DatetimeIndex(times, name="Datetime"), self.nodes, constituents
+        )
+
+    @property
+    def _names(self):
+        # drop the unnamed column from trailing whitespace
+        return [_ for _ in self.columns if _]
+
+    def _row_matrix(self):
+        """
+        The data rows as a (rows, row width) uint8 matrix and the
+        (start, stop) span of each column, or (None, None) if the rows
+        are not of equal width or their fields do not line up with the
+        column names, e.g. a value wider than its column.
+        """
+        data = self._data_bytes()
+
+        row_len = data.find(b"\n") + 1
+        if row_len == 0 or len(data) % row_len != 0:
+            return None, None
+
+        matrix = np.frombuffer(data, dtype=np.uint8).reshape(-1, row_len)
+        if not (matrix[:, -1] == ord("\n")).all():
+            return None, None
+
+        spans = [
+            (a, b if b is not None else row_len - 1)
+            for a, b in self._column_spans(self.header_lines[-1])
+        ]
+        if not _aligned(matrix, spans):
+            return None, None
+
+        return matrix, spans
+
+    def _data_bytes(self):
+        """
+        The raw bytes of the rows after the header, always ending in a
+        newline.
+        """
+        skiprows = len(self.header_lines)
+        if self.memory_map and isinstance(self.path, str):
+            data = self.orig_file.raw(skiprows, len(self.orig_file))
+        elif isinstance(self.path, str):
+            with open(self.path, "rb") as openfile:
+                for _ in range(skiprows):
+                    openfile.readline()
+                data = openfile.read()
+        else:
+            data = self._join_lines(skiprows).encode()
+
+        if data.find(b"\r\n", 0, data.find(b"\n") + 1) > -1:
+            data = data.replace(b"\r\n", b"\n")
+        if data and not data.endswith(b"\n"):
+            data += b"\n"
+
+        return data
+
+    @staticmethod
+    def _column_spans(column_line):
+        """
+        The (start, stop) character positions of each column. SWMM
+        left-aligns each value under the first character of its column
+        name, so the spans run from one name to the next.
+        """
+        column_line = column_line.rstrip("\r\n")
+        starts = [
+            n for n, c in enumerate(column_line)
+            if c != " " and (n == 0 or column_line[n - 1] == " ")
+        ]
+        stops = starts[1:] + [None]
+
+        return list(zip(starts, stops))
+
+    def _nodes_in_order(self, matrix, spans):
+        """
+        True if every time step lists the nodes in the header order.
+        """
+        n_nodes = len(self.nodes)
+        if matrix.shape[0] % n_nodes != 0:
+            return False
+
+        a, b = spans[0]
+        nodes = _field(matrix, spans[0])
+        node_bytes = np.array(
+            [_.ljust(b - a).encode() for _ in self.nodes], dtype=nodes.dtype
+        )
+
+        return (nodes.reshape(-1, n_nodes) == node_bytes).all()
+
+    def _parse_fixed_width(self, matrix, spans):
+        """
+        Decodes the uint8 row matrix of a fixed width interface file.
+        """
+        n_nodes = len(self.nodes)
+        if self._nodes_in_order(matrix, spans):
+            codes = np.tile(np.arange(n_nodes), matrix.shape[0] // n_nodes)
+            node = pd.Categorical.from_codes(codes, categories=self.nodes)
+            # the date is repeated for every node in a time step
+            dates = np.repeat(_dates(matrix, spans, slice(None, None, n_nodes)), n_nodes)
+        else:
+            nodes = np.char.strip(np.char.decode(_field(matrix, spans[0])))
+            node = pd.Categorical(nodes, categories=self.nodes)
+            dates = _dates(matrix, spans, slice(None))
+
+        data = {"Node": node}
+        for n, name in enumerate(self._names):
+            if n > len(DATE_PARTS):
+                data[name] = _field(matrix, spans[n]).astype(np.float64)
+
+        return pd.DataFrame(data, index=pd.DatetimeIndex(dates, name="Datetime"))
+
+
+class InterfaceCube(object):
+    """
+    A dense [time, node, constituent] array of an interface file.
+    """
+
+    def __init__(self, values, times, nodes, constituents):
+        """
+        Requires:
+        - values: numpy.ndarray, shape (n_times, n_nodes, n_constituents).
+        - times: pandas.DatetimeIndex, the time of each step.
+        - nodes: list, the node names.
+        - constituents: list, the constituent names.
+        """
+        self.values = values
+        self.times = times
+        self.nodes = list(nodes)
+        self.constituents = list(constituents)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def node(self, name):
+        """
+        A (time, constituent) view of the values of one node.
+        """
+        return self.values[:, self.nodes.index(name), :]
+
+    def constituent(self, name):
+        """
+        A (time, node) view of the values of one constituent.
+        """
+        return self.values[:, :, self.constituents.index(name)]
+
+    def to_frame(self, constituent):
+        """
+        A time x node DataFrame of one constituent.
+        """
+        return pd.DataFrame(
+            self.constituent(constituent), index=self.times, columns=self.nodes
+        )
+
+
+def _aligned(matrix, spans):
+    """
+    True if every field starts after a blank on every row and the date
+    part fields hold only digits and blanks.
+    """
+    blank = ord(" ")
+    for a, b in spans[1:]:
+        if not (matrix[:, a - 1] == blank).all():
+            return False
+
+    for a, b in spans[1 : len(DATE_PARTS) + 1]:
+        field = matrix[:, a:b]
+        digits = (field >= ord("0")) & (field <= ord("9"))
+        if not (digits | (field == blank)).all():
+            return False
+
+    return True
+
+
+def _field(matrix, span):
+    """
+    The bytes of one column as a fixed width string array.
+    """
+    a, b = span
+    return np.ascontiguousarray(matrix[:, a:b]).view("S{}".format(b - a)).ravel()
+
+
+def _integer(matrix, span, rows):
+    """
+    Parses a column of left-aligned digits followed by blanks.
+    """
+    a, b = span
+    digits = matrix[rows, a:b].astype(np.int64) - ord("0")
+    is_digit = (digits >= 0) & (digits <= 9)
+    n_digits = is_digit.sum(axis=1, keepdims=True)
+    power = np.clip(n_digits - 1 - np.arange(b - a), 0, None)
+    return (np.where(is_digit, digits, 0) * 10 ** power).sum(axis=1)
+
+
+def _dates(matrix, spans, rows):
+    """
+    Assembles the date part columns of `rows` into datetime64 values.
+    """
+    year, mon, day, hr, minute, sec = [
+        _integer(matrix, spans[n], rows) for n in range(1, len(DATE_PARTS) + 1)
+    ]
+
+    dates = (
+        ((year - 1970) * 12 + mon - 1).astype("datetime64[M]").astype("datetime64[D]")
+        + (day - 1).astype("timedelta64[D]")
+    ).astype("datetime64[ns]")
+
+    return dates + (hr * 3600 + minute * 60 + sec).astype("timedelta64[s]")
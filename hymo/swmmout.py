@@ -0,0 +1,297 @@
+import numpy as np
+import pandas as pd
+
+MAGIC_NUMBER = 516114522
+
+# SWMM stores times as days since this date
+EPOCH = pd.Timestamp("1899-12-30")
+
+FLOW_UNITS = ["CFS", "GPM", "MGD", "CMS", "LPS", "MLD"]
+CONCENTRATION_UNITS = ["MG/L", "UG/L", "COUNTS/L"]
+NODE_TYPES = ["JUNCTION", "OUTFALL", "STORAGE", "DIVIDER"]
+LINK_TYPES = ["CONDUIT", "PUMP", "ORIFICE", "WEIR", "OUTLET"]
+
+# reported variables ahead of the pollutants, in file order
+SUBCATCHMENT_VARS = [
+    "Rainfall",
+    "Snow_Depth",
+    "Evaporation_Loss",
+    "Infiltration_Loss",
+    "Runoff",
+    "Groundwater_Flow",
+    "Groundwater_Elevation",
+    "Soil_Moisture",
+]
+NODE_VARS = [
+    "Depth",
+    "Head",
+    "Volume",
+    "Lateral_Inflow",
+    "Total_Inflow",
+    "Flooding",
+]
+LINK_VARS = ["Flow", "Depth", "Velocity", "Volume", "Capacity"]
+SYSTEM_VARS = [
+    "Air_Temperature",
+    "Rainfall",
+    "Snow_Depth",
+    "Infiltration_Loss",
+    "Runoff",
+    "Dry_Weather_Inflow",
+    "Groundwater_Inflow",
+    "RDII_Inflow",
+    "Direct_Inflow",
+    "Total_Lateral_Inflow",
+    "Flooding",
+    "Outflow",
+    "Storage_Volume",
+    "Evaporation",
+    "Potential_Evaporation",
+]
+
+# (period record field, index name) of each element kind
+KINDS = {
+    "subcatchment": ("subcatchments", "Subcatchment"),
+    "node": ("nodes", "Node"),
+    "link": ("links", "Link"),
+}
+
+
+class SWMMOutputFile(object):
+    """
+    A reader of the SWMM 5 binary output (.out) file. The file is
+    memory mapped and the computed results are viewed as an array of
+    fixed size period records, so any period is found in O(1) and
+    slices by element, variable and period are NumPy views into the
+    map; nothing is read until it is used.
+    """
+
+    def __init__(self, path, registry=None):
+        """
+        Requires:
+        - path: str, the full file path to the existing SWMM .out.
+
+        Optional:
+        - registry: hymo.registry.ElementRegistry, default=None. Index
+            the elements by codes shared with the model's other readers.
+        """
+        self.path = path
+        self.registry = registry
+
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        self._pos = 0
+
+        (
+            magic, self.version, flow_units,
+            n_subcatchments, n_nodes, n_links, n_pollutants,
+        ) = self._ints(0, 7)
+        id_pos, input_pos, output_pos, self.n_periods, self.error_code, end_magic = (
+            self._ints(len(self._map) - 24, 6)
+        )
+        if magic != MAGIC_NUMBER or end_magic != MAGIC_NUMBER:
+            e = "{} is not a SWMM binary output file.".format(path)
+            raise ValueError(e)
+
+        self.flow_unit = FLOW_UNITS[flow_units]
+
+        # element names
+        self._pos = id_pos
+        self.subcatchments = self._names(n_subcatchments, "Subcatchment")
+        self.nodes = self._names(n_nodes, "Node")
+        self.links = self._names(n_links, "Link")
+        self.pollutants = list(self._names(n_pollutants, "Pollutant"))
+        self.pollutant_units = [
+            CONCENTRATION_UNITS[_] for _ in self._ints(self._pos, n_pollutants)
+        ]
+
+        # element properties
+        self._pos = input_pos
+        self.subcatchment_properties = self._properties(self.subcatchments, ["Area"])
+        self.node_properties = self._properties(
+            self.nodes, ["Type", "Invert_Elev", "Max_Depth"], NODE_TYPES
+        )
+        self.link_properties = self._properties(
+            self.links,
+            ["Type", "Inlet_Offset", "Outlet_Offset", "Max_Depth", "Length"],
+            LINK_TYPES,
+        )
+
+        # reported variables
+        self.subcatchment_vars = self._variables(SUBCATCHMENT_VARS)
+        self.node_vars = self._variables(NODE_VARS)
+        self.link_vars = self._variables(LINK_VARS)
+        self.system_vars = self._variables(SYSTEM_VARS, pollutants=False)
+
+        start = np.frombuffer(self._map, dtype="<f8", count=1, offset=self._pos)[0]
+        self.start_date = (EPOCH + pd.to_timedelta(start, unit="D")).round("s")
+        self.report_step = pd.Timedelta(
+            seconds=int(self._ints(self._pos + 8, 1)[0])
+        )
+
+        self.period_dtype = np.dtype(
+            [
+                ("time", "<f8"),
+                ("subcatchments", "<f4", (n_subcatchments, len(self.subcatchment_vars))),
+                ("nodes", "<f4", (n_nodes, len(self.node_vars))),
+                ("links", "<f4", (n_links, len(self.link_vars))),
+                ("system", "<f4", (len(self.system_vars),)),
+            ]
+        )
+        self.results = np.memmap(
+            path, dtype=self.period_dtype, mode="r",
+            offset=output_pos, shape=(self.n_periods,),
+        )
+
+        self._times = None
+
+    def _ints(self, pos, count):
+        return np.frombuffer(self._map, dtype="<i4", count=count, offset=pos)
+
+    def _names(self, count, name):
+        names = []
+        for _ in range(count):
+            length = int(self._ints(self._pos, 1)[0])
+            start = self._pos + 4
+            names.append(bytes(self._map[start:start + length]).decode())
+            self._pos = start + length
+
+        if self.registry is not None and name in ("Subcatchment", "Node", "Link"):
+            return self.registry.index(name.lower(), names, name=name)
+        return pd.Index(names, name=name)
+
+    def _properties(self, index, names, types=None):
+        n_props = int(self._ints(self._pos, 1)[0])
+        self._pos += 4 * (1 + n_props)  # the count and the property codes
+
+        values = np.frombuffer(
+            self._map, dtype="<f4", count=len(index) * n_props, offset=self._pos
+        ).reshape(len(index), n_props)
+        self._pos += values.nbytes
+
+        df = pd.DataFrame(values.astype(np.float64), index=index, columns=names[:n_props])
+        if types is not None and "Type" in df:
+            df["Type"] = pd.Categorical.from_codes(df["Type"].astype(int), types)
+
+        return df
+
+    def _variables(self, names, pollutants=True):
+        n_vars = int(self._ints(self._pos, 1)[0])
+        self._pos += 4 * (1 + n_vars)
+
+        names = list(names) + (self.pollutants if pollutants else [])
+        names += ["Var_{}".format(n) for n in range(len(names), n_vars)]
+
+        return names[:n_vars]
+
+    @property
+    def times(self):
+        """
+        The DatetimeIndex of the reporting periods.
+        """
+        if self._times is None:
+            days = np.asarray(self.results["time"], dtype=np.float64)
+            seconds = np.round(days * 86400).astype("timedelta64[s]")
+            self._times = pd.DatetimeIndex(
+                EPOCH.to_datetime64() + seconds, name="Datetime"
+            )
+
+        return self._times
+
+    def period_of(self, time):
+        """
+        The period number of a timestamp, computed from the report
+        step without searching.
+        """
+        n = (pd.Timestamp(time) - self.start_date) // self.report_step - 1
+        if not 0 <= n < self.n_periods:
+            e = "{} is outside of the reporting periods.".format(time)
+            raise KeyError(e)
+
+        return int(n)
+
+    def period(self, n):
+        """
+        The record of period `n`: a NumPy structured scalar whose
+        `subcatchments`, `nodes`, `links` and `system` fields are views
+        of (element, variable) arrays.
+        """
+        return self.results[n]
+
+    def values(self, kind, element=None, variable=None, periods=None):
+        """
+        A zero-copy view of the results of one element kind.
+
+        Requires:
+        - kind: str, one of 'subcatchment', 'node', 'link' or 'system'.
+
+        Optional:
+        - element: str or int, default=None. One element, by name or
+            position. None returns every element.
+        - variable: str or int, default=None. One variable, by name or
+            position. None returns every variable.
+        - periods: int or slice, default=None. The periods to return.
+
+        Returns: numpy.ndarray indexed by [period, element, variable]
+            with the selected axes dropped.
+        """
+        field, names, variables = self._kind(kind)
+
+        key = [slice(None) if periods is None else periods]
+        if field != "system":
+            key.append(slice(None) if element is None else self._position(names, element))
+        key.append(slice(None) if variable is None else self._position(variables, variable))
+
+        return self.results[field][tuple(key)]
+
+    def series(self, kind, element, variable):
+        """
+        The time series of one variable of one element.
+
+        Returns: pandas.Series indexed by `times`.
+        """
+        values = self.values(kind, element, variable)
+
+        return pd.Series(values, index=self.times, name=str(element))
+
+    def frame(self, kind, variable, periods=None):
+        """
+        One variable of every element of a kind as a time x element
+        DataFrame.
+        """
+        field, names, _ = self._kind(kind)
+        values = self.values(kind, variable=variable, periods=periods)
+        times = self.times if periods is None else self.times[periods]
+
+        columns = names if field != "system" else [variable]
+        if field == "system":
+            values = values.reshape(-1, 1)
+
+        return pd.DataFrame(values, index=times, columns=columns)
+
+    def _kind(self, kind):
+        if kind == "system":
+            return "system", None, self.system_vars
+        if kind not in KINDS:
+            e = "`kind` must be one of {}.".format(sorted(KINDS) + ["system"])
+            raise ValueError(e)
+
+        field, _ = KINDS[kind]
+        return field, getattr(self, field), getattr(self, kind + "_vars")
+
+    @staticmethod
+    def _position(names, key):
+        if isinstance(key, (int, np.integer)):
+            return int(key)
+        if isinstance(names, pd.Index):
+            return names.get_loc(key)
+        return list(names).index(key)
+
+    def close(self):
+        """
+        Releases the memory maps.
+        """
+        for name in ("results", "_map"):
+            mapped = getattr(self, name, None)
+            if mapped is not None and getattr(mapped, "_mmap", None) is not None:
+                mapped._mmap.close()
+            setattr(self, name, None)
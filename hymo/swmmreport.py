@@ -1,4 +1,8 @@
+from bisect import bisect_right
+import re
+
 from .base_reader import BaseReader
+from .cache import cached_block
 
 import pandas as pd
 
@@ -8,27 +12,62 @@ class SWMMReportFile(BaseReader):
     A class to read a SWMM model report file.
     """
 
-    def __init__(self, path):
+    _element_blocks = {
+        "subcatchment_summary": "subcatchment",
+        "subcatchment_runoff": "subcatchment",
+        "node_summary": "node",
+        "node_depth": "node",
+        "node_inflow": "node",
+        "node_surcharge": "node",
+        "node_flooding": "node",
+        "storage_volume": "node",
+        "outfall_loading": "node",
+        "link_summary": "link",
+        "cross_section_summary": "link",
+        "link_flow": "link",
+        "flow_classification": "link",
+        "conduit_surcharge": "link",
+        "link_pollutant_load": "link",
+    }
+
+    def __init__(
+        self,
+        path,
+        memory_map=False,
+        eager=False,
+        cache=None,
+        compact=False,
+        registry=None,
+    ):
         """
         Requires:
         - path: str, the full file path to the existing SWMM model .inp.
-        """
-        BaseReader.__init__(self, path)
 
-        # check units
-        self.unit = (
-            self.orig_file[self.find_line_num("Flow Units")]
-            .split(".")[-1]
-            .strip()
-            .upper()
+        Optional:
+        - memory_map: bool, default=False. Read the file through a memory
+            map, see `BaseReader`.
+        - eager: bool, default=False. Parse every block on construction,
+            see `parse_all()`.
+        - cache: hymo.cache.BlockCache, default=None. Load and store the
+            parsed blocks in an on-disk cache.
+        - compact: bool, default=False. Store the blocks with compact
+            dtypes, see `compact_frame()`.
+        - registry: hymo.registry.ElementRegistry, default=None. Index
+            the node, link and subcatchment blocks by shared codes, see
+            `element_results()`.
+        """
+        BaseReader.__init__(
+            self, path, memory_map=memory_map, cache=cache, registry=registry
         )
 
-        # check swmm version
-        self.version = (
-            self.orig_file[self.find_line_num("VERSION")].split(" - ")[1].split(" ")[1]
-        )
+        self.compact = compact
 
-        self._headers = _ReportHeaders(self.unit)
+        # unit and version are read on first use, see `probe()`
+        self._unit = None
+        self._version = None
+        self._probed = False
+        self._report_headers = None
+        self._blocks_found = None
 
         # INPUTS == YES Blocks
         self._element_count = None
@@ -82,7 +121,226 @@ class SWMMReportFile(BaseReader):
             "link_pollutant_load": ("Link Pollutant Load Summary", 7),
         }
 
+        if eager:
+            self.parse_all()
+
+    @staticmethod
+    def probe(path):
+        """
+        Reads the flow unit, SWMM version and element counts from the
+        top of a report file, without reading the whole report.
+
+        Without INPUTS = YES the "Flow Units" option follows the version
+        within a few lines and reading stops there. With it, SWMM writes
+        the element counts and then the input summaries (nodes, links,
+        ...) before the options, which can be megabytes on big models,
+        so reading stops at the first input summary and the unit is
+        None.
+
+        Requires:
+        - path: str, the full file path to the existing SWMM report file.
+
+        Returns:
+        - info: dict, with keys 'unit', 'version' and 'element_count',
+            a dict of the element counts if the report has them
+            (INPUTS = YES), else empty. 'unit' is None if it was not
+            found before the input summaries.
+        """
+        names, _ = _ReportHeaders("CFS").element_count
+
+        info = {"unit": None, "version": None, "element_count": {}}
+        counting = None
+        with open(str(path), "r") as openfile:
+            for line in openfile:
+                if info["version"] is None and line.find("VERSION") > -1:
+                    info["version"] = _parse_version(line)
+                elif line.find("Element Count") > -1:
+                    counting = 0
+                elif counting is not None:
+                    # skip the line under the header
+                    parts = re.split(r"\.{2,}", line)
+                    if counting > 0 and len(parts) == 2 and counting <= len(names):
+                        info["element_count"][names[counting - 1]] = int(parts[1])
+                    elif counting > 0:
+                        counting = None
+                        continue
+                    counting += 1
+                elif line.find("Flow Units") > -1:
+                    info["unit"] = _parse_unit(line)
+                    break
+                elif line.strip() in _INPUT_SUMMARIES:
+                    # the options follow all of the input summaries
+                    break
+
+        return info
+
+    def _read_unit_version(self):
+        """
+        Reads the unit and version once: from `probe()` if it finds the
+        unit, else from the lines of the file. Either is left as None
+        if its line is missing, and the result is kept so later lookups
+        do not read the file again.
+        """
+        if self._probed:
+            return
+
+        if self._orig_file is None and isinstance(self.path, str):
+            info = self.probe(self.path)
+            self._unit, self._version = info["unit"], info["version"]
+
+        if self._unit is None:
+            # not probed, or the options follow the input summaries
+            line = self._line_with("Flow Units")
+            self._unit = None if line is None else _parse_unit(line)
+            line = self._line_with("VERSION")
+            self._version = None if line is None else _parse_version(line)
+
+        self._probed = True
+
+    def _line_with(self, text):
+        """
+        The first line containing `text` or None.
+        """
+        n = self.find_line_num(text)
+        if n < 0 or self.orig_file[n].find(text) < 0:
+            return None
+        return self.orig_file[n]
+
     @property
+    def unit(self):
+        """
+        The flow unit of the report, e.g. 'CFS'. Raises ValueError if
+        the report has no "Flow Units" line.
+        """
+        self._read_unit_version()
+        if self._unit is None:
+            e = "No 'Flow Units' line in {}, is it a SWMM report file?".format(self.path)
+            raise ValueError(e)
+        return self._unit
+
+    @property
+    def version(self):
+        """
+        The SWMM version that wrote the report, e.g. '5.1', or None if
+        the report has no version line.
+        """
+        self._read_unit_version()
+        return self._version
+
+    @property
+    def _headers(self):
+        if self._report_headers is None:
+            self._report_headers = _ReportHeaders(self.unit)
+        return self._report_headers
+
+    def parse_all(self):
+        """
+        Parses every known block in the report. The file is walked once
+        with a state machine that records the bounds of each block it
+        finds and the lines every other lookup needs, then all of the
+        block properties are filled from those bounds, along with the
+        continuity blocks. Blocks that are not in
+        the report are skipped.
+
+        Returns: self
+        """
+        found = self._sweep_blocks()
+
+        for block in found:
+            if hasattr(type(self), block):
+                getattr(self, block)
+            else:
+                getattr(self, block + "_results")
+
+        self.runoff_quantity_continuity
+        self.flow_routing_continuity
+
+        return self
+
+    def element_results(self, name, kind="node"):
+        """
+        The rows of one element in every block of its kind in the
+        report, looked up by its registry code.
+
+        Requires:
+        - name: str, the node, link or subcatchment name.
+
+        Optional:
+        - kind: str, default='node'. One of 'node', 'link' or
+            'subcatchment'.
+
+        Returns: dict, {block property: pandas.DataFrame}
+        """
+        if self.registry is None:
+            e = "`element_results` requires a `registry`."
+            raise ValueError(e)
+
+        if self._blocks_found is None:
+            self._blocks_found = self._sweep_blocks()
+
+        frames = {}
+        for block in self._blocks_found:
+            if self._element_blocks.get(block) == kind:
+                prop = block if hasattr(type(self), block) else block + "_results"
+                frames[prop] = getattr(self, prop)
+
+        return self.registry.select(frames, kind, name)
+
+    def _sweep_blocks(self):
+        """
+        Walks the report once, recording the (start, stop) bounds of
+        every `_startlines` block, the endline breaks and the lines of
+        the headers, continuity blocks, unit and version, so nothing
+        read afterwards needs to index the file again.
+
+        Returns: list of the blocks found, in file order.
+        """
+        headers = {header: block for block, (header, _) in self._startlines.items()}
+
+        # looked up by `find_line_num` outside of the blocks
+        pending = list(_SWEEP_LINES)
+
+        found = []
+        breaks = []
+        line_index = {}
+        current = None  # (block, first data line)
+        for n, line in enumerate(self.orig_file):
+            if line.find(self.endline) > -1:
+                breaks.append(n)
+                if current is not None and n > current[1]:
+                    self._bounds.setdefault(current[0], (current[1], n))
+                    current = None
+
+            key = line.strip()
+            if key in headers and headers[key] not in found:
+                block = headers[key]
+                found.append(block)
+                line_index[key] = n
+                current = (block, n + self._startlines[block][1])
+
+            if pending:
+                for text in [_ for _ in pending if line.find(_) > -1]:
+                    line_index[text] = n
+                    pending.remove(text)
+
+        if current is not None:
+            self._bounds.setdefault(current[0], (current[1], len(self.orig_file)))
+
+        if self._breaks is None:
+            self._breaks = breaks
+        if self._line_index is None:
+            # missing lines map to the last line, as in `_scan()`
+            last = len(self.orig_file) - 1
+            self._line_index = {
+                text: line_index.get(text, last)
+                for text in list(headers) + list(_SWEEP_LINES)
+            }
+
+        self._read_unit_version()
+
+        return found
+
+    @cached_block
     def element_count(self):
         """
         The number of elements used in your simulation.
@@ -110,7 +368,7 @@ class SWMMReportFile(BaseReader):
 
         return self._element_count
 
-    @property
+    @cached_block
     def raingage_summary(self):
         if self._raingage_summary is None:
             names, dtype = self._headers.raingage_summary
@@ -126,7 +384,7 @@ class SWMMReportFile(BaseReader):
 
         return self._raingage_summary
 
-    @property
+    @cached_block
     def subcatchment_summary(self):
         # TODO There is a bug in the SWMM Report File generator that doesn't put a space between the Area and Width
         # if the Area is too large. We need to split it based on two places after the decimal point.
@@ -144,7 +402,7 @@ class SWMMReportFile(BaseReader):
 
         return self._subcatchment_summary
 
-    @property
+    @cached_block
     def node_summary(self):
         if self._node_summary is None:
             names, dtype = self._headers.node_summary
@@ -160,7 +418,7 @@ class SWMMReportFile(BaseReader):
 
         return self._node_summary
 
-    @property
+    @cached_block
     def link_summary(self):
         if self._link_summary is None:
             names, dtype = self._headers.link_summary
@@ -176,7 +434,7 @@ class SWMMReportFile(BaseReader):
 
         return self._link_summary
 
-    @property
+    @cached_block
     def cross_section_summary(self):
         if self._cross_section_summary is None:
             names, dtype = self._headers.cross_section_summary
@@ -191,93 +449,96 @@ class SWMMReportFile(BaseReader):
             )
         return self._cross_section_summary
 
-    @property
+    @cached_block
     def runoff_quantity_continuity(self):
         if self._runoff_quantity_continuity is None:
             names, dtype = self._headers.runoff_quantity_continuity
 
-            var_conversion = {
-                "Total Precipitation": "Total_Precipitation",
-                "Evaporation Loss": "Evaporation_Loss",
-                "Infiltration Loss": "Infiltration_Loss",
-                "Surface Runoff": "Surface_Runoff",
-                "Final Storage": "Final_Storage",
-                "Continuity Error (%)": "Continuity_Error_pcnt",
-            }
-
-            self._runoff_quantity_continuity = pd.DataFrame(columns=names)
-            for var in var_conversion:
-                line_number = self.find_line_num(var)
-                data = self.orig_file[line_number].split()
-                if var != "Continuity Error (%)":
-                    data = pd.Series(
-                        [data[3], data[4]],
-                        index=[names[0], names[1]],
-                        name=var_conversion[var],
-                    )
-                else:
-                    data = pd.Series(
-                        [data[4], data[4]],
-                        index=[names[0], names[1]],
-                        name=var_conversion[var],
-                    )
-
-                self._runoff_quantity_continuity = self._runoff_quantity_continuity.append(
-                    data
-                )
+            self._runoff_quantity_continuity = self._continuity_block(
+                "Runoff Quantity Continuity", names, RUNOFF_CONTINUITY_NAMES
+            )
 
         return self._runoff_quantity_continuity
 
-    @property
+    @cached_block
     def flow_routing_continuity(self):
         if self._flow_routing_continuity is None:
             names, dtype = self._headers.flow_routing_continuity
 
-            var_conversion = {
-                "Dry Weather Inflow": "Dry_Weather_Inflow",
-                "Wet Weather Inflow": "Wet_Weather_Inflow",
-                "Groundwater Inflow": "Groundwater_Inflow",
-                "RDII Inflow": "RDII_Inflow",
-                "External Inflow": "External_Inflow",
-                "External Outflow": "External_Outflow",
-                "Flooding Loss": "Flooding_Loss",
-                "Evaporation Loss": "Evaporation_Loss",
-                "Exfiltration Loss": "Exfiltration_Loss",
-                "Initial Stored Volume": "Intial_Stored_Volume",
-                "Final Stored Volume": "Final_Stored_Volume",
-                "Continuity Error (%)": "Continuity_Error_pcnt",
-            }
+            self._flow_routing_continuity = self._continuity_block(
+                "Flow Routing Continuity", names, ROUTING_CONTINUITY_NAMES
+            )
 
-            self._flow_routing_continuity = pd.DataFrame(columns=names)
-            for var in var_conversion:
-                line_number = self.find_line_num(var)
-
-                # There are two 'Evaporation Loss' sections: This will find the second one
-                if var == "Evaporation Loss":
-                    subdata = self.orig_file[line_number + 1 :]
-                    line_number = self.find_line_num(var, lookup=subdata) + line_number
-
-                data = list(filter(lambda x: "." in x, self.orig_file[line_number].split()))
-
-                if var != "Continuity Error (%)":
-                    data = pd.Series(
-                        [data[1], data[2]],
-                        index=[names[0], names[1]],
-                        name=var_conversion[var],
-                    )
-
-                # Write the continuity error twice since it has no units
-                else:
-                    data = pd.Series(
-                        [data[1], data[1]],
-                        index=[names[0], names[1]],
-                        name=var_conversion[var],
-                    )
-
-                self._flow_routing_continuity = self._flow_routing_continuity.append(data)
         return self._flow_routing_continuity
 
     @property
+    def continuity(self):
+        """
+        Both continuity blocks flattened into one float Series indexed
+        by (block, variable, column). The index is the same for every
+        report of a model, so many runs can be stacked cheaply, e.g.
+        `np.vstack([rpt.continuity.values for rpt in reports])`.
+        """
+        blocks = {
+            "runoff_quantity": self.runoff_quantity_continuity,
+            "flow_routing": self.flow_routing_continuity,
+        }
+        frames = {k: v for k, v in blocks.items() if not v.empty}
+        if not frames:
+            return pd.Series(dtype=float)
+
+        return pd.concat(frames).stack()
+
+    @property
+    def _cache_suffix(self):
+        return "_compact" if self.compact else ""
+
+    def _make_df(self, block, comment=None, register=True, **kwargs):
+        df = BaseReader._make_df(
+            self, block, comment=comment, register=register, **kwargs
+        )
+        if self.compact:
+            df = compact_frame(df)
+        return df
+
+    def _continuity_block(self, header, names, var_conversion):
+        """
+        Parses a continuity block in one pass over its lines. Each line
+        is a label, a dotted leader and one or two values; the
+        continuity error has no units so it is written to both columns.
+        """
+        start = self.find_line_num(header)
+        if header not in self.orig_file[start]:
+            return pd.DataFrame(columns=names, dtype=float)
+
+        # the header is followed by the dashed underline; the table
+        # ends at the next `endline` break, found from the file index
+        if self._breaks is None:
+            self._index_file()
+        end = bisect_right(self._breaks, start + 1)
+        stop = self._breaks[end] if end < len(self._breaks) else len(self.orig_file)
+
+        index = []
+        values = []
+        for line in self.orig_file[start + 2 : stop]:
+            parts = re.split(r"\s*\.{2,}\s*", line.strip())
+            if len(parts) != 2:
+                break
+            label, numbers = parts
+            numbers = [float(_) for _ in numbers.split()]
+            if len(numbers) == 1:
+                numbers = numbers * len(names)
+
+            index.append(var_conversion.get(label, _sanitize(label)))
+            values.append(numbers[: len(names)])
+
+        df = pd.DataFrame(values, index=index, columns=names, dtype=float)
+        if self.compact:
+            df = df.astype("float32")
+
+        return df
+
+    @cached_block
     def subcatchment_runoff_results(self):
         """
         The parsed node depth results as a pandas DataFrame
@@ -296,7 +557,7 @@ class SWMMReportFile(BaseReader):
 
         return self._subcatchment_runoff_results
 
-    @property
+    @cached_block
     def node_depth_results(self):
         """
         The parsed node depth results as a pandas DataFrame
@@ -316,7 +577,7 @@ class SWMMReportFile(BaseReader):
 
         return self._node_depth_results
 
-    @property
+    @cached_block
     def node_inflow_results(self):
         """
         The parsed node inflow results as a pandas DataFrame
@@ -335,7 +596,7 @@ class SWMMReportFile(BaseReader):
 
         return self._node_inflow_results
 
-    @property
+    @cached_block
     def node_surcharge_results(self):
         """
         The parsed node surcharge results as a pandas DataFrame
@@ -355,7 +616,7 @@ class SWMMReportFile(BaseReader):
 
         return self._node_surcharge_results
 
-    @property
+    @cached_block
     def node_flooding_results(self):
         if self._node_flooding_results is None:
             names, dtype = self._headers.node_flooding_results
@@ -371,7 +632,7 @@ class SWMMReportFile(BaseReader):
 
         return self._node_flooding_results
 
-    @property
+    @cached_block
     def storage_volume_results(self):
         if self._storage_volume_results is None:
             names, dtype = self._headers.storage_volume_results
@@ -387,7 +648,7 @@ class SWMMReportFile(BaseReader):
 
         return self._storage_volume_results
 
-    @property
+    @cached_block
     def outfall_loading_results(self):
         if self._outfall_loading_results is None:
             # special conditions at end of block
@@ -412,17 +673,18 @@ class SWMMReportFile(BaseReader):
                 names=names,
                 index_col=[0],
                 dtype=dtype,
+                register=False,
             )
 
             # drop sep
             drop_from_index = [_ for _ in df.index if "-------------------" in _]
-            df = df.drop(drop_from_index)
+            df = self._register_elements("outfall_loading", df.drop(drop_from_index))
 
             self._outfall_loading_results = df
 
         return self._outfall_loading_results
 
-    @property
+    @cached_block
     def link_flow_results(self):
         if self._link_flow_results is None:
             names, dtype = self._headers.link_flow_results
@@ -438,7 +700,7 @@ class SWMMReportFile(BaseReader):
 
         return self._link_flow_results
 
-    @property
+    @cached_block
     def flow_classification_results(self):
         if self._flow_classification_results is None:
             names, dtype = self._headers.flow_classification_results
@@ -454,7 +716,7 @@ class SWMMReportFile(BaseReader):
 
         return self._flow_classification_results
 
-    @property
+    @cached_block
     def conduit_surcharge_results(self):
         if self._conduit_surcharge_results is None:
             # There are some EOF lines that we need to exclude.
@@ -473,7 +735,7 @@ class SWMMReportFile(BaseReader):
 
         return self._conduit_surcharge_results
 
-    @property
+    @cached_block
     def link_pollutant_load_results(self):
         if self._link_pollutant_load_results is None:
             # there will be more than one pollutant
@@ -498,6 +760,110 @@ class SWMMReportFile(BaseReader):
         return self._link_pollutant_load_results
 
 
+RUNOFF_CONTINUITY_NAMES = {
+    "Total Precipitation": "Total_Precipitation",
+    "Evaporation Loss": "Evaporation_Loss",
+    "Infiltration Loss": "Infiltration_Loss",
+    "Surface Runoff": "Surface_Runoff",
+    "Final Storage": "Final_Storage",
+    "Continuity Error (%)": "Continuity_Error_pcnt",
+}
+
+ROUTING_CONTINUITY_NAMES = {
+    "Dry Weather Inflow": "Dry_Weather_Inflow",
+    "Wet Weather Inflow": "Wet_Weather_Inflow",
+    "Groundwater Inflow": "Groundwater_Inflow",
+    "RDII Inflow": "RDII_Inflow",
+    "External Inflow": "External_Inflow",
+    "External Outflow": "External_Outflow",
+    "Flooding Loss": "Flooding_Loss",
+    "Evaporation Loss": "Evaporation_Loss",
+    "Exfiltration Loss": "Exfiltration_Loss",
+    "Initial Stored Volume": "Intial_Stored_Volume",
+    "Final Stored Volume": "Final_Stored_Volume",
+    "Continuity Error (%)": "Continuity_Error_pcnt",
+}
+
+
+def compact_frame(df):
+    """
+    Converts a parsed report block to compact dtypes:
+    - float64 -> float32 and int64 -> int32,
+    - the element ID index and repetitive text columns such as the
+      node Type -> category,
+    - the "Time of Max Occurrence" days and hr:min columns -> a single
+      timedelta64 `Time_of_Max_Occurrence` column.
+
+    Requires:
+    - df: pandas.DataFrame, a block parsed by `SWMMReportFile`.
+
+    Returns: pandas.DataFrame
+    """
+    days = "Time_of_Max_Occurrence_days"
+    hours = "Time_of_Max_Occurrence_hours"
+    if days in df.columns and hours in df.columns:
+        loc = df.columns.get_loc(days)
+        time_of_max = pd.to_timedelta(
+            pd.to_numeric(df[days], errors="coerce"), unit="D"
+        ) + pd.to_timedelta(df[hours].astype(str) + ":00", errors="coerce")
+        df = df.drop(columns=[days, hours])
+        df.insert(loc, "Time_of_Max_Occurrence", time_of_max)
+
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_float_dtype(values):
+            df[column] = values.astype("float32")
+        elif pd.api.types.is_integer_dtype(values):
+            df[column] = values.astype("int32")
+        elif values.dtype == object and values.nunique() <= len(values) // 2:
+            df[column] = values.astype("category")
+
+    df.index = pd.CategoricalIndex(df.index, name=df.index.name)
+
+    return df
+
+
+def _sanitize(label):
+    """
+    Variable name for continuity labels without a known name.
+    """
+    return re.sub(r"_+", "_", re.sub(r"[^0-9A-Za-z]", "_", label)).strip("_")
+
+
+# the INPUTS = YES summaries written before the analysis options
+_INPUT_SUMMARIES = {
+    "Pollutant Summary",
+    "Landuse Summary",
+    "Raingage Summary",
+    "Subcatchment Summary",
+    "Node Summary",
+    "Link Summary",
+    "Cross Section Summary",
+}
+
+# lines outside of the `_startlines` blocks found by `_sweep_blocks`
+_SWEEP_LINES = (
+    "VERSION",
+    "Flow Units",
+    "Runoff Quantity Continuity",
+    "Flow Routing Continuity",
+)
+
+
+def _parse_unit(line):
+    """
+    The flow unit from the "Flow Units ...... CFS" line.
+    """
+    return line.split(".")[-1].strip().upper()
+
+
+def _parse_version(line):
+    """
+    The version from the "... MODEL - VERSION 5.1 (Build 5.1.010)" line.
+    """
+    return line.split(" - ")[1].split(" ")[1]
+
+
 class _ReportHeaders(object):
     """
     _ReportHeaders: What is my purpose?
@@ -603,7 +969,7 @@ class _ReportHeaders(object):
     def flow_routing_continuity(self):
         if self.ftype in ["CFS", "MGD"]:
             names = ["Volume_acre_feet", "Depth_inches"]
-        elif self.type == "LPS":
+        elif self.ftype == "LPS":
             names = ["Volume_hectare_feet", "Depth_mm"]
 
         dtype = {"Volume_acre_feet": str}
@@ -0,0 +1,262 @@
+from collections.abc import Mapping
+from io import StringIO
+import os
+import re
+import shlex
+
+import numpy as np
+import pandas as pd
+
+
+class SWMMTimeseries(Mapping):
+    """
+    The [TIMESERIES] card of a SWMM inp as a read-only mapping of
+    series name to a float pandas.Series. The card is tokenized once
+    with pandas' C parser and the dates and times are decoded once per
+    distinct value; each series is only assembled when it is first
+    requested.
+
+    Rows may be calendar rows (Name Date Time Value) or elapsed time
+    rows (Name Time Value), and a line may hold several time and value
+    pairs, each optionally preceded by a date. Dates are M/D/Y, M-D-Y
+    or Mon-D-Y. As in SWMM, a row without a date reuses
+    the last date of its series, and a series without any date is
+    indexed by the time elapsed since the start of the simulation.
+    Series read from an external file (Name FILE path) are listed in
+    `files` and read from the file when they are first requested.
+    """
+
+    def __init__(self, text, directory=None):
+        """
+        Requires:
+        - text: str, the lines of the [TIMESERIES] card.
+
+        Optional:
+        - directory: str, default=None. The folder relative FILE paths
+            are resolved against, usually the folder of the .inp. None
+            resolves them against the working directory.
+        """
+        self.directory = directory
+        self.files = {}
+        self._series = {}
+
+        tokens = _tokenize(text)
+        self._names = list(pd.unique(tokens[0]))
+
+        # the second column holds a date, a time or the FILE keyword;
+        # it has few distinct values so they are classified once
+        second, uniques = pd.factorize(tokens[1])
+        is_file = _take(uniques.str.upper() == "FILE", second, False)
+        is_date = _take(_is_date(uniques), second, False)
+
+        for name, path in zip(tokens.loc[is_file, 0], tokens.loc[is_file, 2]):
+            self.files[name] = path
+        if is_file.any():
+            tokens, second = tokens[~is_file], second[~is_file]
+            is_date = is_date[~is_file]
+
+        codes, names = pd.factorize(tokens[0])
+        self._lookup = {name: n for n, name in enumerate(names)}
+
+        time = np.where(is_date, tokens[2], tokens[1])
+        value = tokens[3].values.astype(np.float64)
+        if not is_date.all():
+            value[~is_date] = pd.to_numeric(tokens.loc[~is_date, 2]).values
+
+        dates = pd.Series(_take(_parse_dates(uniques), second, np.datetime64("NaT")))
+        # rows without a date reuse the last date of their series
+        dates = dates.groupby(codes).ffill().values
+        offsets = _parse_times(time)
+
+        order = np.argsort(codes, kind="stable")
+        self._codes = codes[order]
+        self._dates = dates[order]
+        self._offsets = offsets[order]
+        self._values = value[order]
+        self._bounds = np.searchsorted(self._codes, np.arange(len(names) + 1))
+
+    def __getitem__(self, name):
+        if name not in self._series:
+            if name in self.files:
+                self._series[name] = self._read_file(name)
+            else:
+                n = self._lookup[name]
+                start, stop = self._bounds[n], self._bounds[n + 1]
+                self._series[name] = self._make_series(name, start, stop)
+
+        return self._series[name]
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._lookup or name in self.files
+
+    def path(self, name):
+        """
+        The full path of the file of FILE series `name`.
+        """
+        path = self.files[name]
+        if self.directory is not None and not os.path.isabs(path):
+            path = os.path.join(self.directory, path)
+
+        return path
+
+    def _read_file(self, name):
+        """
+        Reads a FILE series. The file holds the rows of the series
+        without its name, so they are named and parsed as a card.
+        """
+        with open(self.path(name), "r") as openfile:
+            rows = [line.split(";")[0].strip() for line in openfile]
+
+        text = "".join("{} {}\n".format(name, row) for row in rows if row)
+        if not text:
+            e = "Series {} file {} has no rows.".format(name, self.path(name))
+            raise ValueError(e)
+
+        return SWMMTimeseries(text)[name]
+
+    def _make_series(self, name, start, stop):
+        dates = self._dates[start:stop]
+        offsets = self._offsets[start:stop]
+
+        dated = ~np.isnat(dates)
+        if dated.all():
+            index = pd.DatetimeIndex(dates + offsets, name="Datetime")
+        elif not dated.any():
+            index = pd.TimedeltaIndex(offsets, name="Elapsed")
+        else:
+            e = "Series {} mixes calendar and elapsed time rows.".format(name)
+            raise ValueError(e)
+
+        return pd.Series(self._values[start:stop], index=index, name=name)
+
+
+# a line with more than one time and value pair, i.e. five or more fields
+_EXTRA_PAIRS = re.compile(r"^[ \t]*[^;\s]+(?:[ \t]+[^;\s]+){4}", re.MULTILINE)
+
+
+def _tokenize(text):
+    """
+    Splits the card into three string columns and the value column
+    of calendar rows. Lines with several pairs are first split into a
+    row per pair.
+    """
+    if not text.strip():
+        return pd.DataFrame({n: [] for n in range(4)}, dtype=object).astype(
+            {3: np.float64}
+        )
+
+    if _EXTRA_PAIRS.search(text):
+        return _read_card(_expand_pairs(text))
+
+    try:
+        return _read_card(text)
+    except ValueError:
+        # e.g. an elapsed time row with a dangling time
+        return _read_card(_expand_pairs(text))
+
+
+def _read_card(text):
+    return pd.read_csv(
+        StringIO(text),
+        delim_whitespace=True,
+        header=None,
+        names=range(4),
+        comment=";",
+        dtype={0: str, 1: str, 2: str, 3: np.float64},
+        quotechar='"',
+        engine="c",
+    )
+
+
+def _expand_pairs(text):
+    """
+    Rewrites the card with one row per [date] time value group, the
+    slow path for cards with several pairs on a line.
+    """
+    rows = []
+    for line in text.splitlines():
+        fields = shlex.split(line.split(";")[0])
+        if len(fields) < 2 or fields[1].upper() == "FILE":
+            rows.append(line)
+            continue
+
+        name = fields[0]
+        if len(name.split()) != 1:
+            name = '"{}"'.format(name)
+        rest = fields[1:]
+        while rest:
+            n = 3 if _is_date(rest[:1])[0] else 2
+            if len(rest) < n:
+                e = "Series {} has a time without a value: {}".format(fields[0], line)
+                raise ValueError(e)
+            rows.append(" ".join([name] + rest[:n]))
+            rest = rest[n:]
+
+    return "\n".join(rows) + "\n"
+
+
+def _take(values, codes, missing):
+    """
+    Looks up per distinct value results by factorized code; code -1
+    (no value) maps to `missing`.
+    """
+    return np.append(np.asarray(values), missing)[codes]
+
+
+def _is_date(values):
+    """
+    Whether each value of the date/time column is a date rather than
+    a clock time or decimal hours.
+    """
+    values = pd.Series(values, dtype=object)
+
+    return values.str.contains(r"[/-]", regex=True, na=False).values
+
+
+def _parse_dates(values):
+    """
+    Parses the distinct M/D/Y, M-D-Y or Mon-D-Y dates of a column, NaT
+    for the values that are not dates. Raises ValueError for dates that
+    do not parse.
+    """
+    values = pd.Series(values, dtype=object)
+    is_date = _is_date(values)
+
+    dates = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    candidates = values[is_date].str.replace("-", "/", regex=False)
+    for format in ("%m/%d/%Y", "%b/%d/%Y"):
+        todo = candidates.index[dates[candidates.index].isna()]
+        if todo.empty:
+            break
+        dates[todo] = pd.to_datetime(candidates[todo], format=format, errors="coerce")
+
+    bad = is_date & dates.isna().values
+    if bad.any():
+        e = "Unrecognized [TIMESERIES] dates: {}".format(values[bad].tolist())
+        raise ValueError(e)
+
+    return dates.values
+
+
+def _parse_times(times):
+    """
+    Parses H:M[:S] clock times or decimal hours to timedelta64,
+    decoding each distinct time once.
+    """
+    codes, uniques = pd.factorize(times)
+
+    seconds = np.empty(len(uniques), dtype=np.float64)
+    for n, time in enumerate(uniques):
+        if ":" in time:
+            parts = [float(_) for _ in time.split(":")]
+            seconds[n] = sum(p * 60 ** (2 - i) for i, p in enumerate(parts))
+        else:
+            seconds[n] = float(time) * 3600
+
+    return np.round(seconds * 1e9).astype("timedelta64[ns]")[codes]
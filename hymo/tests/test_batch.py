@@ -0,0 +1,69 @@
+import os
+import shutil
+
+import pandas as pd
+import pandas.util.testing as pdtest
+
+from hymo import SWMMReportFile
+from hymo import batch
+from hymo.batch import read_reports
+from .utils import data_path
+
+
+class Test_read_reports(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.blocks = ['node_flooding_results', 'outfall_loading_results']
+        self.known = SWMMReportFile(self.known_path)
+
+    def make_paths(self, tmp_path):
+        paths = []
+        for name in ['run_a', 'run_b']:
+            path = str(tmp_path / (name + '.rpt'))
+            shutil.copy(self.known_path, path)
+            paths.append(path)
+        paths.append(str(tmp_path / 'missing.rpt'))
+        return paths
+
+    def test_serial(self, tmp_path):
+        calls = []
+        results, errors = read_reports(
+            self.make_paths(tmp_path), self.blocks,
+            progress=lambda *args: calls.append(args))
+
+        assert list(errors) == ['missing']
+        assert len(calls) == 3
+        assert calls[-1][:2] == (3, 3)
+
+        flooding = results['node_flooding_results']
+        assert flooding.index.names[0] == 'run_id'
+        assert flooding.index.get_level_values(0).unique().tolist() == ['run_a', 'run_b']
+        pdtest.assert_frame_equal(
+            flooding.loc['run_b'], self.known.node_flooding_results)
+
+    def test_process_pool(self, tmp_path):
+        results, errors = read_reports(
+            self.make_paths(tmp_path), self.blocks, workers=2)
+
+        assert list(errors) == ['missing']
+        pdtest.assert_frame_equal(
+            results['outfall_loading_results'].loc['run_a'],
+            self.known.outfall_loading_results)
+
+    def test_dead_worker(self, tmp_path, monkeypatch):
+        # forked workers see the patched reader and die on one file
+        def crash(path, *args, **kwargs):
+            if 'crash' in str(path):
+                os._exit(1)
+            return SWMMReportFile(path, *args, **kwargs)
+
+        monkeypatch.setattr(batch, 'SWMMReportFile', crash)
+        paths = self.make_paths(tmp_path)
+        paths.append(str(tmp_path / 'crash.rpt'))
+
+        results, errors = read_reports(paths, self.blocks, workers=2)
+
+        assert sorted(errors) == ['crash', 'missing']
+        assert 'died' in errors['crash']
+        run_ids = results['node_flooding_results'].index.get_level_values(0)
+        assert run_ids.unique().tolist() == ['run_a', 'run_b']
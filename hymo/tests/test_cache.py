@@ -0,0 +1,141 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pandas.util.testing as pdtest
+
+from hymo import SWMMReportFile, SWMMInpFile, LSPCResultsFile, ElementRegistry
+from hymo.cache import BlockCache
+from .utils import data_path
+
+
+class Test_BlockCache(object):
+    def setup(self):
+        self.rpt_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.inp_path = data_path(os.path.join('swmm', 'test_inp.inp'))
+
+    def test_report_roundtrip(self, tmp_path):
+        cache = BlockCache(str(tmp_path / 'cache'))
+        known = SWMMReportFile(self.rpt_path).node_depth_results
+
+        first = SWMMReportFile(self.rpt_path, cache=cache).node_depth_results
+        key = cache.key([self.rpt_path])
+        assert os.path.exists(
+            os.path.join(cache.directory, key, 'node_depth_results.npz'))
+
+        second = SWMMReportFile(self.rpt_path, cache=cache).node_depth_results
+        pdtest.assert_frame_equal(first, known)
+        pdtest.assert_frame_equal(second, known)
+
+    def test_inp_roundtrip(self, tmp_path):
+        cache = BlockCache(str(tmp_path / 'cache'))
+        known = SWMMInpFile(self.inp_path)
+
+        SWMMInpFile(self.inp_path, cache=cache).curves
+        SWMMInpFile(self.inp_path, cache=cache).raingages
+        inp = SWMMInpFile(self.inp_path, cache=cache)
+        pdtest.assert_frame_equal(inp.curves, known.curves)
+        pdtest.assert_frame_equal(inp.raingages, known.raingages)
+
+    def test_lspc_roundtrip(self, tmp_path):
+        cache = BlockCache(str(tmp_path / 'cache'))
+        paths = (data_path(os.path.join('lspc', 'landuse.csv')),
+                 data_path(os.path.join('lspc', 'landuse.out')))
+        known = LSPCResultsFile(*paths)
+
+        LSPCResultsFile(*paths, cache=cache).parsed_results
+        lspc = LSPCResultsFile(*paths, cache=cache)
+        pdtest.assert_frame_equal(lspc.parsed_results, known.parsed_results)
+        assert lspc.raw_summary == known.raw_summary
+
+    def test_invalidation(self, tmp_path):
+        path = str(tmp_path / 'model.rpt')
+        shutil.copy(self.rpt_path, path)
+        cache = BlockCache(str(tmp_path / 'cache'))
+
+        SWMMReportFile(path, cache=cache).node_flooding_results
+        old_key = cache.key([path])
+
+        with open(path, 'a') as openfile:
+            openfile.write('\n')
+        assert cache.key([path]) != old_key
+        assert cache.load([path], 'node_flooding_results') is None
+
+        SWMMReportFile(path, cache=cache).node_flooding_results
+        assert os.listdir(cache.directory) == [cache.key([path])]
+
+    def test_eviction(self, tmp_path):
+        cache = BlockCache(str(tmp_path / 'cache'), max_bytes=1)
+        rpt = SWMMReportFile(self.rpt_path, cache=cache)
+        rpt.node_flooding_results
+        rpt.outfall_loading_results
+
+        # nothing fits in a one byte cache
+        assert cache.load([self.rpt_path], 'node_flooding_results') is None
+
+    def test_registry_entries_apart(self, tmp_path):
+        cache = BlockCache(str(tmp_path / 'cache'))
+        known = SWMMReportFile(self.rpt_path).node_depth_results
+
+        registry = ElementRegistry()
+        registry.codes('node', ['elsewhere'])
+        coded = SWMMReportFile(self.rpt_path, cache=cache,
+                               registry=registry).node_depth_results
+        assert isinstance(coded.index, pd.CategoricalIndex)
+
+        # a read without a registry does not get the registry's codes
+        plain = SWMMReportFile(self.rpt_path, cache=cache).node_depth_results
+        pdtest.assert_frame_equal(plain, known)
+
+    def test_no_pickle(self, tmp_path):
+        cache = BlockCache(str(tmp_path / 'cache'))
+        df = pd.DataFrame(
+            {'mixed': ['a', 1.5, None, 7], 'text': ['x', 'y', None, 'z'],
+             'value': [1.0, 2.0, 3.0, 4.0]},
+            index=pd.Index(['n1', 'n2', 'n3', 'n4'], name='Node'))
+        df['kind'] = pd.Categorical(['a', 'b', 'a', 'b'])
+
+        cache.store([self.rpt_path], 'objects', df)
+        filename = cache._block_path(cache.key([self.rpt_path]), 'objects')
+        with np.load(filename, allow_pickle=False) as arrays:
+            assert all(arrays[name].dtype != object for name in arrays.files)
+
+        loaded = cache.load([self.rpt_path], 'objects')
+        pdtest.assert_frame_equal(loaded, df)
+        assert [type(_) for _ in loaded['mixed']][:2] == [str, float]
+        assert isinstance(loaded.loc['n4', 'mixed'], int)
+
+    def test_key_once_per_reader(self, tmp_path, monkeypatch):
+        cache = BlockCache(str(tmp_path / 'cache'), hash_contents=True)
+        calls = []
+        key = BlockCache.key
+        monkeypatch.setattr(
+            BlockCache, 'key', lambda self, paths: calls.append(paths) or key(self, paths))
+
+        rpt = SWMMReportFile(self.rpt_path, cache=cache)
+        rpt.node_flooding_results
+        rpt.outfall_loading_results
+        assert len(calls) == 1
+
+        rpt = SWMMReportFile(self.rpt_path, cache=cache)
+        pdtest.assert_frame_equal(
+            rpt.node_flooding_results,
+            SWMMReportFile(self.rpt_path).node_flooding_results)
+        assert len(calls) == 2
+
+    def test_atomic_store(self, tmp_path, monkeypatch):
+        cache = BlockCache(str(tmp_path / 'cache'))
+        key = cache.key([self.rpt_path])
+        filename = cache._block_path(key, 'node_flooding_results')
+
+        # the block is written under a temporary name and moved into place
+        written = []
+        savez = np.savez
+        monkeypatch.setattr(np, 'savez', lambda file, **arrays: (
+            written.append(getattr(file, 'name', file)), savez(file, **arrays)))
+
+        SWMMReportFile(self.rpt_path, cache=cache).node_flooding_results
+        assert len(written) == 1 and written[0] != filename
+        assert written[0].endswith('.tmp')
+        assert os.listdir(os.path.dirname(filename)) == ['node_flooding_results.npz']
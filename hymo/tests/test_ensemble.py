@@ -0,0 +1,133 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pandas.util.testing as pdtest
+
+from hymo import SWMMReportFile
+from hymo import batch
+from hymo.ensemble import ReportEnsemble
+from .utils import data_path
+
+
+class Test_ReportEnsemble(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.known = SWMMReportFile(self.known_path).node_flooding_results
+        self.blocks = ['node_flooding_results', 'node_depth_results']
+
+    def make_store(self, tmp_path):
+        store = ReportEnsemble(str(tmp_path / 'store'))
+        store.add('base', self.known_path, self.blocks)
+
+        # a second scenario with twice the flooding
+        rpt = SWMMReportFile(self.known_path)
+        rpt._node_flooding_results = self.known.assign(
+            Maximum_Rate_CFS=self.known['Maximum_Rate_CFS'] * 2)
+        store.add('double', rpt, ['node_flooding_results'])
+
+        return store
+
+    def test_scenarios(self, tmp_path):
+        store = self.make_store(tmp_path)
+        assert store.blocks == sorted(self.blocks)
+        assert store.scenarios('node_flooding_results') == ['base', 'double']
+        assert store.scenarios('node_depth_results') == ['base']
+
+    def test_roundtrip(self, tmp_path):
+        store = self.make_store(tmp_path)
+        df = store.read('node_flooding_results', scenarios=['base'])
+        df = df.loc['base']
+        df.index = df.index.astype(object)
+        df['Time_of_Max_Occurrence_hours'] = (
+            df['Time_of_Max_Occurrence_hours'].astype(object))
+        pdtest.assert_frame_equal(df, self.known)
+
+    def test_projection_and_filters(self, tmp_path):
+        store = self.make_store(tmp_path)
+        df = store.read(
+            'node_flooding_results', columns=['Maximum_Rate_CFS'],
+            filters=[('Maximum_Rate_CFS', '>', 20)])
+        assert df.columns.tolist() == ['Maximum_Rate_CFS']
+        assert (df['Maximum_Rate_CFS'] > 20).all()
+        n_base = (self.known['Maximum_Rate_CFS'] > 20).sum()
+        n_double = (self.known['Maximum_Rate_CFS'] > 10).sum()
+        assert len(df) == n_base + n_double
+
+        depth = store.read(
+            'node_depth_results', filters=[('Type', '==', 'STORAGE')])
+        assert (depth['Type'] == 'STORAGE').all()
+
+        node = self.known.index[0]
+        rows = store.read('node_flooding_results', filters=[('Node', 'in', [node])])
+        assert rows.index.get_level_values('Node').tolist() == [node, node]
+
+    def test_reduce(self, tmp_path):
+        store = self.make_store(tmp_path)
+        peak = store.reduce('node_flooding_results', 'Maximum_Rate_CFS', how='max')
+        expected = self.known['Maximum_Rate_CFS'] * 2
+        assert (peak.loc[expected.index].values == expected.values).all()
+
+        mean = store.reduce('node_flooding_results', 'Maximum_Rate_CFS', how='mean')
+        expected = self.known['Maximum_Rate_CFS'] * 1.5
+        assert ((mean.loc[expected.index] - expected).abs() < 1e-9).all()
+
+    def test_replace_scenario(self, tmp_path):
+        store = self.make_store(tmp_path)
+        store.add('base', self.known_path, ['node_flooding_results'])
+        assert store.scenarios('node_flooding_results') == ['double', 'base']
+        assert len(store.read('node_flooding_results')) == 2 * len(self.known)
+
+    def test_rewrite_order(self, tmp_path):
+        store = ReportEnsemble(str(tmp_path / 'store'))
+        for scenario in ['a', 'b', 'c', 'a', 'b']:
+            store.write('node_flooding_results', scenario, self.known)
+        assert store.scenarios('node_flooding_results') == ['c', 'a', 'b']
+
+        with open(str(tmp_path / 'store' / 'index.json')) as openfile:
+            index = json.load(openfile)
+        order = index['blocks']['node_flooding_results']
+        assert sorted(order.values()) == [2, 3, 4]
+        assert index['next'] == 5
+
+    def test_no_pickle(self, tmp_path):
+        store = self.make_store(tmp_path)
+        folder = tmp_path / 'store' / 'node_flooding_results' / 'base'
+        for filename in folder.glob('*.npy'):
+            assert np.load(str(filename), allow_pickle=False).dtype != object
+
+        df = store.read('node_flooding_results', scenarios=['base'])
+        assert list(df.index.get_level_values(1)) == list(self.known.index)
+
+    def test_add_reports(self, tmp_path):
+        paths = []
+        for name in ['run_a', 'run_b']:
+            path = str(tmp_path / (name + '.rpt'))
+            shutil.copy(self.known_path, path)
+            paths.append(path)
+        paths.append(str(tmp_path / 'missing.rpt'))
+
+        store = ReportEnsemble(str(tmp_path / 'store'))
+        errors = store.add_reports(paths, ['node_flooding_results'])
+        assert list(errors) == ['missing']
+        assert store.scenarios('node_flooding_results') == ['run_a', 'run_b']
+
+    def test_add_reports_dead_worker(self, tmp_path, monkeypatch):
+        def crash(path, *args, **kwargs):
+            if 'crash' in str(path):
+                os._exit(1)
+            return SWMMReportFile(path, *args, **kwargs)
+
+        monkeypatch.setattr(batch, 'SWMMReportFile', crash)
+        paths = []
+        for name in ['run_a', 'crash']:
+            path = str(tmp_path / (name + '.rpt'))
+            shutil.copy(self.known_path, path)
+            paths.append(path)
+
+        store = ReportEnsemble(str(tmp_path / 'store'))
+        errors = store.add_reports(paths, ['node_flooding_results'], workers=2)
+        assert list(errors) == ['crash']
+        assert store.scenarios('node_flooding_results') == ['run_a']
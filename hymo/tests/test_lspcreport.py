@@ -1,8 +1,10 @@
 import os
 from io import StringIO
 
+import numpy as np
 import pandas as pd
 import pandas.util.testing as pdtest
+import pytest
 
 from hymo import LSPCResultsFile
 from .utils import data_path
@@ -211,4 +213,122 @@ class Test_LSPCResults(object):
 
     def test_parsed_results(self):
         pdtest.assert_frame_equal(
-            self.known_parsed_results, self.lspc.parsed_results)
\ No newline at end of file
+            self.known_parsed_results, self.lspc.parsed_results)
+
+class Test_LSPCResults_typed(object):
+    def setup(self):
+        self.known_results_path = data_path(os.path.join('lspc', 'landuse.csv'))
+        self.known_summary_path = data_path(os.path.join('lspc', 'landuse.out'))
+        self.lspc = LSPCResultsFile(self.known_results_path,
+                                    self.known_summary_path)
+        self.raw = self.lspc.raw_results
+
+    def test_dtypes(self):
+        df = self.lspc.read_results()
+        assert df['subbasin'].dtype == np.int32
+        assert df['deluid'].dtype == np.int32
+        assert df['parmname'].dtype == 'category'
+        assert df['value1'].dtype == np.float32
+        assert list(df['parmname']) == list(self.raw['parmname'])
+
+    def test_filters(self):
+        parms = ['AREA', 'SURO', 'PO_TN']
+        df = self.lspc.read_results(parms=parms, usecols=['value1'])
+        assert list(df.columns) == ['parmname', 'value1']
+        assert list(df['parmname']) == parms
+
+        df = self.lspc.read_results(subbasins=[101174])
+        assert len(df) == len(self.raw)
+        assert len(self.lspc.read_results(subbasins=[1])) == 0
+
+        with pytest.raises(ValueError):
+            self.lspc.read_results(usecols=['value2'])
+
+    def test_chunks(self):
+        chunks = list(self.lspc.iter_results(chunksize=10))
+        assert len(chunks) == 7
+        assert all(len(c) <= 10 for c in chunks)
+
+        df = self.lspc.read_results(chunksize=10)
+        assert df['parmname'].dtype == 'category'
+        pdtest.assert_frame_equal(df, self.lspc.read_results())
+
+    def test_units_side_table(self):
+        df = self.lspc.read_results(parms=['AREA', 'PREC'])
+        units = df['parmname'].map(self.lspc.parsed_summary['unit'])
+        assert list(units) == ['acre', 'in-acre/year']
+
+
+class Test_LSPCResults_cube(object):
+    def setup(self):
+        self.known_summary_path = data_path(os.path.join('lspc', 'landuse.out'))
+        # two subbasins of two landuses; subbasin 2 has no landuse 20
+        self.rows = [
+            (1, 10, 'AREA', 2.0), (1, 10, 'SURO', 4.0), (1, 10, 'SEDLOAD', 1.0),
+            (1, 20, 'AREA', 6.0), (1, 20, 'SURO', 8.0), (1, 20, 'SEDLOAD', 3.0),
+            (2, 10, 'AREA', 1.0), (2, 10, 'SURO', 2.0), (2, 10, 'SEDLOAD', 5.0),
+        ]
+
+    def make_lspc(self, tmp_path):
+        path = tmp_path / 'landuse.csv'
+        lines = ['subbasin,deluid,parmname,value1']
+        lines += ['{},{},{},{}'.format(*row) for row in self.rows]
+        path.write_text('\n'.join(lines) + '\n')
+
+        return LSPCResultsFile(str(path), self.known_summary_path)
+
+    def test_cube(self, tmp_path):
+        cube = self.make_lspc(tmp_path).cube(chunksize=4)
+        assert cube.shape == (2, 2, 3)
+        assert list(cube.subbasins) == [1, 2]
+        assert list(cube.deluids) == [10, 20]
+        assert list(cube.parms) == ['AREA', 'SEDLOAD', 'SURO']
+        assert cube.values.dtype == np.float32
+
+        assert cube.subbasin(1)[1, 2] == 8
+        assert np.isnan(cube.parm('SURO')[1, 1])
+        assert cube.to_frame('SEDLOAD').loc[2, 10] == 5
+
+    def test_cube_filters(self, tmp_path):
+        cube = self.make_lspc(tmp_path).cube(parms=['SURO'], subbasins=[2])
+        assert cube.shape == (1, 1, 1)
+        assert cube.values[0, 0, 0] == 2
+
+    def test_sum(self, tmp_path):
+        cube = self.make_lspc(tmp_path).cube()
+        load = cube.aggregate('subbasin')['SEDLOAD']
+        assert list(load) == [4, 5]
+        assert cube.aggregate('watershed')['SEDLOAD'] == 9
+        assert list(cube.aggregate('deluid')['SEDLOAD']) == [6, 3]
+
+    def test_area_weighted_mean(self, tmp_path):
+        cube = self.make_lspc(tmp_path).cube()
+        suro = cube.aggregate('subbasin', how='mean')['SURO']
+        assert suro[1] == (2 * 4 + 6 * 8) / 8
+        assert suro[2] == 2
+        assert cube.aggregate('watershed', how='mean')['SURO'] == (8 + 48 + 2) / 9
+
+    def test_c90_areas(self, tmp_path):
+        cube = self.make_lspc(tmp_path).cube()
+        # ids of the cube, plus subbasin 3 which is not in the results
+        c90 = pd.DataFrame({
+            'subbasin': [1, 1, 1, 2, 3],
+            'deluid': [10, 20, 20, 10, 10],
+            'area_ac': [3.0, 0.5, 0.5, 4.0, 9.0],
+        })
+        assert np.array_equal(cube.areas(c90), [[3, 1], [4, 0]])
+
+        suro = cube.aggregate('subbasin', how='mean', c90=c90)['SURO']
+        assert suro[1] == (3 * 4 + 1 * 8) / 4
+        assert suro[2] == 2
+        # weighted by the c90 areas rather than the AREA parameter
+        default = cube.aggregate('subbasin', how='mean')['SURO']
+        assert suro[1] != default[1]
+        assert cube.aggregate('watershed', how='mean', c90=c90)['SURO'] == (12 + 8 + 8) / 8
+
+        unmatched = c90.assign(subbasin=c90['subbasin'] + 100)
+        with pytest.raises(ValueError):
+            cube.areas(unmatched)
+
+        with pytest.raises(ValueError):
+            cube.aggregate('landuse')
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pandas.util.testing as pdtest
+import pytest
+
+from hymo import LSPCTimeseriesFile
+
+HEADER = """TT-----------------------------------------------------------------------------------------
+TT LSPC MODEL SUBBASIN TIME SERIES HEADER FILE
+TT Output start time:  10/1/2002
+TT Output end time:    10/1/2002
+TT Simulation time step:   60 min
+TT Label
+TT SURO     total surface outflow rate volume (in-acre/hour)
+TT SEDLOAD  sediments load from land (tons/hour)
+TT PO_TN    total flux of QUAL TN (lb/hour)
+TT
+TT     This is header file for the subbasin time series
+"""
+
+
+class Test_LSPCTimeseriesFile(object):
+    def setup(self):
+        # 4 hourly steps of 3 subbasins, ordered by time step
+        self.subbasins = [101, 102, 103]
+        self.n_steps = 4
+        self.rows = [
+            (subbasin, step * 10 + n, step * 100 + n, step)
+            for step in range(self.n_steps)
+            for n, subbasin in enumerate(self.subbasins)
+        ]
+        self.times = pd.date_range('2002-10-01', periods=self.n_steps,
+                                   freq='H', name='Datetime')
+
+    def write(self, tmp_path, header=HEADER, rows=None, sep=','):
+        rows = self.rows if rows is None else rows
+        path = tmp_path / 'subbasins.out'
+        path.write_text(
+            header + ''.join(sep.join(str(_) for _ in row) + '\n' for row in rows)
+        )
+        return str(path)
+
+    def test_header(self, tmp_path):
+        ts = LSPCTimeseriesFile(self.write(tmp_path))
+        assert ts.start == pd.Timestamp('2002-10-01')
+        assert ts.step == pd.Timedelta(hours=1)
+        assert ts.variables == ['SURO', 'SEDLOAD', 'PO_TN']
+        assert ts.parsed_header.loc['SEDLOAD', 'unit'] == 'tons/hour'
+
+    def test_read(self, tmp_path):
+        df = LSPCTimeseriesFile(self.write(tmp_path)).read()
+        assert list(df.columns) == ['subbasin', 'SURO', 'SEDLOAD', 'PO_TN']
+        assert df['subbasin'].dtype == np.int32
+        assert df['SURO'].dtype == np.float32
+
+        s102 = df[df['subbasin'] == 102]
+        assert s102.index.equals(self.times)
+        assert list(s102['SURO']) == [1, 11, 21, 31]
+
+    def test_projection(self, tmp_path):
+        ts = LSPCTimeseriesFile(self.write(tmp_path))
+        df = ts.read(subbasins=[103], variables=['PO_TN', 'SURO'])
+        assert list(df.columns) == ['subbasin', 'PO_TN', 'SURO']
+        assert df.index.equals(self.times)
+        assert list(df['SURO']) == [2, 12, 22, 32]
+
+        with pytest.raises(ValueError):
+            ts.read(variables=['TAET'])
+
+    def test_chunks(self, tmp_path):
+        ts = LSPCTimeseriesFile(self.write(tmp_path))
+        chunks = list(ts.iter_chunks(chunksize=5))
+        assert len(chunks) == 3
+        pdtest.assert_frame_equal(pd.concat(chunks), ts.read())
+
+    def test_grouped_by_subbasin(self, tmp_path):
+        rows = sorted(self.rows, key=lambda row: row[0])
+        ts = LSPCTimeseriesFile(self.write(tmp_path, rows=rows, sep='  '))
+        df = ts.read(subbasins=[101], chunksize=3)
+        assert df.index.equals(self.times)
+        assert list(df['SEDLOAD']) == [0, 100, 200, 300]
+
+    def test_column_row_and_header_file(self, tmp_path):
+        header_path = tmp_path / 'subbasins.hdr'
+        header_path.write_text(HEADER)
+        path = self.write(tmp_path, header='subbasin,SURO,SEDLOAD,PO_TN\n')
+
+        ts = LSPCTimeseriesFile(path, header_path=str(header_path),
+                                step='1D')
+        df = ts.read(variables=['PO_TN'])
+        assert ts.parsed_header.loc['PO_TN', 'unit'] == 'lb/hour'
+        assert df.index[-1] == pd.Timestamp('2002-10-04')
+        assert list(df['PO_TN'])[-3:] == [3, 3, 3]
+
+    def test_missing_columns(self, tmp_path):
+        rows = [row[:3] for row in self.rows]
+        with pytest.raises(ValueError):
+            LSPCTimeseriesFile(self.write(tmp_path, rows=rows)).read()
@@ -0,0 +1,85 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hymo import SWMMInpFile
+from hymo.network import Network
+from .utils import data_path
+
+
+class Test_Network(object):
+    def setup(self):
+        #  A -> B -> D -> OUT
+        #  C ------> D
+        #  D also splits to OUT2 through E
+        self.network = Network(
+            nodes=['A', 'B', 'C', 'D', 'E', 'OUT', 'OUT2'],
+            links=['AB', 'BD', 'CD', 'DO', 'DE', 'EO'],
+            from_nodes=['A', 'B', 'C', 'D', 'D', 'E'],
+            to_nodes=['B', 'D', 'D', 'OUT', 'E', 'OUT2'],
+        )
+
+    def test_csr(self):
+        net = self.network
+        d = net.nodes.get_loc('D')
+        down = net.links[net.down_links[net.down_ptr[d]:net.down_ptr[d + 1]]]
+        up = net.links[net.up_links[net.up_ptr[d]:net.up_ptr[d + 1]]]
+        assert sorted(down) == ['DE', 'DO']
+        assert sorted(up) == ['BD', 'CD']
+
+    def test_trace(self):
+        assert sorted(self.network.upstream('D')) == ['A', 'B', 'C', 'D']
+        assert sorted(self.network.downstream('B')) == ['B', 'D', 'E', 'OUT', 'OUT2']
+        assert sorted(self.network.upstream('B', links=True)) == ['AB']
+
+    def test_outfalls(self):
+        assert sorted(self.network.outfalls) == ['OUT', 'OUT2']
+        outfall = self.network.outfall_of()
+        assert outfall['A'] == 'OUT'
+        assert outfall['E'] == 'OUT2'
+
+    def test_accumulate(self):
+        values = pd.Series([1.0, 2.0, 4.0], index=['A', 'B', 'C'])
+        total = self.network.accumulate(values)
+        assert total['D'] == 7.0
+        # equal split at D
+        assert total['OUT'] == 3.5
+        assert total['OUT2'] == 3.5
+
+        weights = pd.Series({'DO': 3.0, 'DE': 1.0})
+        total = self.network.accumulate(values, weights=weights)
+        assert total['OUT'] == 5.25
+        assert total['OUT'] + total['OUT2'] == values.sum()
+
+    def test_loop(self):
+        net = Network(['A', 'B'], ['AB', 'BA'], ['A', 'B'], ['B', 'A'])
+        with pytest.raises(ValueError):
+            net.accumulate(pd.Series([1.0], index=['A']))
+
+
+class Test_Network_inp(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_inp.inp'))
+        self.inp = SWMMInpFile(self.known_path)
+        self.network = self.inp.network
+
+    def test_links(self):
+        n_links = sum(
+            len(getattr(self.inp, card))
+            for card in ['conduits', 'orifices', 'outlets', 'weirs', 'pumps'])
+        assert len(self.network.links) == n_links
+        assert (self.network.source > -1).all()
+        assert (self.network.target > -1).all()
+
+    def test_route_subcatchments(self):
+        routes = self.network.route_subcatchments()
+        assert routes.index.tolist() == self.inp.subcatchments.index.tolist()
+        assert routes.loc['CarE4001', 'Node'] == 'J20'
+        assert routes['Outfall'].notnull().all()
+
+    def test_contributing_area(self):
+        area = self.network.contributing_area(self.inp.subcatchments.Area)
+        outfalls = self.network.outfalls
+        assert np.isclose(area[outfalls].sum(), self.inp.subcatchments.Area.sum())
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from hymo import SWMMReportFile, SWMMInpFile, ElementRegistry
+from hymo.cache import BlockCache
+from .utils import data_path
+
+
+class Test_ElementRegistry(object):
+    def setup(self):
+        self.registry = ElementRegistry()
+
+    def test_codes_are_stable(self):
+        codes = self.registry.codes('node', ['J1', 'J2', 'J1'])
+        assert codes.tolist() == [0, 1, 0]
+
+        codes = self.registry.codes('node', ['J3', 'J2'])
+        assert codes.tolist() == [2, 1]
+        assert self.registry.names('node').tolist() == ['J1', 'J2', 'J3']
+
+    def test_kinds_are_separate(self):
+        self.registry.codes('node', ['A'])
+        assert self.registry.codes('link', ['B', 'A']).tolist() == [0, 1]
+        assert sorted(self.registry.kinds) == ['link', 'node']
+
+    def test_index(self):
+        index = self.registry.index('node', [1082, 'J2'], name='Node')
+        assert isinstance(index, pd.CategoricalIndex)
+        assert index.name == 'Node'
+        assert index.tolist() == ['1082', 'J2']
+
+    def test_align(self):
+        df = pd.DataFrame(
+            {'x': [1, 2]}, index=self.registry.index('node', ['J1', 'J2']))
+        self.registry.codes('node', ['J3'])
+        aligned = self.registry.align(df, 'node')
+        assert len(aligned.index.categories) == 3
+        assert aligned.index.codes.tolist() == [0, 1]
+
+
+class Test_ElementRegistry_readers(object):
+    def setup(self):
+        self.registry = ElementRegistry()
+        self.rpt_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.inp_path = data_path(os.path.join('swmm', 'test_inp.inp'))
+        self.rpt = SWMMReportFile(self.rpt_path, registry=self.registry)
+        self.inp = SWMMInpFile(self.inp_path, registry=self.registry)
+
+    def test_shared_codes(self):
+        depth = self.rpt.node_depth_results
+        inflow = self.rpt.node_inflow_results
+        known = SWMMReportFile(self.rpt_path).node_depth_results
+        assert depth.index.tolist() == known.index.tolist()
+
+        junctions = self.inp.junctions
+        names = self.registry.names('node')
+        for df in (depth, inflow, junctions):
+            assert (names[df.index.codes] == df.index.astype(str)).all()
+
+    def test_element_results(self):
+        name = self.rpt.node_depth_results.index[5]
+        results = self.rpt.element_results(name)
+        assert 'node_depth_results' in results
+        assert 'link_flow_results' not in results
+        for df in results.values():
+            assert df.index.tolist() == [name]
+
+    def test_outfall_separator_not_registered(self):
+        self.rpt.outfall_loading_results
+        names = self.registry.names('node')
+        assert not names.str.contains('-----').any()
+
+    def test_cached_blocks_registered(self, tmp_path):
+        cache = BlockCache(str(tmp_path))
+        SWMMReportFile(self.rpt_path, cache=cache).node_depth_results
+
+        rpt = SWMMReportFile(self.rpt_path, cache=cache, registry=self.registry)
+        df = rpt.node_depth_results
+        names = self.registry.names('node')
+        assert (names[df.index.codes] == df.index.astype(str)).all()
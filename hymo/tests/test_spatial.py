@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from hymo import SWMMInpFile
+from hymo.spatial import GridIndex
+from .utils import data_path
+
+
+class Test_GridIndex(object):
+    def setup(self):
+        rng = np.random.RandomState(0)
+        self.x = rng.uniform(0, 100, 500)
+        self.y = rng.uniform(0, 50, 500)
+        self.grid = GridIndex(np.arange(500), self.x, self.y)
+
+    def test_query(self):
+        found = self.grid.query(10, 10, 30, 20)
+        inside = np.flatnonzero(
+            (self.x >= 10) & (self.x <= 30) & (self.y >= 10) & (self.y <= 20))
+        assert sorted(found) == sorted(inside)
+
+    def test_nearest(self):
+        for x, y in [(50, 25), (0, 0), (150, -20)]:
+            positions, distances = self.grid.nearest(x, y, k=4)
+            brute = np.hypot(self.x - x, self.y - y)
+            assert np.allclose(distances, np.sort(brute)[:4])
+
+    def test_boxes(self):
+        grid = GridIndex(['a', 'b'], [0, 5], [0, 5], [10, 6], [10, 6])
+        assert grid.ids[grid.query(7, 7, 8, 8)].tolist() == ['a']
+        assert sorted(grid.ids[grid.query(5.5, 5.5, 5.5, 5.5)]) == ['a', 'b']
+
+
+class Test_SpatialIndex(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_inp.inp'))
+        self.inp = SWMMInpFile(self.known_path)
+        self.spatial = self.inp.spatial
+        coords = self.inp.coordinates
+        self.coords = coords.set_axis(coords.index.astype(str))
+        self.x0 = self.coords.X_Coord.median()
+        self.y0 = self.coords.Y_Coord.median()
+
+    def test_nodes_in(self):
+        window = (self.x0 - 500, self.y0 - 500, self.x0 + 500, self.y0 + 500)
+        c = self.coords
+        expected = c[c.X_Coord.between(window[0], window[2])
+                     & c.Y_Coord.between(window[1], window[3])].index
+        assert sorted(self.spatial.nodes_in(*window)) == sorted(expected)
+
+    def test_nearest_nodes(self):
+        nearest = self.spatial.nearest_nodes(self.x0, self.y0, k=3)
+        distance = np.hypot(self.coords.X_Coord - self.x0, self.coords.Y_Coord - self.y0)
+        assert nearest.index.tolist() == distance.sort_values().index[:3].tolist()
+
+    def test_links_in(self):
+        links = self.spatial.links_in(*self.spatial.links.bounds)
+        assert len(links) == len(self.inp.network.links)
+
+    def test_subcatchment_at(self):
+        ring = self.inp.polygons.loc['CarE4000']
+        x, y = ring.X_Coord.mean(), ring.Y_Coord.mean()
+        assert self.spatial.subcatchment_at(x, y) == 'CarE4000'
+        assert self.spatial.subcatchment_at(1e9, 1e9) is None
+
+        found = self.spatial.subcatchment_at([x, 1e9], [y, 1e9])
+        assert found.tolist() == ['CarE4000', None]
+
+    def test_match_polygons(self):
+        shifted = self.inp.polygons.copy()
+        shifted['X_Coord'] += 2.0
+        matched = self.spatial.match_polygons(shifted)
+        assert (matched.index == matched.values).all()
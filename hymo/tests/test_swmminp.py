@@ -2,9 +2,11 @@ import os
 from pkg_resources import resource_filename
 
 import pandas as pd
+import pytest
 import pandas.util.testing as pdtest
 
 from hymo import SWMMInpFile
+from hymo.swmmtimeseries import SWMMTimeseries
 from hymo.tests import data_path
 
 
@@ -139,3 +141,181 @@ class Test_SWMMInpFile(base_SWMMInpFileMixin):
     def setup(self):
         self.known_path = data_path(os.path.join("swmm", "test_inp.inp"))
         self.inp = SWMMInpFile(self.known_path)
+
+
+class Test_SWMMInpFile_sections(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join("swmm", "test_inp.inp"))
+        self.known = SWMMInpFile(self.known_path)
+        self.inp = SWMMInpFile(self.known_path, sections=["junctions", "polygons"])
+
+    def test_section_index(self):
+        index = self.known.section_index
+        assert index["title"] == 0
+        assert self.known.orig_file[index["junctions"]].startswith("[JUNCTIONS]")
+        assert self.known.cards_in_inp == set(index)
+
+    def test_selected_sections(self):
+        assert len(self.inp.orig_file) < len(self.known.orig_file)
+        assert self.inp.cards_in_inp == self.known.cards_in_inp
+        pdtest.assert_frame_equal(self.inp.junctions, self.known.junctions)
+        pdtest.assert_frame_equal(self.inp.polygons, self.known.polygons)
+
+    def test_other_sections(self):
+        with pytest.raises(ValueError):
+            self.inp.conduits
+
+    def test_unknown_section(self):
+        with pytest.raises(ValueError):
+            SWMMInpFile(self.known_path, sections=["junction"])
+
+
+TIMESERIES_CARD = """\
+;;Name           Date       Time       Value
+;;-------------- ---------- ---------- ----------
+Hyetograph       0          0.1
+Hyetograph       0.5        0.2
+Hyetograph       1:30       0.3
+Dated            1/1/2016   0:05       1.5  ; inline comment
+Dated            1:00       2.5
+External         FILE       "rain.dat"
+"""
+
+
+class Test_SWMMInpFile_series(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join("swmm", "test_inp.inp"))
+        self.inp = SWMMInpFile(self.known_path)
+
+    def test_matches_timeseries(self):
+        known = self.inp.timeseries
+        series = self.inp.series
+        assert list(series) == known.index.unique().tolist()
+
+        name = "LosPen24hr_Cumulative"
+        ts = series[name]
+        assert isinstance(ts.index, pd.DatetimeIndex)
+        assert ts.values.tolist() == known.loc[name, "Value"].tolist()
+        expected = pd.to_datetime(
+            known.loc[name, "Date"] + " " + known.loc[name, "Time"])
+        assert (ts.index == expected.values).all()
+
+    def test_lazy(self):
+        series = self.inp.series
+        assert not series._series
+        series["SCS_6h_2.785in"]
+        assert list(series._series) == ["SCS_6h_2.785in"]
+
+    def test_row_formats(self):
+        series = SWMMTimeseries(TIMESERIES_CARD)
+        assert list(series) == ["Hyetograph", "Dated", "External"]
+        assert "External" in series
+        assert series.files == {"External": "rain.dat"}
+
+        elapsed = series["Hyetograph"]
+        assert isinstance(elapsed.index, pd.TimedeltaIndex)
+        assert elapsed.index.tolist() == pd.to_timedelta(
+            ["0h", "30min", "90min"]).tolist()
+
+        dated = series["Dated"]
+        assert dated.index.tolist() == pd.to_datetime(
+            ["2016-01-01 00:05", "2016-01-01 01:00"]).tolist()
+        assert dated.tolist() == [1.5, 2.5]
+
+        with pytest.raises(KeyError):
+            series["Missing"]
+
+    def test_several_pairs_per_line(self):
+        series = SWMMTimeseries(
+            "TS1  0:00  1.0  1:00  2.0\n"
+            "TS1  2:00  3.0\n"
+            "TS2  1/1/2016  0:00  1.5  1:00  2.5  JAN-02-2016  0:00  3.5\n"
+            "TS3  1-3-2016  6:00  4.5\n")
+        assert list(series) == ["TS1", "TS2", "TS3"]
+
+        ts1 = series["TS1"]
+        assert ts1.index.tolist() == pd.to_timedelta(["0h", "1h", "2h"]).tolist()
+        assert ts1.tolist() == [1.0, 2.0, 3.0]
+
+        ts2 = series["TS2"]
+        assert ts2.index.tolist() == pd.to_datetime(
+            ["2016-01-01 00:00", "2016-01-01 01:00", "2016-01-02 00:00"]).tolist()
+        assert ts2.tolist() == [1.5, 2.5, 3.5]
+        assert series["TS3"].index[0] == pd.Timestamp("2016-01-03 06:00")
+
+        with pytest.raises(ValueError, match="without a value"):
+            SWMMTimeseries("TS1  0:00  1.0  1:00\n")
+
+    def test_bad_dates(self):
+        for date in ["13/45/2016", "2016-01-01"]:
+            with pytest.raises(ValueError, match="dates"):
+                SWMMTimeseries("TS1  {}  0:00  1.0\n".format(date))
+
+    def test_file_series(self, tmp_path):
+        (tmp_path / "rain.dat").write_text(
+            ";;rainfall\n1/1/2016  0:00  0.5\n\n1:00  0.25 ; comment\n")
+        series = SWMMTimeseries(TIMESERIES_CARD, str(tmp_path))
+        assert series.path("External") == str(tmp_path / "rain.dat")
+
+        external = series["External"]
+        assert external.name == "External"
+        assert external.index.tolist() == pd.to_datetime(
+            ["2016-01-01 00:00", "2016-01-01 01:00"]).tolist()
+        assert external.tolist() == [0.5, 0.25]
+
+        with pytest.raises(FileNotFoundError):
+            SWMMTimeseries(TIMESERIES_CARD, str(tmp_path / "elsewhere"))["External"]
+
+    def test_file_series_next_to_inp(self, tmp_path):
+        with open(self.known_path) as openfile:
+            text = openfile.read()
+        path = tmp_path / "model.inp"
+        path.write_text(text.replace(
+            "[TIMESERIES]\n", "[TIMESERIES]\nExternal FILE rain.dat\n", 1))
+        (tmp_path / "rain.dat").write_text("0  0.1\n0:30  0.2\n")
+
+        series = SWMMInpFile(str(path)).series
+        assert series["External"].index.tolist() == pd.to_timedelta(
+            ["0h", "30min"]).tolist()
+
+
+class Test_SWMMInpFile_write(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join("swmm", "test_inp.inp"))
+        self.inp = SWMMInpFile(self.known_path)
+
+    def test_verbatim(self, tmp_path):
+        path = str(tmp_path / "copy.inp")
+        self.inp.write(path)
+        with open(path, "rb") as a, open(self.known_path, "rb") as b:
+            assert a.read() == b.read()
+
+    def test_patch_card(self, tmp_path):
+        path = str(tmp_path / "variant.inp")
+        subcatchments = self.inp.subcatchments.copy()
+        subcatchments["Pcnt_Imperv"] *= 1.1
+        self.inp.write(path, {"subcatchments": subcatchments})
+
+        variant = SWMMInpFile(path)
+        pdtest.assert_frame_equal(variant.subcatchments, subcatchments)
+        pdtest.assert_frame_equal(variant.conduits, self.inp.conduits)
+
+        # untouched sections are byte identical
+        known = self.inp.orig_file
+        start = self.inp.find_line_num("[CONDUITS]")
+        stop = self.inp.find_line_num("[ORIFICES]")
+        offset = variant.find_line_num("[CONDUITS]")
+        assert variant.orig_file[offset: offset + stop - start] == known[start:stop]
+
+    def test_roundtrip_cards(self, tmp_path):
+        path = str(tmp_path / "cards.inp")
+        cards = ["raingages", "curves", "xsections", "dwf", "inflows"]
+        self.inp.write(path, cards)
+
+        written = SWMMInpFile(path)
+        for card in cards:
+            pdtest.assert_frame_equal(getattr(written, card), getattr(self.inp, card))
+
+    def test_unknown_card(self, tmp_path):
+        with pytest.raises(ValueError):
+            self.inp.write(str(tmp_path / "bad.inp"), {"junction": None})
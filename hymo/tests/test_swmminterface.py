@@ -1,4 +1,5 @@
 import os
+from io import StringIO
 
 import pandas as pd
 
@@ -46,3 +47,103 @@ class Test_SWMMInterfaceFile(base_SWMMInterfaceFileMixin):
     def setup(self):
         self.known_path = data_path(os.path.join('swmm', 'test_interface.txt'))
         self.interface = SWMMInterfaceFile(self.known_path)
+
+
+class Test_SWMMInterfaceFile_memory_map(base_SWMMInterfaceFileMixin):
+
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_interface.txt'))
+        self.interface = SWMMInterfaceFile(self.known_path, memory_map=True)
+
+
+class Test_SWMMInterfaceFile_iter(object):
+
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_interface.txt'))
+        self.interface = SWMMInterfaceFile(self.known_path)
+
+    def test_header_only(self):
+        assert self.interface.nodes == ['OF-1', 'INF-BR']
+        assert self.interface._orig_file is None
+
+    def test_iter_interface(self):
+        chunks = list(self.interface.iter_interface(chunksize=100))
+        assert all(len(c) == 200 for c in chunks[:-1])
+
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks), self.interface.interface)
+
+    def test_iter_interface_file_like(self):
+        with open(self.known_path) as openfile:
+            interface = SWMMInterfaceFile(StringIO(openfile.read()))
+
+        chunks = list(interface.iter_interface(chunksize=100))
+        assert all(len(c) == 200 for c in chunks[:-1])
+
+        pd.testing.assert_frame_equal(
+            pd.concat(chunks), self.interface.interface)
+
+    def test_timeseries(self):
+        ts = self.interface.timeseries
+        known = self.interface.interface
+
+        assert isinstance(ts.index, pd.DatetimeIndex)
+        assert list(ts.columns) == ['Node', 'FLOW', 'water', 'nitrogen']
+        assert ts['Node'].tolist() == known['Node'].tolist()
+        assert (ts[['FLOW', 'water', 'nitrogen']].values ==
+                known[['FLOW', 'water', 'nitrogen']].values).all()
+
+        known_dates = pd.to_datetime(
+            known[['Year', 'Mon', 'Day', 'Hr', 'Min', 'Sec']].set_axis(
+                ['year', 'month', 'day', 'hour', 'minute', 'second'], axis=1))
+        assert (ts.index == known_dates).all()
+
+    def test_cube(self):
+        cube = self.interface.cube()
+        ts = self.interface.timeseries
+
+        assert cube.shape == (480, 2, 3)
+        assert cube.nodes == ['OF-1', 'INF-BR']
+        assert cube.constituents == ['FLOW', 'water', 'nitrogen']
+        assert (cube.times == ts.index.unique()).all()
+
+        inf_br = ts[ts['Node'] == 'INF-BR']
+        assert (cube.node('INF-BR') == inf_br[cube.constituents].values).all()
+        assert (cube.to_frame('water')['INF-BR'].values == inf_br['water'].values).all()
+        assert cube.constituent('FLOW').base is cube.values
+
+    def test_cube_float32(self):
+        cube = self.interface.cube(dtype='float32')
+        assert cube.values.dtype == 'float32'
+
+
+class Test_SWMMInterfaceFile_misaligned(object):
+
+    def setup(self):
+        known_path = data_path(os.path.join('swmm', 'test_interface.txt'))
+        with open(known_path, 'r') as openfile:
+            lines = openfile.readlines()
+        # the header of a single node, OF-1
+        self.header = ''.join(lines[:7]) + '1    - number of nodes as listed below:\n'
+        self.header += lines[8] + lines[10]
+
+    def test_wide_value(self, tmp_path):
+        # FLOW wider than its %-10f column shifts every row the same way
+        rows = [
+            'OF-1             2016 01  01  00  {:02d}  00  12345.500000 '
+            '12.345678   0.500000  \n'.format(m)
+            for m in range(0, 60, 15)
+        ]
+        path = tmp_path / 'wide.txt'
+        path.write_text(self.header + ''.join(rows))
+
+        interface = SWMMInterfaceFile(str(path))
+        assert interface.nodes == ['OF-1']
+        assert interface._row_matrix() == (None, None)
+
+        ts = interface.timeseries
+        assert (ts['FLOW'] == 12345.5).all()
+        assert (ts['water'] == 12.345678).all()
+        assert (ts['FLOW'].values == interface.interface['FLOW'].values).all()
+        assert ts.index[-1] == pd.Timestamp('2016-01-01 00:45')
+        assert interface.cube().values[:, 0, 1].tolist() == [12.345678] * 4
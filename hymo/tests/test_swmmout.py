@@ -0,0 +1,147 @@
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hymo import ElementRegistry
+from hymo.swmmout import SWMMOutputFile, MAGIC_NUMBER
+
+
+def write_out(path, subcatchments, nodes, links, pollutants, n_periods,
+              start=36526.0, step=300):
+    """
+    Writes a SWMM 5.1 binary output file whose result at (period,
+    element, variable) is period * 1000 + element * 10 + variable.
+    """
+    n_vars = [8 + len(pollutants), 6 + len(pollutants), 5 + len(pollutants), 15]
+    counts = [len(subcatchments), len(nodes), len(links)]
+
+    def ints(*values):
+        return struct.pack('<{}i'.format(len(values)), *values)
+
+    def floats(*values):
+        return struct.pack('<{}f'.format(len(values)), *values)
+
+    buffer = ints(MAGIC_NUMBER, 51000, 0, *(counts + [len(pollutants)]))
+
+    id_pos = len(buffer)
+    for name in subcatchments + nodes + links + pollutants:
+        buffer += ints(len(name)) + name.encode()
+    buffer += ints(*[0] * len(pollutants))
+
+    input_pos = len(buffer)
+    buffer += ints(1, 1) + floats(*[10.0 + n for n in range(counts[0])])
+    buffer += ints(3, 0, 2, 3)
+    for n in range(counts[1]):
+        buffer += floats(n % 2, 100.0 + n, 5.0)
+    buffer += ints(5, 0, 4, 4, 3, 5)
+    for n in range(counts[2]):
+        buffer += floats(0, 0.5, 0.0, 2.0, 400.0 + n)
+
+    for n in n_vars:
+        buffer += ints(n, *range(n))
+    buffer += struct.pack('<d', start) + ints(step)
+
+    output_pos = len(buffer)
+    for period in range(n_periods):
+        buffer += struct.pack('<d', start + (period + 1) * step / 86400.0)
+        for count, n in zip(counts + [1], n_vars):
+            values = [
+                period * 1000 + element * 10 + var
+                for element in range(count) for var in range(n)
+            ]
+            buffer += floats(*values)
+
+    buffer += ints(id_pos, input_pos, output_pos, n_periods, 0, MAGIC_NUMBER)
+
+    with open(path, 'wb') as openfile:
+        openfile.write(buffer)
+
+
+class Test_SWMMOutputFile(object):
+    def setup(self):
+        self.subcatchments = ['S1', 'S2']
+        self.nodes = ['J1', 'J2', 'OUT']
+        self.links = ['C1', 'C2']
+        self.pollutants = ['TSS']
+        self.n_periods = 12
+
+    def make_out(self, tmp_path, registry=None):
+        path = str(tmp_path / 'model.out')
+        write_out(path, self.subcatchments, self.nodes, self.links,
+                  self.pollutants, self.n_periods)
+        return SWMMOutputFile(path, registry=registry)
+
+    def test_header(self, tmp_path):
+        out = self.make_out(tmp_path)
+        assert out.version == 51000
+        assert out.flow_unit == 'CFS'
+        assert out.n_periods == self.n_periods
+        assert list(out.nodes) == self.nodes
+        assert out.nodes.name == 'Node'
+        assert out.pollutants == self.pollutants
+        assert out.node_vars[-1] == 'TSS'
+        assert len(out.system_vars) == 15
+        assert out.start_date == pd.Timestamp('2000-01-01')
+        assert out.report_step == pd.Timedelta(minutes=5)
+
+    def test_properties(self, tmp_path):
+        out = self.make_out(tmp_path)
+        assert out.subcatchment_properties.loc['S2', 'Area'] == 11
+        assert out.node_properties.loc['J2', 'Type'] == 'OUTFALL'
+        assert out.node_properties.loc['OUT', 'Invert_Elev'] == 102
+        assert out.link_properties.loc['C2', 'Length'] == 401
+
+    def test_times(self, tmp_path):
+        out = self.make_out(tmp_path)
+        assert out.times[0] == pd.Timestamp('2000-01-01 00:05')
+        assert out.times[-1] == pd.Timestamp('2000-01-01 01:00')
+        assert out.period_of('2000-01-01 00:30') == 5
+        with pytest.raises(KeyError):
+            out.period_of('2000-01-02')
+
+    def test_values(self, tmp_path):
+        out = self.make_out(tmp_path)
+
+        depth = out.values('node', 'J2', 'Depth')
+        assert isinstance(depth, np.ndarray)
+        assert not depth.flags['OWNDATA']
+        assert np.array_equal(depth, np.arange(self.n_periods) * 1000 + 10)
+
+        period = out.values('link', periods=4)
+        assert period.shape == (2, 6)
+        assert period[1, 5] == 4000 + 10 + 5
+
+        assert out.values('system', variable='Outflow', periods=3) == 3011
+        assert out.period(7)['subcatchments'][1, 4] == 7014
+
+    def test_series_and_frame(self, tmp_path):
+        out = self.make_out(tmp_path)
+
+        flow = out.series('link', 'C1', 'Flow')
+        assert flow.index.equals(out.times)
+        assert flow.iloc[2] == 2000
+
+        tss = out.frame('node', 'TSS', periods=slice(0, 3))
+        assert list(tss.columns) == self.nodes
+        assert tss.shape == (3, 3)
+        assert tss.loc[out.times[1], 'OUT'] == 1000 + 20 + 6
+
+        with pytest.raises(ValueError):
+            out.values('pump')
+
+    def test_registry(self, tmp_path):
+        registry = ElementRegistry()
+        registry.codes('node', ['OUT'])
+        out = self.make_out(tmp_path, registry=registry)
+
+        assert list(out.nodes) == self.nodes
+        assert registry.code('node', 'OUT') == 0
+        assert out.series('node', 'OUT', 'Depth').iloc[1] == 1020
+
+    def test_not_an_out_file(self, tmp_path):
+        path = tmp_path / 'model.out'
+        path.write_bytes(b'\x00' * 64)
+        with pytest.raises(ValueError):
+            SWMMOutputFile(str(path))
@@ -1,10 +1,16 @@
 import os
+from io import StringIO
 from pkg_resources import resource_filename
 
+import numpy as np
 import pandas as pd
 import pandas.util.testing as pdtest
+import pytest
 
 from hymo import SWMMReportFile
+from hymo import swmmreport
+from hymo.base_reader import _infer_layout
+from hymo.mapped_lines import MappedLines
 from .utils import data_path
 
 class base_ReportFileMixin(object):
@@ -136,4 +142,399 @@ class Test_ReportFile(base_ReportFileMixin):
         pdtest.assert_frame_equal(
             self.rpt.conduit_surcharge_results,
             self.known_conduit_surcharge_results
-        )
\ No newline at end of file
+        )
+
+    def test_block_bounds(self):
+        assert self.rpt.find_line_num('Node Depth Summary') == 109
+        assert self.rpt.block_bounds('node_depth') == (117, 5325)
+        assert self.rpt.block_bounds('conduit_surcharge') == (22462, 22795)
+        assert len(self.rpt.node_depth_results) == 5325 - 117
+
+    def test_memory_map(self):
+        rpt = SWMMReportFile(self.known_path, memory_map=True)
+        assert len(rpt.orig_file) == len(self.rpt.orig_file)
+        assert rpt.orig_file[100:120] == self.rpt.orig_file[100:120]
+        assert rpt.orig_file[-1] == self.rpt.orig_file[-1]
+        assert rpt.unit == self.rpt.unit
+        assert rpt.block_bounds('link_flow') == self.rpt.block_bounds('link_flow')
+
+        pdtest.assert_frame_equal(
+            rpt.link_flow_results,
+            self.known_link_flow_results
+        )
+
+
+class Test_ReportFile_engine(object):
+    def setup(self):
+        known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        with open(known_path, 'r') as openfile:
+            self.lines = openfile.readlines()
+
+        self.start, self.stop = SWMMReportFile(known_path).block_bounds('node_depth')
+
+    def test_large_block_c_engine(self, tmp_path):
+        # ~100k row node depth block
+        lines = (self.lines[:self.start]
+                 + self.lines[self.start:self.stop] * 20
+                 + self.lines[self.stop:])
+        path = tmp_path / 'large.rpt'
+        path.write_text(''.join(lines))
+
+        rpt = SWMMReportFile(str(path))
+        names, dtype = rpt._headers.node_depth_results
+        kwargs = dict(sep=r'\s+', header=None, names=names,
+                      index_col=[0], dtype=dtype)
+
+        # timings are compared in benchmarks/bench_engine.py
+        c_df = rpt._make_df('node_depth', **kwargs)
+        py_df = rpt._make_df('node_depth', engine='python', **kwargs)
+
+        assert len(c_df) == 20 * (self.stop - self.start)
+        pdtest.assert_frame_equal(c_df, py_df)
+
+
+class Test_ReportFile_infer_columns(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.known_names = ['Outfall', 'Node', 'Flow_Freq_Pcnt', 'Avg_Flow_CFS',
+                            'Max_Flow_CFS', 'Total_Volume_10_6_gal']
+
+    def test_names(self):
+        rpt = SWMMReportFile(self.known_path)
+        names = rpt.infer_columns('Outfall Loading Summary', 3, 3)
+        assert names == self.known_names
+
+    def test_cached_by_header(self):
+        _infer_layout.cache_clear()
+        for _ in range(3):
+            rpt = SWMMReportFile(self.known_path)
+            names = rpt.infer_columns('Outfall Loading Summary', 3, 3)
+        assert names == self.known_names
+        assert _infer_layout.cache_info().hits == 2
+
+        # the cached names are not shared between calls
+        names.append('x')
+        assert rpt.infer_columns('Outfall Loading Summary', 3, 3) == self.known_names
+
+    def test_uneven_lines(self):
+        # the second line is longer than the first
+        header = ('  Max      Total      Time of\n',
+                  '  Depth    Load (mg)  Max Occurrence\n')
+        assert _infer_layout(header) == (
+            'Max_Depth', 'Total_Load_mg_', 'Time_of_Max_Occurrence')
+
+
+class Test_ReportFile_parse_all(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.rpt = SWMMReportFile(self.known_path, eager=True)
+
+    def test_caches_filled(self):
+        assert self.rpt._node_depth_results is not None
+        assert self.rpt._conduit_surcharge_results is not None
+        assert self.rpt._outfall_loading_results is not None
+        # not in the report
+        assert self.rpt._subcatchment_runoff_results is None
+
+    def test_same_as_lazy(self):
+        lazy = SWMMReportFile(self.known_path)
+        pdtest.assert_frame_equal(
+            self.rpt.link_flow_results, lazy.link_flow_results)
+        pdtest.assert_frame_equal(
+            self.rpt.node_inflow_results, lazy.node_inflow_results)
+
+    @pytest.mark.parametrize('memory_map', [False, True])
+    def test_single_pass(self, monkeypatch, memory_map):
+        calls = []
+        for name in ['_index_file', '_scan']:
+            method = getattr(SWMMReportFile, name)
+            monkeypatch.setattr(
+                SWMMReportFile, name,
+                lambda *args, name=name, method=method: (
+                    calls.append(name), method(*args))[1])
+
+        rpt = SWMMReportFile(self.known_path, memory_map=memory_map).parse_all()
+        assert rpt.unit == 'CFS' and rpt.version == '5.1'
+        assert len(rpt.flow_routing_continuity) == 12
+        assert calls == []
+
+
+class Test_ReportFile_crlf(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.known = SWMMReportFile(self.known_path)
+
+    def make_crlf(self, tmp_path):
+        path = tmp_path / 'crlf.rpt'
+        with open(self.known_path, 'rb') as openfile:
+            path.write_bytes(openfile.read().replace(b'\n', b'\r\n'))
+        return str(path)
+
+    def test_memory_map(self, tmp_path):
+        with SWMMReportFile(self.make_crlf(tmp_path), memory_map=True) as rpt:
+            assert rpt.block_bounds('node_depth') == (117, 5325)
+            assert rpt.block_bounds('conduit_surcharge') == (22462, 22795)
+            pdtest.assert_frame_equal(
+                rpt.node_depth_results, self.known.node_depth_results)
+            pdtest.assert_frame_equal(
+                rpt.link_flow_results, self.known.link_flow_results)
+
+    def test_mapped_lines(self, tmp_path):
+        path = self.make_crlf(tmp_path)
+        with MappedLines(path) as lines:
+            assert len(lines) == len(self.known.orig_file)
+            assert lines[100:140] == self.known.orig_file[100:140]
+            assert lines[-1] == self.known.orig_file[-1]
+            known_end = next(n for n, l in enumerate(self.known.orig_file)
+                             if n >= 118 and '  \n' in l)
+            assert lines.find('  \n', 118) == known_end
+
+
+class Test_ReportFile_lazy(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+
+    def test_construction_is_lazy(self):
+        rpt = SWMMReportFile(self.known_path)
+        assert rpt._orig_file is None
+
+        assert rpt.unit == 'CFS'
+        assert rpt.version == '5.1'
+        assert rpt._orig_file is None
+
+    def test_probe(self):
+        info = SWMMReportFile.probe(self.known_path)
+        assert info == {'unit': 'CFS', 'version': '5.1', 'element_count': {}}
+
+    def test_probe_element_count(self, tmp_path, monkeypatch):
+        path = tmp_path / 'inputs.rpt'
+        path.write_text(INPUTS_RPT)
+
+        # count the lines probe reads
+        lines = []
+        class Tracked(StringIO):
+            def __next__(self):
+                line = StringIO.__next__(self)
+                lines.append(line)
+                return line
+
+        monkeypatch.setattr(
+            swmmreport, 'open', lambda *args: Tracked(INPUTS_RPT), raising=False)
+        info = SWMMReportFile.probe(str(path))
+        monkeypatch.undo()
+
+        # the options follow the input summaries, probe stops before them
+        assert info['unit'] is None
+        assert info['version'] == '5.1'
+        assert info['element_count'] == {
+            'Rain_gages': 1, 'Subcatchments': 8, 'Nodes': 14,
+            'Links': 13, 'Pollutants': 2, 'Land_uses': 4}
+        assert lines[-1].strip() == 'Raingage Summary'
+
+        rpt = SWMMReportFile(str(path))
+        assert rpt.unit == 'LPS'
+        assert rpt.version == '5.1'
+
+    def test_missing_flow_units(self, tmp_path, monkeypatch):
+        path = tmp_path / 'partial.rpt'
+        path.write_text(
+            "\n"
+            "  EPA STORM WATER MANAGEMENT MODEL - VERSION 5.1 (Build 5.1.012)\n"
+            "  --------------------------------------------------------------\n"
+        )
+
+        calls = []
+        probe = SWMMReportFile.probe
+        monkeypatch.setattr(SWMMReportFile, 'probe', staticmethod(
+            lambda path: calls.append(path) or probe(path)))
+
+        rpt = SWMMReportFile(str(path))
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                rpt.unit
+        assert rpt.version == '5.1'
+        assert len(calls) == 1
+
+        rpt = SWMMReportFile(str(path), memory_map=True)
+        rpt.orig_file
+        with pytest.raises(ValueError):
+            rpt.unit
+        assert rpt.version == '5.1'
+
+
+INPUTS_RPT = """
+  EPA STORM WATER MANAGEMENT MODEL - VERSION 5.1 (Build 5.1.012)
+  --------------------------------------------------------------
+
+  *************
+  Element Count
+  *************
+  Number of rain gages ...... 1
+  Number of subcatchments ... 8
+  Number of nodes ........... 14
+  Number of links ........... 13
+  Number of pollutants ...... 2
+  Number of land uses ....... 4
+
+
+  ****************
+  Raingage Summary
+  ****************
+                                                      Data       Recording
+  Name                 Data Source                    Type       Interval 
+  ------------------------------------------------------------------------
+  RG1                  RainSeries                     INTENSITY    60 min.
+
+
+  ************
+  Node Summary
+  ************
+                                           Invert      Max.    Ponded    External
+  Name                 Type                 Elev.     Depth      Area    Inflow  
+  -------------------------------------------------------------------------------
+  J1                   JUNCTION             10.00      5.00       0.0
+  J2                   JUNCTION              9.00      5.00       0.0
+  OF1                  OUTFALL               8.00      0.00       0.0
+
+
+  ************
+  Link Summary
+  ************
+  Name             From Node        To Node          Type            Length    %Slope Roughness
+  ---------------------------------------------------------------------------------------------
+  C1               J1               J2               CONDUIT          100.0    1.0000    0.0130
+  C2               J2               OF1              CONDUIT          100.0    1.0000    0.0130
+
+
+  *********************************************************
+  NOTE: The summary statistics displayed in this report are
+  based on results found at every computational time step,  
+  not just on results from each reporting time step.
+  *********************************************************
+
+  ****************
+  Analysis Options
+  ****************
+  Flow Units ............... LPS
+  Process Models:
+    Rainfall/Runoff ........ YES
+"""
+
+
+CONTINUITY_RPT = """
+  EPA STORM WATER MANAGEMENT MODEL - VERSION 5.1 (Build 5.1.012)
+  --------------------------------------------------------------
+  
+  ****************
+  Analysis Options
+  ****************
+  Flow Units ............... CFS
+  
+  **************************        Volume         Depth
+  Runoff Quantity Continuity     acre-feet        inches
+  **************************     ---------       -------
+  Total Precipitation ......         2.500         3.000
+  Evaporation Loss .........         0.100         0.120
+  Infiltration Loss ........         0.500         0.600
+  Surface Runoff ...........         1.800         2.160
+  Final Storage ............         0.100         0.120
+  Continuity Error (%) .....         0.000
+  
+  
+  **************************        Volume        Volume
+  Flow Routing Continuity        acre-feet      10^6 gal
+  **************************     ---------     ---------
+  Dry Weather Inflow .......         0.000         0.000
+  Wet Weather Inflow .......         1.800         0.587
+  Groundwater Inflow .......         0.000         0.000
+  RDII Inflow ..............         0.000         0.000
+  External Inflow ..........         0.000         0.000
+  External Outflow .........         1.700         0.554
+  Flooding Loss ............         0.000         0.000
+  Evaporation Loss .........         0.050         0.016
+  Exfiltration Loss ........         0.000         0.000
+  Initial Stored Volume ....         0.000         0.000
+  Final Stored Volume ......         0.040         0.013
+  Continuity Error (%) .....         0.556
+  
+"""
+
+
+class Test_ReportFile_continuity(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.rpt = SWMMReportFile(self.known_path)
+
+    def test_flow_routing_continuity(self):
+        df = self.rpt.flow_routing_continuity
+        assert (df.dtypes == float).all()
+        assert len(df) == 12
+        assert df.loc['External_Inflow', 'Volume_acre_feet'] == 434.488
+        assert df.loc['Continuity_Error_pcnt'].tolist() == [-0.733, -0.733]
+
+    def test_missing_block(self):
+        assert self.rpt.runoff_quantity_continuity.empty
+        assert len(self.rpt.continuity) == 24
+
+    def test_both_blocks(self, tmp_path):
+        path = tmp_path / 'continuity.rpt'
+        path.write_text(CONTINUITY_RPT)
+        rpt = SWMMReportFile(str(path))
+
+        runoff = rpt.runoff_quantity_continuity
+        routing = rpt.flow_routing_continuity
+        assert runoff.loc['Evaporation_Loss', 'Depth_inches'] == 0.12
+        assert routing.loc['Evaporation_Loss', 'Volume_acre_feet'] == 0.05
+        assert rpt.continuity[
+            ('flow_routing', 'Continuity_Error_pcnt', 'Volume_acre_feet')] == 0.556
+        assert len(rpt.continuity) == 2 * (len(runoff) + len(routing))
+
+    def test_bounded_walk(self):
+        # only the lines of the table are sliced, not the rest of the file
+        class Lines(list):
+            def __getitem__(self, key):
+                if isinstance(key, slice):
+                    sizes.append(len(range(*key.indices(len(self)))))
+                return list.__getitem__(self, key)
+
+        sizes = []
+        self.rpt._orig_file = Lines(self.rpt.orig_file)
+        assert len(self.rpt.flow_routing_continuity) == 12
+        assert max(sizes) < 20
+
+
+class Test_ReportFile_compact(object):
+    def setup(self):
+        self.known_path = data_path(os.path.join('swmm', 'test_rpt.rpt'))
+        self.rpt = SWMMReportFile(self.known_path)
+        self.compact = SWMMReportFile(self.known_path, compact=True)
+
+    def test_dtypes(self):
+        df = self.compact.node_depth_results
+        assert df['Type'].dtype == 'category'
+        assert df['Average_Depth_Feet'].dtype == np.float32
+        assert isinstance(df.index, pd.CategoricalIndex)
+        assert self.compact.storage_volume_results['Avg_Pcnt_Full'].dtype == np.int32
+
+    def test_time_of_max(self):
+        known = self.rpt.node_depth_results
+        df = self.compact.node_depth_results
+        assert 'Time_of_Max_Occurrence_days' not in df.columns
+        row = known.iloc[0]
+        expected = (
+            pd.Timedelta(days=int(row['Time_of_Max_Occurrence_days'])) +
+            pd.Timedelta(row['Time_of_Max_Occurrence_hours'] + ':00')
+        )
+        assert df['Time_of_Max_Occurrence'].iloc[0] == expected
+
+    def test_values(self):
+        known = self.rpt.link_flow_results
+        df = self.compact.link_flow_results
+        assert df.index.tolist() == known.index.tolist()
+        assert np.allclose(df['Maximum_Flow_CFS'], known['Maximum_Flow_CFS'],
+                           rtol=1e-6)
+        assert df.memory_usage(deep=True).sum() < known.memory_usage(deep=True).sum()
+
+    def test_continuity(self):
+        df = self.compact.flow_routing_continuity
+        assert (df.dtypes == np.float32).all()